@@ -0,0 +1,95 @@
+# accounts/admin_utils.py
+"""
+Shared ModelAdmin base for the large tables (patients, doctors, appointments).
+
+- EstimatedCountPaginator reads the planner's row estimate from pg_class for
+  unfiltered changelists instead of running COUNT(*) over the whole table.
+- LargeTableAdmin turns off the second "full result" COUNT(*) and runs the
+  search as prefix/exact lookups, with related fields grouped into one
+  `IN (subquery)` per relation, so the functional indexes added in the
+  accounts/patients/doctor migrations can serve it.
+"""
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+SEARCH_LOOKUPS = {'^': 'istartswith', '=': 'iexact'}
+
+
+def estimated_row_count(model, using='default'):
+    """Row estimate for the model's table (summed over partitions), or None off PostgreSQL."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint
+            FROM pg_class c
+            WHERE c.oid = to_regclass(%s)
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))
+            """,
+            [model._meta.db_table, model._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this many rows an exact COUNT(*) is cheap enough (and estimates are noisiest).
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_count_threshold:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    search_fields must use the `^` (prefix) or `=` (exact) markers; related
+    fields may go one relation deep (`user__last_name`).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ('-pk',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+
+        local, related = [], {}
+        for field in search_fields:
+            lookup = SEARCH_LOOKUPS.get(field[0])
+            path = field[1:].split('__')
+            if lookup is None or len(path) > 2:
+                return super().get_search_results(request, queryset, search_term)
+            if len(path) == 1:
+                local.append(f"{path[0]}__{lookup}")
+            else:
+                related.setdefault(path[0], []).append(f"{path[1]}__{lookup}")
+
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            term = Q()
+            for lookup in local:
+                term |= Q(**{lookup: bit})
+            for relation, lookups in related.items():
+                remote = queryset.model._meta.get_field(relation).related_model
+                matches = Q()
+                for lookup in lookups:
+                    matches |= Q(**{lookup: bit})
+                term |= Q(**{f"{relation}__in": remote._default_manager.filter(matches).values('pk')})
+            queryset = queryset.filter(term)
+        # Only forward single-valued relations are followed, so no duplicates.
+        return queryset, False
@@ -0,0 +1,130 @@
+# accounts/idempotency.py
+"""
+`Idempotency-Key` support for POSTs that clients retry.
+
+A request that carries the header runs inside one transaction that starts by
+inserting an IdempotencyKey row for (caller, key) and ends by storing the
+response on it, so the row only becomes visible together with the writes it
+answers. A retry with the same key gets the stored response back, marked
+`Idempotent-Replayed: true`, without running the view again. Anonymous
+callers are told apart by client address.
+
+A duplicate that arrives while the first request is still running blocks on
+the unique index until that transaction ends: it then replays the committed
+response, or runs itself if the first one rolled back. After
+IDEMPOTENCY_WAIT_SECONDS it gives up with a 409 and `Retry-After`. Server
+errors are not stored, and a key sent again with a different request is
+refused with a 422. Rows expire after IDEMPOTENCY_KEY_TTL;
+`prune_idempotency_keys` deletes them.
+"""
+import functools
+import hashlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def owner_of(request):
+    """'user:<id>', or 'anon:' and a digest of the client address so anonymous callers do not share keys."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    address = hashlib.sha256(request.META.get('REMOTE_ADDR', '').encode()).hexdigest()
+    return f'anon:{address[:27]}'
+
+
+def fingerprint(request):
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+@contextmanager
+def wait_limit():
+    """Bound how long an insert waits on a duplicate key held by another transaction."""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = {int(settings.IDEMPOTENCY_WAIT_SECONDS * 1000)}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = DEFAULT")
+
+
+def claim(owner, key, request_fingerprint):
+    """
+    Insert the key and return (record, True), or return (record, False) for the
+    stored response. Must run in a transaction; raises OperationalError when the
+    key stays held for too long.
+    """
+    for _ in range(2):
+        try:
+            with wait_limit(), transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    owner=owner, key=key, fingerprint=request_fingerprint,
+                    expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                ), True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+        if record is not None and record.expires_at > timezone.now():
+            return record, False
+        # Expired (or pruned in between): take the key over.
+        IdempotencyKey.objects.filter(owner=owner, key=key, expires_at__lte=timezone.now()).delete()
+    raise OperationalError(f"Could not claim idempotency key {key!r}")
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        return Response(
+            {"error": f"This {HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(handler):
+    """Decorate a view's post/create handler to honour the Idempotency-Key header."""
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        request_fingerprint = fingerprint(request)
+        with transaction.atomic():
+            try:
+                record, created = claim(owner_of(request), key, request_fingerprint)
+            except OperationalError:
+                return Response(
+                    {"error": f"A request with this {HEADER} is still in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': str(max(1, int(settings.IDEMPOTENCY_WAIT_SECONDS)))},
+                )
+            if not created:
+                return replay(record, request_fingerprint)
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+            record.status_code, record.response = response.status_code, response.data
+            record.save(update_fields=['status_code', 'response'])
+            return response
+    return wrapper
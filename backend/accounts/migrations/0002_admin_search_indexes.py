@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:02
+
+from django.db import migrations
+
+# Admin search runs `UPPER(col::text) LIKE UPPER('term%')` (^ fields) and
+# `UPPER(col::text) = UPPER('term')` (= fields); text_pattern_ops serves both.
+INDEXES = {
+    'accounts_user_upper_last_name_idx': 'last_name',
+    'accounts_user_upper_first_name_idx': 'first_name',
+    'accounts_user_upper_email_idx': 'email',
+}
+
+
+def add_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON accounts_customuser (UPPER({column}::text) text_pattern_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, drop_indexes),
+    ]
@@ -1,5 +1,6 @@
 # accounts/models.py
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class CustomUser(AbstractUser):
@@ -13,3 +14,20 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return f"{self.username} ({self.role})"
+
+
+class IdempotencyKey(models.Model):
+    """A stored response for an `Idempotency-Key` request, see accounts/idempotency.py."""
+    owner = models.CharField(max_length=32)  # 'user:<id>', or 'anon:<client address digest>' before login
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # the request it answers
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['owner', 'key'], name='idempotency_owner_key_uniq')]
+
+    def __str__(self):
+        return f"{self.owner} {self.key}"
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from .models import CustomUser
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate, get_user_model
+from django.db import transaction
 from rest_framework_simplejwt.tokens import RefreshToken
 
 User = get_user_model()
@@ -15,13 +16,12 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'role', 'specialization']
         extra_kwargs = {'password': {'write_only': True}, 'specialization': {'required': False, 'allow_blank': True}}
 
+    @transaction.atomic
     def create(self, validated_data):
-        specialization = validated_data.pop('specialization', None)
-        user = CustomUser.objects.create_user(**validated_data)
-        if user.role == 'doctor' and specialization:
-            user.specialization = specialization
-            user.save()
-        return user
+        # One insert, password already hashed; the role's profile comes from its post_save signal.
+        if validated_data.get('role') != 'doctor':
+            validated_data.pop('specialization', None)
+        return CustomUser.objects.create_user(**validated_data)
 
     def to_representation(self, instance):
         data = {
@@ -0,0 +1,85 @@
+# accounts/sparse_fields.py
+"""
+`?fields=a,b` / `?exclude=c` support for read endpoints.
+
+SparseFieldsetSerializerMixin drops the unrequested top-level fields from the
+serializer, and SparseFieldsetViewMixin defers the matching model columns so
+large text fields are not even fetched. Only safe (GET/HEAD/OPTIONS) requests
+are affected; writes always see the full serializer.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def selected_fields(request, available):
+    """The subset of `available` field names the request asks for, or None for all of them."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    if 'fields' not in params and 'exclude' not in params:
+        return None
+    selected = set(available)
+    if 'fields' in params:
+        selected &= _names(params['fields'])
+    if 'exclude' in params:
+        selected -= _names(params['exclude'])
+    return selected
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer side. `field_dependencies` maps a field name to the model
+    attributes it reads besides its own source (e.g. a method field).
+    """
+    field_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = selected_fields(self.context.get('request'), self.fields.keys())
+        if selected is not None:
+            for name in set(self.fields.keys()) - selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def deferrable_columns(cls, model, request):
+        """Concrete, non-relational model fields that no selected serializer field needs."""
+        all_fields = cls().fields
+        selected = selected_fields(request, all_fields.keys())
+        if selected is None:
+            return []
+
+        def attributes(name):
+            source = all_fields[name].source
+            own = [] if source == '*' else [source.split('.')[0]]
+            return own + list(cls.field_dependencies.get(name, []))
+
+        needed = {attribute for name in selected for attribute in attributes(name)}
+        skipped = {attribute for name in set(all_fields) - selected for attribute in attributes(name)}
+        deferrable = []
+        for field in model._meta.concrete_fields:
+            if field.name in skipped and field.name not in needed and not field.primary_key and not field.is_relation:
+                deferrable.append(field.name)
+        return deferrable
+
+
+class SparseFieldsetViewMixin:
+    """
+    View side: defers the columns the sparse serializer will not read.
+    `kept_columns` names columns the view itself reads, e.g. a cursor's ordering.
+    """
+    kept_columns = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'deferrable_columns'):
+            deferred = [
+                name for name in serializer_class.deferrable_columns(queryset.model, self.request)
+                if name not in self.kept_columns
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
@@ -1,3 +1,180 @@
-from django.test import TestCase
+import re
+from collections import Counter
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from doctor.models import Doctor
+from patients.models import Patient
+from .idempotency import idempotent
+from .models import IdempotencyKey
+
+User = get_user_model()
+
+WRITE = re.compile(r'\s*(INSERT|UPDATE|DELETE)\b(?:\s+(?:INTO|FROM))?\s+"?(\w+)"?', re.IGNORECASE)
+
+
+@contextmanager
+def count_writes():
+    """Counts the INSERT/UPDATE/DELETE statements run inside, as {(statement, table): count}."""
+    writes = Counter()
+
+    def record(execute, sql, params, many, context):
+        match = WRITE.match(sql)
+        if match:
+            writes[match.group(1).upper(), match.group(2)] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield writes
+
+
+def one_insert_each(*tables):
+    return Counter({('INSERT', table): 1 for table in tables})
+
+
+@override_settings(RATE_LIMITS={})
+class RegistrationWriteTests(TestCase):
+    def register(self, path, data):
+        with count_writes() as writes:
+            response = self.client.post(path, data, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return writes
+
+    def test_register_patient(self):
+        writes = self.register('/api/accounts/register/', {
+            'username': 'pat', 'email': 'pat@example.com', 'password': 'secret-pass-1', 'role': 'patient',
+        })
+        self.assertEqual(writes, one_insert_each('accounts_customuser', 'patients_patient', 'admin_api_adminoutboxevent'))
+        user = User.objects.get(username='pat')
+        self.assertTrue(user.check_password('secret-pass-1'))
+        self.assertTrue(Patient.objects.filter(user=user).exists())
+
+    def test_register_doctor(self):
+        writes = self.register('/api/accounts/register/', {
+            'username': 'doc', 'email': 'doc@example.com', 'password': 'secret-pass-1',
+            'role': 'doctor', 'specialization': 'Dentist',
+        })
+        self.assertEqual(writes, one_insert_each('accounts_customuser', 'doctor_doctor', 'admin_api_adminoutboxevent'))
+        self.assertEqual(Doctor.objects.get(user__username='doc').specialization, 'Dentist')
+
+    def test_create_patient(self):
+        writes = self.register('/api/patients/create/', {
+            'first_name': 'Pat', 'last_name': 'Ient', 'email': 'pat@example.com', 'password': 'secret-pass-1',
+            'phone': '0100', 'blood_type': 'O+',
+        })
+        self.assertEqual(writes, one_insert_each('accounts_customuser', 'patients_patient', 'admin_api_adminoutboxevent'))
+        patient = Patient.objects.select_related('user').get(user__email='pat@example.com')
+        self.assertEqual((patient.phone, patient.blood_type), ('0100', 'O+'))
+        self.assertTrue(patient.user.check_password('secret-pass-1'))
+
+    def test_create_patient_with_taken_email(self):
+        User.objects.create_user('pat@example.com', email='pat@example.com', password='x')
+        response = self.client.post('/api/patients/create/', {
+            'first_name': 'Pat', 'last_name': 'Ient', 'email': 'pat@example.com', 'password': 'secret-pass-1',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_patient_with_an_email_too_long_for_a_username(self):
+        email = 'p' * 140 + '@example.com'
+        response = self.client.post('/api/patients/create/', {
+            'first_name': 'Pat', 'last_name': 'Ient', 'email': email, 'password': 'secret-pass-1',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+        self.assertFalse(User.objects.filter(email=email).exists())
+
+    def test_create_patient_rolls_back_the_user(self):
+        with mock.patch.object(Patient, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            self.client.post('/api/patients/create/', {
+                'first_name': 'Pat', 'last_name': 'Ient', 'email': 'pat@example.com', 'password': 'secret-pass-1',
+            }, content_type='application/json')
+        self.assertFalse(User.objects.filter(email='pat@example.com').exists())
+
+
+class CountingView(APIView):
+    """Answers with how many requests it has run; idempotent like the registration views."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+    calls = None
+    status_code = 201
+
+    @idempotent
+    def post(self, request):
+        self.calls.append(request.data)
+        return Response({'call': len(self.calls)}, status=self.status_code)
+
+
+@override_settings(RATE_LIMITS={})
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.factory = APIRequestFactory()
+
+    def post(self, data=None, key='key-1', status_code=201, user=None, address='10.0.0.1'):
+        request = self.factory.post('/orders/', data or {'item': 1}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY=key, REMOTE_ADDR=address)
+        if user is not None:
+            force_authenticate(request, user)
+        return CountingView.as_view(calls=self.calls, status_code=status_code)(request)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post()
+        second = self.post()
+        self.assertEqual((second.status_code, second.data), (201, {'call': 1}))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.post(key='key-2').data, {'call': 2})
+
+    def test_reused_key_with_a_different_body(self):
+        self.post()
+        response = self.post({'item': 2})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_server_errors_are_not_stored(self):
+        self.assertEqual(self.post(status_code=503).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post().data, {'call': 2})
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_anonymous_callers_are_scoped_by_address(self):
+        self.post()
+        other = self.post(address='10.0.0.2')
+        self.assertEqual(other.data, {'call': 2})
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+        self.assertTrue(all(len(owner) <= 32 for owner in IdempotencyKey.objects.values_list('owner', flat=True)))
+
+    def test_users_are_scoped_by_account(self):
+        one, two = User.objects.create_user('one'), User.objects.create_user('two')
+        self.post(user=one)
+        self.assertEqual(self.post(user=one, address='10.0.0.9')['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.post(user=two).data, {'call': 2})
+
+    def test_key_length(self):
+        self.assertEqual(self.post(key='k' * 256).status_code, 400)
+        self.assertEqual(self.calls, [])
+
+    def test_register_doctor_once(self):
+        data = {
+            'user': {'username': 'doc', 'email': 'doc@example.com'}, 'password': 'secret-pass-1',
+            'specialization': 'Dentist', 'phone': '0100',
+        }
+        responses = [
+            self.client.post('/api/doctor/register/', data, content_type='application/json', HTTP_IDEMPOTENCY_KEY='signup')
+            for _ in range(2)
+        ]
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[1]['Idempotent-Replayed'], 'true')
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(User.objects.filter(username='doc').count(), 1)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AdminApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_api'
+
+    def ready(self):
+        import admin_api.signals  # Keeps the appointment rollup current
+        from django.db.backends.signals import connection_created
+        from admin_api import slow_queries
+
+        connection_created.connect(slow_queries.install, dispatch_uid='admin_api.slow_queries')
@@ -0,0 +1,157 @@
+import statistics
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser
+from medical_project.db_pool import stats
+
+MODES = ('per-request', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency with a new connection per request, persistent "
+        "connections and the psycopg pool. Requests go through the full WSGI stack "
+        "(middleware, auth, view, request_finished cleanup) from concurrent threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/doctor/all-doctors/', help='GET endpoint to call.')
+        parser.add_argument('--user', help='Username to authenticate as (default: the first active user).')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads.')
+        parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated subset of: {', '.join(MODES)}.")
+        parser.add_argument('--pool-size', type=int, help='Pool max_size (default: --concurrency).')
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+        if 'pool' in modes and connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            self.stderr.write("Connection pooling needs PostgreSQL; skipping the pool mode.")
+            modes.remove('pool')
+
+        self.environ = self.build_environ(options['path'], self.get_user(options['user']))
+        self.handler = WSGIHandler()
+        self.check_endpoint()
+
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        saved = {'CONN_MAX_AGE': settings_dict.get('CONN_MAX_AGE', 0), 'OPTIONS': settings_dict.get('OPTIONS', {})}
+        self.stdout.write(f"{'mode':<12} {'requests':>8} {'req/s':>8} {'mean ms':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'acquires':>8} {'acq ms':>8}")
+        try:
+            for mode in modes:
+                self.configure(settings_dict, mode, options['pool_size'] or options['concurrency'], saved['OPTIONS'])
+                self.report(mode, *self.run(options['requests'], options['concurrency']))
+        finally:
+            self.reset_connections()
+            settings_dict.update(saved)
+
+    def get_user(self, username):
+        users = CustomUser.objects.filter(is_active=True).order_by('id')
+        user = users.filter(username=username).first() if username else users.first()
+        if user is None:
+            raise CommandError("No matching active user to authenticate as.")
+        return user
+
+    def build_environ(self, path, user):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_AUTHORIZATION': f"Bearer {AccessToken.for_user(user)}",
+        }
+        setup_testing_defaults(environ)
+        return environ
+
+    def request(self):
+        status = []
+        response = self.handler(dict(self.environ), lambda code, headers: status.append(code))
+        try:
+            for _ in response:
+                pass
+        finally:
+            # Sends request_finished, which closes or returns the connection.
+            response.close()
+        return status[0]
+
+    def check_endpoint(self):
+        status = self.request()
+        if not status.startswith('200'):
+            raise CommandError(f"GET {self.environ['PATH_INFO']} returned {status}")
+
+    def reset_connections(self):
+        connections.close_all()
+        connection = connections[DEFAULT_DB_ALIAS]
+        if getattr(connection, 'pool', None) is not None:
+            connection.close_pool()
+
+    def configure(self, settings_dict, mode, pool_size, options):
+        # Worker threads build their own connection wrappers from this shared dict.
+        self.reset_connections()
+        options = {key: value for key, value in options.items() if key != 'pool'}
+        if mode == 'pool':
+            options['pool'] = {'min_size': pool_size, 'max_size': pool_size}
+        settings_dict['OPTIONS'] = options
+        settings_dict['CONN_MAX_AGE'] = 60 if mode == 'persistent' else 0
+
+    def run(self, total, concurrency):
+        latencies = []
+        errors = []
+        # Every thread makes one warm-up request, so persistent connections and the
+        # pool are primed alike; the stats are reset and then all start measuring together.
+        warmed, go = threading.Barrier(concurrency + 1), threading.Barrier(concurrency + 1)
+
+        def worker(count):
+            try:
+                self.request()
+                warmed.wait()
+                go.wait()
+                for _ in range(count):
+                    started = time.perf_counter()
+                    status = self.request()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if not status.startswith('200'):
+                        errors.append(status)
+            except Exception:
+                warmed.abort()
+                go.abort()
+                raise
+            finally:
+                connections.close_all()
+
+        counts = [total // concurrency + (index < total % concurrency) for index in range(concurrency)]
+        threads = [threading.Thread(target=worker, args=(count,)) for count in counts]
+        for thread in threads:
+            thread.start()
+        try:
+            warmed.wait()
+            stats.reset()
+            go.wait()
+        except threading.BrokenBarrierError:
+            for thread in threads:
+                thread.join()
+            raise CommandError("A client thread failed before the measurement started.")
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f"{len(errors)} request(s) failed, e.g. {errors[0]}")
+        return latencies, elapsed
+
+    def report(self, mode, latencies, elapsed):
+        cuts = statistics.quantiles(latencies, n=100)
+        acquire = stats.snapshot()[DEFAULT_DB_ALIAS]['acquire_ms']
+        acquire_mean = acquire['sum_ms'] / acquire['count'] if acquire['count'] else 0
+        self.stdout.write(
+            f"{mode:<12} {len(latencies):>8} {len(latencies) / elapsed:>8.1f} {statistics.fmean(latencies):>8.2f} "
+            f"{cuts[49]:>8.2f} {cuts[94]:>8.2f} {cuts[98]:>8.2f} {acquire['count']:>8} {acquire_mean:>8.2f}"
+        )
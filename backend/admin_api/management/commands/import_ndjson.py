@@ -0,0 +1,173 @@
+import json
+import os
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+
+
+class ModelLoader:
+    """Turns decoded records of one model into unsaved instances plus m2m through rows."""
+
+    def __init__(self, model):
+        self.model = model
+        opts = model._meta
+        self.fields = {field.name: field for field in opts.concrete_fields}
+        self.m2m = {field.name: field for field in opts.many_to_many}
+        self.auto_now_fields = [
+            field for field in opts.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+
+    @contextmanager
+    def keep_timestamps(self):
+        """bulk_create runs pre_save(), which would overwrite auto_now(_add) columns with now()."""
+        saved = [(field, field.auto_now, field.auto_now_add) for field in self.auto_now_fields]
+        for field in self.auto_now_fields:
+            field.auto_now = field.auto_now_add = False
+        try:
+            yield
+        finally:
+            for field, auto_now, auto_now_add in saved:
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+    def build(self, record, through_rows):
+        values = {self.model._meta.pk.attname: self.model._meta.pk.to_python(record['pk'])}
+        for name, value in record['fields'].items():
+            if name in self.m2m:
+                # dumpdata inlines m2m ids; export_ndjson writes the through table instead.
+                field = self.m2m[name]
+                through = field.remote_field.through
+                source = field.m2m_field_name() + '_id'
+                target = field.m2m_reverse_field_name() + '_id'
+                through_rows.setdefault(through, []).extend(
+                    through(**{source: values[self.model._meta.pk.attname], target: related_id})
+                    for related_id in value
+                )
+                continue
+            field = self.fields.get(name)
+            if field is None:
+                raise CommandError(f"{self.model._meta.label_lower} has no field {name!r}")
+            values[field.attname] = None if value is None else field.to_python(value)
+        return self.model(**values)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an NDJSON dump written by export_ndjson (or dumpdata --format jsonl). "
+        "Records are inserted with bulk_create in per-chunk transactions, so model save() "
+        "and the post_save profile signals never run. Progress is stored next to the input "
+        "file after every chunk; rerunning the command resumes from there. Records whose "
+        "primary key is already present are skipped; any other unique conflict stops the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file to import.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per bulk insert and transaction.')
+        parser.add_argument('--restart', action='store_true', help='Ignore saved progress and start from the top.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        progress_path = f"{path}.progress"
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+
+        progress = {'offset': 0, 'lines': 0, 'models': []}
+        if os.path.exists(progress_path) and not options['restart']:
+            with open(progress_path) as handle:
+                progress = json.load(handle)
+            self.stdout.write(f"Resuming at line {progress['lines']}")
+
+        self.database = options['database']
+        self.loaders = {}
+        self.touched = {apps.get_model(label) for label in progress['models']}
+        self.skipped = 0
+        chunk, chunk_model = [], None
+        offset, lines = progress['offset'], progress['lines']
+
+        with open(path, 'rb') as stream:
+            stream.seek(offset)
+            for raw in stream:
+                offset += len(raw)
+                lines += 1
+                if not raw.strip():
+                    continue
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    raise CommandError(
+                        f"{path}:{lines} is not an NDJSON record. JSON array dumps can be converted "
+                        "with `dumpdata --format jsonl` or loaded once and re-exported with export_ndjson."
+                    )
+                model = self.get_model(record['model'])
+                if chunk and (model is not chunk_model or len(chunk) >= options['chunk_size']):
+                    self.flush(chunk_model, chunk, progress_path, chunk_offset, chunk_lines)
+                    chunk = []
+                chunk.append(record)
+                chunk_model = model
+                chunk_offset, chunk_lines = offset, lines
+            if chunk:
+                self.flush(chunk_model, chunk, progress_path, chunk_offset, chunk_lines)
+
+        self.reset_sequences()
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        self.stdout.write(self.style.SUCCESS(f"Imported {lines} line(s) from {path}"))
+        if self.skipped:
+            self.stdout.write(f"Skipped {self.skipped} record(s) whose primary key was already present")
+        self.stdout.write(
+            "Signals were not sent: run rebuild_appointment_rollups --all and "
+            "project_admin_models --backfill to refresh derived tables."
+        )
+
+    def get_model(self, label):
+        try:
+            return apps.get_model(label)
+        except (LookupError, ValueError):
+            raise CommandError(f"Unknown model {label!r}")
+
+    def flush(self, model, records, progress_path, offset, lines):
+        loader = self.loaders.get(model) or self.loaders.setdefault(model, ModelLoader(model))
+        manager = model._base_manager.using(self.database)
+        pks = [model._meta.pk.to_python(record['pk']) for record in records]
+        through_rows = {}
+        try:
+            with loader.keep_timestamps(), transaction.atomic(using=self.database):
+                # Rows already present (a replayed chunk after a crash, or an earlier
+                # import) are skipped along with their m2m rows, which were written with them.
+                existing = set(manager.filter(pk__in=pks).values_list('pk', flat=True))
+                objects = [
+                    loader.build(record, through_rows)
+                    for record, pk in zip(records, pks) if pk not in existing
+                ]
+                manager.bulk_create(objects)
+                for through, rows in through_rows.items():
+                    through._base_manager.using(self.database).bulk_create(rows)
+        except IntegrityError as exc:
+            raise CommandError(
+                f"{model._meta.label_lower} records up to line {lines} conflict with existing rows: {exc}. "
+                "Nothing from this chunk was written; resolve the conflict and rerun to resume."
+            )
+        self.skipped += len(existing)
+        self.touched.add(model)
+        self.touched.update(through_rows)
+
+        with open(progress_path, 'w') as handle:
+            json.dump({
+                'offset': offset,
+                'lines': lines,
+                'models': sorted(touched._meta.label_lower for touched in self.touched),
+            }, handle)
+
+    def reset_sequences(self):
+        connection = connections[self.database]
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.touched))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,352 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DEFAULT_MIX = 'patient=70,doctor=20,admin=10'
+# Enabled for seeded accounts stored with generate_dataset --fast-passwords, so
+# login measures the view rather than PBKDF2.
+FAST_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+class Failed(Exception):
+    """A step the rest of the session depends on did not succeed."""
+
+
+class VirtualUser:
+    """
+    One simulated client: logs in, then follows the journey for its role.
+    Requests go through the full WSGI stack, like a real server would run them.
+    """
+
+    def __init__(self, harness, rng, address):
+        self.harness = harness
+        self.rng = rng
+        self.address = address  # client IP, as seen by the rate limits
+        self.token = None
+
+    def call(self, endpoint, method, path, body=None, expect=200):
+        status, payload = self.harness.request(endpoint, method, path, body, self.token, self.address)
+        if status != expect:
+            raise Failed(f"{endpoint}: {method} {path} returned {status}")
+        return payload
+
+    def login(self, email):
+        payload = self.call('login', 'POST', '/api/accounts/login/', {
+            'email': email, 'password': self.harness.password,
+        })
+        self.token = payload['access']
+
+    def session(self, role):
+        """Log in once, then repeat the role's journey a few times, as a returning user would."""
+        self.login(self.rng.choice(self.harness.accounts[role]))
+        for _ in range(self.rng.randint(1, self.harness.session_length)):
+            getattr(self, role)()
+
+    def patient(self):
+        doctors = self.call(
+            'directory', 'GET', '/api/doctor/all-doctors/?ordering=-rating&fields=id,full_name,specialization,rating',
+        )
+        if not doctors:
+            raise Failed("directory: no doctors")
+        slots = []
+        for doctor in self.rng.sample(doctors, min(len(doctors), self.rng.randint(1, 3))):
+            slots.extend(self.call('availability', 'GET', f"/api/doctor/{doctor['id']}/availability/"))
+        if slots and self.rng.random() < self.harness.reserve_rate:
+            self.call('reserve', 'POST', '/api/doctor/reserve-appointment/', {
+                'doctor': (slot := self.rng.choice(slots))['doctor'],
+                'date': self.slot_datetime(slot).isoformat(),
+                'notes': 'Load test booking',
+            }, expect=201)
+
+    def doctor(self):
+        self.call('doctor-dashboard', 'GET', '/api/doctor/dashboard/stats/')
+        self.call('doctor-appointments', 'GET', '/api/doctor/appointments/?upcoming=true')
+
+    def admin(self):
+        self.call('admin-doctors', 'GET', '/api/admin/doctors/')
+        self.call('admin-patients', 'GET', '/api/admin/patients/')
+        self.call('admin-activity-logs', 'GET', '/api/admin/activity-logs/')
+        self.call('admin-analytics', 'GET', '/api/admin/analytics/appointments/?days=30&group_by=specialization,status')
+
+    def slot_datetime(self, slot):
+        """A random 30-minute slot in the doctor's hours on the next matching day, at least a day out."""
+        day = timezone.now().date() + timedelta(days=1)
+        while WEEKDAYS[day.weekday()] != slot['day']:
+            day += timedelta(days=1)
+        day += timedelta(weeks=self.rng.randrange(8))
+        start = datetime.combine(day, dt_time.fromisoformat(slot['start_time']), tzinfo=dt_timezone.utc)
+        end = datetime.combine(day, dt_time.fromisoformat(slot['end_time']), tzinfo=dt_timezone.utc)
+        slots = max(int((end - start).total_seconds() // 1800), 1)
+        return start + timedelta(minutes=30 * self.rng.randrange(slots))
+
+
+class Harness:
+    def __init__(self, accounts, password, reserve_rate, session_length):
+        self.accounts = accounts
+        self.password = password
+        self.reserve_rate = reserve_rate
+        self.session_length = session_length
+        self.handler = WSGIHandler()
+        self.samples = defaultdict(list)  # endpoint -> [ms]; list.append is atomic
+        self.errors = defaultdict(int)
+        self.failures = []
+
+    def request(self, endpoint, method, path, body, token, address='127.0.0.1'):
+        path, _, query = path.partition('?')
+        data = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': '127.0.0.1',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': '127.0.0.1',
+            'REMOTE_ADDR': address,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(data)),
+            'wsgi.input': io.BytesIO(data),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'wsgi.version': (1, 0),
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+
+        status = []
+        started = time.perf_counter()
+        response = self.handler(environ, lambda code, headers: status.append(code))
+        try:
+            content = b''.join(response)
+        finally:
+            # Sends request_finished, which closes or returns the connection.
+            response.close()
+        self.samples[endpoint].append((time.perf_counter() - started) * 1000)
+
+        code = int(status[0].split()[0])
+        if code >= 400:
+            self.errors[endpoint] += 1
+        try:
+            return code, json.loads(content) if content else None
+        except ValueError:
+            return code, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local load test against the real URLconf: concurrent simulated patients, doctors "
+        "and admins over a generate_dataset dataset. Reports throughput and p50/p95/p99 per "
+        "endpoint and fails when an endpoint is over the budgets in load_test_budgets.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=8, help='Concurrent simulated users (threads).')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run after the warm-up.')
+        parser.add_argument('--warmup', type=float, default=5, help='Seconds of traffic that are not measured.')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Role weights (default: {DEFAULT_MIX}).')
+        parser.add_argument('--reserve-rate', type=float, default=0.3,
+                            help='Share of patient sessions that end with a reservation.')
+        parser.add_argument('--session-length', type=int, default=5,
+                            help='Most journeys a user makes per login (uniform from 1).')
+        parser.add_argument('--think-ms', type=int, default=0, help='Pause between sessions per user.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed', help='Username prefix used by generate_dataset.')
+        parser.add_argument('--password', default='seed-pass-123', help='Password of the seeded users.')
+        parser.add_argument('--accounts', type=int, default=500, help='Seeded accounts per role to log in as.')
+        parser.add_argument('--budgets', default=str(settings.BASE_DIR / 'load_test_budgets.json'),
+                            help='JSON file with per-endpoint p50/p95/p99 limits.')
+        parser.add_argument('--no-budgets', action='store_true', help='Report only; never fail.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+        parser.add_argument('--limits', action='store_true',
+                            help='Keep rate limits and admission control on. They are off by default, since '
+                                 'every simulated user shares this one process.')
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        accounts = self.load_accounts(options['prefix'], options['accounts'], mix)
+        setup = {'database': connection.vendor, 'password_hasher': self.password_hasher(accounts)}
+        budgets = None if options['no_budgets'] else self.load_budgets(options['budgets'], setup)
+
+        harness = Harness(accounts, options['password'], options['reserve_rate'], options['session_length'])
+        self.stdout.write(
+            f"{options['users']} users for {options['warmup']:g}s warm-up + {options['duration']:g}s, "
+            f"mix {', '.join(f'{role}={weight}' for role, weight in mix.items())}, "
+            f"{setup['database']}, {setup['password_hasher']} passwords"
+        )
+        overrides = {}
+        if not options['limits']:
+            overrides.update(RATE_LIMITS={}, ADMISSION_MAX_CONCURRENT=0)
+        if setup['password_hasher'] == 'md5':
+            overrides['PASSWORD_HASHERS'] = [FAST_HASHER, *settings.PASSWORD_HASHERS]
+        with override_settings(**overrides):
+            elapsed = self.drive(harness, mix, options)
+        results = {**setup, **self.summarize(harness, elapsed)}
+        self.report(results, budgets)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+        if harness.failures:
+            self.stderr.write(f"{len(harness.failures)} failed session(s), e.g. {harness.failures[0]}")
+        if budgets is not None:
+            violations = self.over_budget(results, budgets)
+            if violations:
+                raise CommandError("Over budget:\n  " + "\n  ".join(violations))
+            self.stdout.write(self.style.SUCCESS("All endpoints within budget."))
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            role, _, weight = part.partition('=')
+            if role not in ('patient', 'doctor', 'admin') or not weight.isdigit():
+                raise CommandError(f"Bad --mix entry {part!r}; expected role=weight.")
+            if int(weight):
+                mix[role] = int(weight)
+        if not mix:
+            raise CommandError("--mix selects no roles.")
+        return mix
+
+    def load_accounts(self, prefix, limit, mix):
+        accounts = {}
+        for role in mix:
+            users = CustomUser.objects.filter(is_active=True, role=role, username__startswith=f"{prefix}-")
+            accounts[role] = list(users.order_by('id').values_list('email', flat=True)[:limit])
+            if not accounts[role]:
+                raise CommandError(
+                    f"No seeded {role} accounts with prefix {prefix!r}; run manage.py generate_dataset first."
+                )
+        return accounts
+
+    def password_hasher(self, accounts):
+        """The algorithm of the seeded accounts' password hashes (generate_dataset uses one for all)."""
+        email = next(iter(accounts.values()))[0]
+        encoded = CustomUser.objects.filter(email=email).values_list('password', flat=True).first()
+        return encoded.partition('$')[0]
+
+    def load_budgets(self, path, setup):
+        try:
+            with open(path) as handle:
+                budgets = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read budgets from {path}: {exc}")
+        # Budgets only mean something on the setup they were measured on.
+        for key, value in setup.items():
+            if budgets.get(key, value) != value:
+                raise CommandError(
+                    f"The budgets in {path} were measured with {key} {budgets[key]!r}, this run has {value!r}. "
+                    "See the description in that file, or pass --no-budgets."
+                )
+        return budgets
+
+    def drive(self, harness, mix, options):
+        roles, weights = list(mix), list(mix.values())
+        warmup_ends = time.monotonic() + options['warmup']
+        deadline = warmup_ends + options['duration']
+        measuring = threading.Event()
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            try:
+                while time.monotonic() < deadline:
+                    user = VirtualUser(harness, rng, f'10.0.{index // 256}.{index % 256}')
+                    try:
+                        user.session(rng.choices(roles, weights)[0])
+                    except Failed as exc:
+                        if measuring.is_set():
+                            harness.failures.append(str(exc))
+                    if options['think_ms']:
+                        time.sleep(options['think_ms'] / 1000)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(options['users'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(max(warmup_ends - time.monotonic(), 0))
+        # Throw away warm-up samples; requests still in flight land in the measured window.
+        harness.samples.clear()
+        harness.errors.clear()
+        measuring.set()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def summarize(self, harness, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(harness.samples.items()):
+            samples = sorted(samples)
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': harness.errors.get(endpoint, 0),
+                'rps': len(samples) / elapsed,
+                'mean_ms': sum(samples) / len(samples),
+                'p50_ms': percentile(samples, 0.50),
+                'p95_ms': percentile(samples, 0.95),
+                'p99_ms': percentile(samples, 0.99),
+                'max_ms': samples[-1],
+            }
+        total = sum(stats['requests'] for stats in endpoints.values())
+        return {
+            'seconds': elapsed,
+            'requests': total,
+            'rps': total / elapsed if elapsed else 0,
+            'failed_sessions': len(harness.failures),
+            'endpoints': endpoints,
+        }
+
+    def over_budget(self, results, budgets):
+        violations = []
+        max_error_rate = budgets.get('max_error_rate', 0)
+        for endpoint, budget in budgets.get('endpoints', {}).items():
+            stats = results['endpoints'].get(endpoint)
+            if stats is None:
+                continue  # role not in this run's mix
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                if key in budget and stats[key] > budget[key]:
+                    violations.append(f"{endpoint} {key[:3]} {stats[key]:.1f}ms > {budget[key]}ms")
+            error_rate = stats['errors'] / stats['requests']
+            if error_rate > budget.get('max_error_rate', max_error_rate):
+                violations.append(f"{endpoint} error rate {error_rate:.2%}")
+        if 'min_rps' in budgets and results['rps'] < budgets['min_rps']:
+            violations.append(f"throughput {results['rps']:.1f} req/s < {budgets['min_rps']} req/s")
+        return violations
+
+    def report(self, results, budgets):
+        limits = (budgets or {}).get('endpoints', {})
+        self.stdout.write(
+            f"{'endpoint':<22} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'budget p95/p99':>15}"
+        )
+        for endpoint, stats in results['endpoints'].items():
+            budget = limits.get(endpoint, {})
+            self.stdout.write(
+                f"{endpoint:<22} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                f"{budget.get('p95_ms', '-'):>7}/{budget.get('p99_ms', '-'):<7}"
+            )
+        self.stdout.write(f"{'total':<22} {results['requests']:>8} {'':>6} {results['rps']:>8.1f}")
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from medical_project.profiling import HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed X-Profile header value. Requests that send it are profiled "
+        "(see medical_project/profiling.py) until the token expires."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{HEADER}: {make_token()}")
+        self.stderr.write(
+            f"Valid for {settings.PROFILER_TOKEN_MAX_AGE} seconds; profiles are written to {settings.PROFILER_DIR}"
+        )
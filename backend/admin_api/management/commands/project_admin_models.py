@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_api import projection
+from admin_api.models import AdminOutboxEvent, AdminProjectionCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending doctor/patient/appointment changes from the outbox to the admin read models. "
+        "Use --backfill for the initial load and --follow to keep running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--backfill', action='store_true', help='Project every source row in chunks first.')
+        parser.add_argument('--follow', action='store_true', help='Keep polling the outbox.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --follow.')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            for name, mapping in projection.PROJECTIONS.items():
+                written, removed = projection.backfill(mapping, chunk_size=options['batch_size'])
+                self.stdout.write(f"Backfilled {name}: wrote {written}, removed {removed} orphan(s)")
+
+        while True:
+            applied = 0
+            while True:
+                consumed = projection.drain(options['batch_size'])
+                if not consumed:
+                    break
+                applied += consumed
+            if applied:
+                checkpoint = AdminProjectionCheckpoint.objects.get(name=projection.CHECKPOINT_NAME)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Applied {applied} event(s), checkpoint at event {checkpoint.last_event_id}"
+                ))
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
+
+        pending = AdminOutboxEvent.objects.count()
+        if pending:
+            self.stdout.write(f"{pending} event(s) still pending")
@@ -0,0 +1,79 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from admin_api import partitions
+from admin_api.models import AdminActivityLog, AdminNotification
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply retention to the admin activity log and notifications. "
+        "On PostgreSQL whole monthly partitions past the retention window are dropped "
+        "and partitions for the coming months are created ahead of time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.ADMIN_LOG_RETENTION_MONTHS,
+            help='Number of full months to keep, not counting the current one.',
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=settings.ADMIN_LOG_PARTITIONS_AHEAD,
+            help='Number of future monthly partitions to create.',
+        )
+        parser.add_argument(
+            '--detach', action='store_true',
+            help='Detach expired partitions instead of dropping them, so they can be archived.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed.')
+
+    def handle(self, *args, **options):
+        this_month = partitions.month_start(timezone.now().date())
+        cutoff = partitions.add_months(this_month, -options['months'])
+
+        if not partitions.is_supported(connection):
+            self.prune_with_delete(cutoff, options['dry_run'])
+            return
+
+        for table, column in partitions.PARTITIONED_TABLES.items():
+            if options['dry_run']:
+                expired = [
+                    name for name, month in partitions.list_partitions(connection, table)
+                    if partitions.add_months(month, 1) <= cutoff
+                ]
+                self.stdout.write(f"{table}: would remove {', '.join(expired) or 'nothing'}")
+                continue
+
+            with transaction.atomic():
+                created = partitions.ensure_partitions(
+                    connection, table, column, this_month, partitions.add_months(this_month, options['ahead'])
+                )
+                removed = partitions.drop_partitions_before(connection, table, cutoff, detach_only=options['detach'])
+
+            verb = 'detached' if options['detach'] else 'dropped'
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: created {len(created)} partition(s), {verb} {len(removed)} partition(s)"
+            ))
+            for name in removed:
+                self.stdout.write(f"  {verb} {name}")
+
+    def prune_with_delete(self, cutoff, dry_run):
+        # Non-partitioned backends (local SQLite) fall back to plain deletes.
+        cutoff_dt = datetime.combine(cutoff, time.min, tzinfo=dt_timezone.utc)
+        expired_logs = AdminActivityLog.objects.filter(timestamp__lt=cutoff_dt)
+        expired_notifications = AdminNotification.objects.filter(created_at__lt=cutoff_dt)
+        if dry_run:
+            self.stdout.write(
+                f"Would delete {expired_logs.count()} activity log(s) and "
+                f"{expired_notifications.count()} notification(s) older than {cutoff}"
+            )
+            return
+        logs_deleted, _ = expired_logs.delete()
+        notifications_deleted, _ = expired_notifications.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {logs_deleted} activity log(s) and {notifications_deleted} notification(s) older than {cutoff}"
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from admin_api import rollups
+from doctor.models import Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the appointment analytics rollup with the appointment table. "
+        "Meant to run nightly; by default it recomputes the last 90 days plus upcoming appointments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='How many past days to recompute.')
+        parser.add_argument('--all', action='store_true', help='Recompute the whole appointment history.')
+
+    def handle(self, *args, **options):
+        bounds = Appointment.objects.aggregate(first=Min('date'), last=Max('date'))
+        if bounds['first'] is None:
+            self.stdout.write("No appointments, nothing to rebuild.")
+            return
+
+        today = timezone.localdate()
+        last = max(timezone.localtime(bounds['last']).date(), today)
+        if options['all']:
+            first = timezone.localtime(bounds['first']).date()
+        else:
+            first = today - timedelta(days=options['days'])
+
+        deleted, created = rollups.rebuild(first, last)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt appointment rollup for {first}..{last}: removed {deleted} row(s), wrote {created} row(s)"
+        ))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from admin_api.models import AdminSlowQuery
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'mean': '-mean_ms',
+    'max': '-max_ms',
+    'calls': '-calls',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "List the slowest query fingerprints recorded by admin_api.slow_queries, "
+        "worst first. Use --plan to print the captured EXPLAIN output of one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='total', help='Sort key (default: total time).')
+        parser.add_argument('--plan', metavar='FINGERPRINT', help='Show SQL, stack and plan for a fingerprint (prefix).')
+        parser.add_argument('--reset', action='store_true', help='Delete everything recorded so far.')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = AdminSlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} slow query record(s)"))
+            return
+        if options['plan']:
+            self.show_plan(options['plan'])
+            return
+
+        rows = (
+            AdminSlowQuery.objects
+            .annotate(mean_ms=ExpressionWrapper(F('total_ms') / F('calls'), output_field=FloatField()))
+            .order_by(ORDERINGS[options['order']])[:options['limit']]
+        )
+        self.stdout.write(f"{'fingerprint':<12} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  view / sql")
+        for row in rows:
+            self.stdout.write(
+                f"{row.fingerprint[:12]:<12} {row.calls:>7} {row.total_ms:>10.0f} {row.mean_ms:>9.1f} {row.max_ms:>9.1f}  "
+                f"{row.last_view or '-'}"
+            )
+            self.stdout.write(f"{'':<52}{row.sql[:160]}")
+            if options['verbosity'] > 1 and row.last_stack:
+                for line in row.last_stack.splitlines():
+                    self.stdout.write(f"{'':<54}{line}")
+
+    def show_plan(self, prefix):
+        matches = list(AdminSlowQuery.objects.filter(fingerprint__startswith=prefix)[:2])
+        if len(matches) != 1:
+            raise CommandError(f"{'No' if not matches else 'More than one'} fingerprint starts with {prefix!r}")
+        row = matches[0]
+        self.stdout.write(f"{row.fingerprint}  ({row.database}, {row.calls} call(s), {row.total_ms:.0f} ms total)")
+        self.stdout.write(f"\n{row.sql}\n")
+        self.stdout.write(f"Last seen in {row.last_view or '-'}:\n{row.last_stack}\n")
+        self.stdout.write(row.plan or "(no plan captured)")
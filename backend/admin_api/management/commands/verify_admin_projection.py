@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from admin_api import projection
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the admin read models with their doctor/patients sources using chunked hashes "
+        "and report drifted ids. --repair queues them for the projector."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--repair', action='store_true', help='Queue outbox events for every drifted id.')
+        parser.add_argument(
+            '--only', choices=list(projection.PROJECTIONS), action='append',
+            help='Limit the check to one mapping (can be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for name, mapping in projection.PROJECTIONS.items():
+            if options['only'] and name not in options['only']:
+                continue
+            drifted = list(projection.find_drift(mapping, chunk_size=options['chunk_size']))
+            total += len(drifted)
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS(f"{name}: in sync"))
+                continue
+            preview = ', '.join(str(source_id) for source_id in drifted[:20])
+            more = f" (+{len(drifted) - 20} more)" if len(drifted) > 20 else ''
+            self.stdout.write(self.style.WARNING(f"{name}: {len(drifted)} drifted id(s): {preview}{more}"))
+            if options['repair']:
+                projection.enqueue(name, drifted)
+
+        if total and options['repair']:
+            self.stdout.write("Queued repairs; run project_admin_models to apply them.")
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from admin_api import partitions
+
+
+def partition_admin_tables(apps, schema_editor):
+    connection = schema_editor.connection
+    if not partitions.is_supported(connection):
+        return
+    for table, column in partitions.PARTITIONED_TABLES.items():
+        partitions.convert_to_partitioned(connection, table, column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0002_admindoctor_is_approved_admindoctor_is_blocked_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_admin_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0003_partition_admin_logs'),
+        ('doctor', '0007_alter_appointment_patient_delete_patient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminAppointmentDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('specialization', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='doctor.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'specialization'], name='appt_stat_day_spec_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor', 'specialization', 'status'), name='unique_appointment_daily_stat')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0004_appointment_daily_stat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admindoctor',
+            index=models.Index(condition=models.Q(('is_approved', False), ('is_blocked', False)), fields=['id'], name='admindoctor_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminpatient',
+            index=models.Index(condition=models.Q(('is_approved', False), ('is_blocked', False)), fields=['id'], name='adminpatient_pending_idx'),
+        ),
+    ]
@@ -16,6 +16,18 @@ class AdminDoctor(models.Model):
     bio = models.TextField(blank=True, null=True)
     is_approved = models.BooleanField(default=False)
     is_blocked = models.BooleanField(default=False)
+    # id of the doctor.Doctor / patients.Patient / doctor.Appointment row this one projects
+    source_id = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            # Approval queue: only the small pending slice is indexed
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_approved=False, is_blocked=False),
+                name='admindoctor_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -29,6 +41,18 @@ class AdminPatient(models.Model):
     address = models.TextField(blank=True, null=True)
     is_approved = models.BooleanField(default=False)
     is_blocked = models.BooleanField(default=False)
+    # id of the doctor.Doctor / patients.Patient / doctor.Appointment row this one projects
+    source_id = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            # Approval queue: only the small pending slice is indexed
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_approved=False, is_blocked=False),
+                name='adminpatient_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -40,6 +64,8 @@ class AdminAppointment(models.Model):
     date = models.DateField()
     time = models.TimeField()
     reason = models.TextField(blank=True, null=True)
+    # id of the doctor.Doctor / patients.Patient / doctor.Appointment row this one projects
+    source_id = models.BigIntegerField(null=True, blank=True, unique=True)
 
     def __str__(self):
         return f"{self.patient.name} with {self.doctor.name} on {self.date}"
@@ -73,3 +99,66 @@ class AdminActivityLog(models.Model):
 
     def __str__(self):
         return f"{self.action} by {self.performed_by}"
+
+# Change capture for the admin read models (see admin_api.projection)
+class AdminOutboxEvent(models.Model):
+    SOURCE_CHOICES = [
+        ('doctor', 'Doctor'),
+        ('patient', 'Patient'),
+        ('appointment', 'Appointment'),
+    ]
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} #{self.source_id}"
+
+class AdminProjectionCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    events_applied = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+# Appointment analytics rollup (maintained by admin_api.rollups)
+class AdminAppointmentDailyStat(models.Model):
+    day = models.DateField()
+    doctor = models.ForeignKey('doctor.Doctor', on_delete=models.CASCADE, related_name='daily_stats')
+    specialization = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'doctor', 'specialization', 'status'],
+                name='unique_appointment_daily_stat',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'specialization'], name='appt_stat_day_spec_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.doctor_id} {self.status}: {self.count}"
+
+
+# Slow query log (maintained by admin_api.slow_queries)
+class AdminSlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField()
+    database = models.CharField(max_length=50, default='default')
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_view = models.CharField(max_length=200, blank=True)
+    last_stack = models.TextField(blank=True)
+    plan = models.TextField(blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]}: {self.calls} call(s), {self.total_ms:.0f} ms"
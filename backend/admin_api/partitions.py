@@ -0,0 +1,189 @@
+# admin_api/partitions.py
+"""
+Monthly range partitioning for the append-only admin tables.
+
+On PostgreSQL the tables listed in PARTITIONED_TABLES are partitioned by month
+on their timestamp column, so time-range queries only scan the matching
+partitions and retention can drop a whole month at once. On other backends
+(SQLite for local development) every helper here is a no-op.
+"""
+import re
+from datetime import date, datetime, timezone
+
+from django.utils.timezone import localdate
+
+# table name -> partition key column
+PARTITIONED_TABLES = {
+    'admin_api_adminactivitylog': 'timestamp',
+    'admin_api_adminnotification': 'created_at',
+}
+
+PARTITION_SUFFIX_RE = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def is_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+
+def list_partitions(connection, table):
+    """Return [(partition_name, month)] for the monthly partitions of `table`, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX_RE.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_month_partition(connection, table, column, month):
+    """
+    Create and attach the partition for `month`.
+
+    Rows that already landed in the default partition for that month are moved
+    into the new partition first, otherwise ATTACH would refuse the range.
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {qn(table + '_default')}
+                WHERE {qn(column)} >= %s AND {qn(column)} < %s
+                RETURNING *
+            )
+            INSERT INTO {qn(name)} SELECT * FROM moved
+            """,
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+    return name
+
+
+def ensure_partitions(connection, table, column, start, end):
+    """Make sure a partition exists for every month from `start` to `end` inclusive."""
+    existing = {month for _, month in list_partitions(connection, table)}
+    created = []
+    month = month_start(start)
+    while month <= end:
+        if month not in existing:
+            created.append(create_month_partition(connection, table, column, month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions_before(connection, table, cutoff, detach_only=False):
+    """
+    Drop (or just detach) every monthly partition that ends on or before `cutoff`.
+
+    Detached partitions stay around as ordinary tables so they can be dumped or
+    moved to cheaper storage before being dropped by hand.
+    """
+    qn = connection.ops.quote_name
+    removed = []
+    with connection.cursor() as cursor:
+        for name, month in list_partitions(connection, table):
+            if add_months(month, 1) > month_start(cutoff):
+                break
+            if detach_only:
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+            else:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+            removed.append(name)
+    return removed
+
+
+def move_partitions_before(connection, table, cutoff, tablespace):
+    """
+    Move every monthly partition that ends on or before `cutoff` to `tablespace`.
+
+    The partitions stay attached and queryable; SET TABLESPACE rewrites each one
+    (and its indexes) under an exclusive lock on that partition only. Partitions already in the
+    tablespace are skipped.
+    """
+    qn = connection.ops.quote_name
+    moved = []
+    with connection.cursor() as cursor:
+        for name, month in list_partitions(connection, table):
+            if add_months(month, 1) > month_start(cutoff):
+                break
+            cursor.execute("SELECT tablespace FROM pg_tables WHERE tablename = %s", [name])
+            row = cursor.fetchone()
+            if row and row[0] == tablespace:
+                continue
+            cursor.execute(f"ALTER TABLE {qn(name)} SET TABLESPACE {qn(tablespace)}")
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [name])
+            for (index,) in cursor.fetchall():
+                cursor.execute(f"ALTER INDEX {qn(index)} SET TABLESPACE {qn(tablespace)}")
+            moved.append(name)
+    return moved
+
+
+def convert_to_partitioned(connection, table, column, months_ahead=3):
+    """
+    Rebuild an existing plain table as a monthly range-partitioned table.
+
+    The primary key becomes (id, column) because Postgres requires the partition
+    key in every unique constraint; ids keep coming from a sequence owned by the
+    new table. A BRIN index on the partition key keeps range scans inside a
+    partition cheap without the size of a btree on an append-only column.
+    """
+    qn = connection.ops.quote_name
+    legacy = f"{table}_legacy"
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        )
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        cursor.execute(f"CREATE INDEX {qn(table + '_' + column + '_brin')} ON {qn(table)} USING brin ({qn(column)})")
+        cursor.execute(f"SELECT MIN({qn(column)}) FROM {qn(legacy)}")
+        oldest = cursor.fetchone()[0]
+
+    today = month_start(localdate())
+    ensure_partitions(connection, table, column, month_start(oldest) if oldest else today, add_months(today, months_ahead))
+
+    sequence = f"{table}_id_seq"
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {qn(table)}")
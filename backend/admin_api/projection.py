@@ -0,0 +1,305 @@
+# admin_api/projection.py
+"""
+Keeps AdminDoctor / AdminPatient / AdminAppointment in sync with the doctor and
+patients apps.
+
+Writes to the source models add an AdminOutboxEvent row in the same
+transaction (see admin_api/signals.py). `project_admin_models` drains the
+outbox in id order, re-reads the current state of every source row an event
+names and applies it to the admin read model, so events are idempotent and
+only need to say *which* row changed. `verify_admin_projection` compares both
+sides in id-range chunks by hash and only diffs the chunks that disagree.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from doctor.models import Appointment, Doctor
+from patients.models import Patient
+from .models import (
+    AdminAppointment,
+    AdminDoctor,
+    AdminOutboxEvent,
+    AdminPatient,
+    AdminProjectionCheckpoint,
+    AdminSpecialty,
+)
+
+CHECKPOINT_NAME = 'admin_projection'
+
+
+def _display_name(user):
+    return user.get_full_name() or user.username
+
+
+def _email(user, source):
+    return (user.email or f"{source}-user-{user.pk}@users.invalid").lower()
+
+
+class Projection:
+    """One source model -> admin read model mapping."""
+    name = None
+    source_model = None
+    target_model = None
+    target_fields = ()
+
+    def source_queryset(self):
+        return self.source_model.objects.all()
+
+    def source_row(self, obj):
+        """The projected values of `obj`, in the same order as `target_fields`."""
+        raise NotImplementedError
+
+    def to_target(self, row, context):
+        """Turn a source row into model field values for the target."""
+        raise NotImplementedError
+
+    def prepare(self, rows):
+        return {}
+
+    def adopt(self, values):
+        """An unlinked target row the new projection should take over, if any."""
+        return None
+
+    def fix_conflicts(self, source_id, values):
+        pass
+
+    def sync(self, ids):
+        """Bring the target rows for the given source ids up to date."""
+        ids = set(ids)
+        sources = {obj.pk: self.source_row(obj) for obj in self.source_queryset().filter(pk__in=ids)}
+        existing = {row.source_id: row for row in self.target_model.objects.filter(source_id__in=ids)}
+
+        removed, _ = self.target_model.objects.filter(source_id__in=ids - set(sources)).delete()
+        written = 0
+        context = self.prepare(sources.values())
+        for source_id, row in sources.items():
+            values = self.to_target(row, context)
+            target = existing.get(source_id) or self.adopt(values) or self.target_model()
+            if target.source_id == source_id and all(getattr(target, k) == v for k, v in values.items()):
+                continue
+            self.fix_conflicts(source_id, values)
+            target.source_id = source_id
+            for key, value in values.items():
+                setattr(target, key, value)
+            target.save()
+            written += 1
+        return written, removed
+
+    def remove_orphans(self):
+        return self.target_model.objects.filter(source_id__isnull=False).exclude(
+            source_id__in=self.source_model.objects.values('pk')
+        ).delete()[0]
+
+    def source_rows_between(self, low, high):
+        queryset = self.source_queryset().filter(pk__gt=low).order_by('pk')
+        if high is not None:
+            queryset = queryset.filter(pk__lte=high)
+        return [(obj.pk, *self.source_row(obj)) for obj in queryset]
+
+    def target_rows_between(self, low, high):
+        queryset = self.target_model.objects.filter(source_id__gt=low).order_by('source_id')
+        if high is not None:
+            queryset = queryset.filter(source_id__lte=high)
+        return [tuple(row) for row in queryset.values_list('source_id', *self.target_fields)]
+
+
+class PersonProjection(Projection):
+    """Doctors and patients: admin rows are unique by email."""
+
+    def adopt(self, values):
+        return self.target_model.objects.filter(email=values['email'], source_id__isnull=True).first()
+
+    def fix_conflicts(self, source_id, values):
+        # Two accounts sharing an email can't both hold the unique admin email;
+        # the later one gets a placeholder and shows up as drift in verification.
+        if self.target_model.objects.filter(email=values['email']).exclude(source_id=source_id).exists():
+            values['email'] = f"{self.name}-{source_id}@projection.invalid"
+
+
+class DoctorProjection(PersonProjection):
+    name = 'doctor'
+    source_model = Doctor
+    target_model = AdminDoctor
+    target_fields = ('name', 'email', 'phone', 'specialty__name', 'bio')
+
+    def source_queryset(self):
+        return Doctor.objects.select_related('user')
+
+    def source_row(self, doctor):
+        return (
+            _display_name(doctor.user),
+            _email(doctor.user, self.name),
+            doctor.phone[:15],
+            doctor.specialization or None,
+            doctor.bio,
+        )
+
+    def prepare(self, rows):
+        names = {row[3] for row in rows if row[3]}
+        specialties = dict(AdminSpecialty.objects.filter(name__in=names).values_list('name', 'id'))
+        for name in names - set(specialties):
+            specialties[name] = AdminSpecialty.objects.create(name=name).id
+        return {'specialties': specialties}
+
+    def to_target(self, row, context):
+        name, email, phone, specialty, bio = row
+        return {
+            'name': name,
+            'email': email,
+            'phone': phone,
+            'specialty_id': context['specialties'].get(specialty),
+            'bio': bio,
+        }
+
+
+class PatientProjection(PersonProjection):
+    name = 'patient'
+    source_model = Patient
+    target_model = AdminPatient
+    target_fields = ('name', 'email', 'phone', 'date_of_birth', 'address')
+
+    def source_queryset(self):
+        return Patient.objects.select_related('user')
+
+    def source_row(self, patient):
+        return (
+            _display_name(patient.user),
+            _email(patient.user, self.name),
+            patient.phone[:15],
+            patient.date_of_birth,
+            patient.address,
+        )
+
+    def to_target(self, row, context):
+        return dict(zip(self.target_fields, row))
+
+
+class AppointmentProjection(Projection):
+    name = 'appointment'
+    source_model = Appointment
+    target_model = AdminAppointment
+    target_fields = ('doctor__source_id', 'patient__source_id', 'date', 'time', 'reason')
+
+    def source_row(self, appointment):
+        when = timezone.localtime(appointment.date) if timezone.is_aware(appointment.date) else appointment.date
+        return (appointment.doctor_id, appointment.patient_id, when.date(), when.time(), appointment.notes)
+
+    def prepare(self, rows):
+        rows = list(rows)
+        return {
+            'doctors': self._admin_ids(DOCTORS, {row[0] for row in rows}),
+            'patients': self._admin_ids(PATIENTS, {row[1] for row in rows}),
+        }
+
+    def _admin_ids(self, projection, source_ids):
+        known = dict(projection.target_model.objects.filter(source_id__in=source_ids).values_list('source_id', 'id'))
+        missing = source_ids - set(known)
+        if missing:
+            projection.sync(missing)
+            known.update(projection.target_model.objects.filter(source_id__in=missing).values_list('source_id', 'id'))
+        return known
+
+    def to_target(self, row, context):
+        doctor_id, patient_id, date, time, notes = row
+        return {
+            'doctor_id': context['doctors'][doctor_id],
+            'patient_id': context['patients'][patient_id],
+            'date': date,
+            'time': time,
+            'reason': notes,
+        }
+
+
+DOCTORS = DoctorProjection()
+PATIENTS = PatientProjection()
+APPOINTMENTS = AppointmentProjection()
+
+# Apply order matters: appointments point at the doctor and patient rows.
+PROJECTIONS = {projection.name: projection for projection in (DOCTORS, PATIENTS, APPOINTMENTS)}
+
+
+def enqueue(source, ids):
+    AdminOutboxEvent.objects.bulk_create(
+        [AdminOutboxEvent(source=source, source_id=source_id) for source_id in ids]
+    )
+
+
+def drain(batch_size=500):
+    """Apply one batch of outbox events. Returns the number of events consumed."""
+    with transaction.atomic():
+        events = list(
+            AdminOutboxEvent.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', 'source', 'source_id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        ids_by_source = {}
+        for _, source, source_id in events:
+            ids_by_source.setdefault(source, set()).add(source_id)
+        for name, projection in PROJECTIONS.items():
+            if name in ids_by_source:
+                projection.sync(ids_by_source[name])
+
+        event_ids = [event[0] for event in events]
+        AdminOutboxEvent.objects.filter(id__in=event_ids).delete()
+        checkpoint, _ = AdminProjectionCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        checkpoint.last_event_id = max(checkpoint.last_event_id, event_ids[-1])
+        checkpoint.events_applied = F('events_applied') + len(event_ids)
+        checkpoint.save()
+    return len(events)
+
+
+def backfill(projection, chunk_size=1000):
+    """Project every source row in primary-key chunks, then drop orphaned targets."""
+    last = 0
+    written = 0
+    while True:
+        ids = list(
+            projection.source_model.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            written += projection.sync(ids)[0]
+        last = ids[-1]
+    return written, projection.remove_orphans()
+
+
+def _digest(rows):
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def find_drift(projection, chunk_size=1000):
+    """
+    Yield source ids whose admin row is missing, stale or orphaned.
+
+    Both sides are hashed per chunk of source ids; rows are only compared
+    individually inside chunks whose hashes differ. Chunks are (low, high]
+    ranges over the source ids, and the last one is open-ended so orphaned
+    targets past the newest source row are caught too.
+    """
+    low = 0
+    while True:
+        ids = list(
+            projection.source_model.objects.filter(pk__gt=low).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        high = ids[-1] if len(ids) == chunk_size else None
+        source_rows = projection.source_rows_between(low, high)
+        target_rows = projection.target_rows_between(low, high)
+        if _digest(source_rows) != _digest(target_rows):
+            expected = {row[0]: row for row in source_rows}
+            actual = {row[0]: row for row in target_rows}
+            for source_id in sorted(expected.keys() | actual.keys()):
+                if expected.get(source_id) != actual.get(source_id):
+                    yield source_id
+        if high is None:
+            return
+        low = high
@@ -0,0 +1,86 @@
+# admin_api/reference_data.py
+"""
+Reference data every screen needs: specialties, the model choice lists and
+the active system alerts, as one versioned JSON document. It comes in two
+variants: the public one, served before login, holds only the lookup values;
+the signed-in one adds the alerts.
+
+Each variant is rendered once and kept in process memory. Writes to
+AdminSpecialty or AdminSystemAlert drop the variants they appear in when they
+commit (see signals.py); REFERENCE_DATA_TTL bounds how stale another worker
+process, or a bulk update that sends no signals, can leave them. `version` is
+the ETag, so a client that keeps the document for its session revalidates
+with one 304.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from doctor.models import Appointment, Doctor, DoctorAvailability
+from patients.models import Patient
+
+from .models import AdminSpecialty, AdminSystemAlert
+
+# payload key -> model field whose choices are published
+CHOICE_FIELDS = {
+    'specialization': (Doctor, 'specialization'),
+    'appointment_status': (Appointment, 'status'),
+    'weekday': (DoctorAvailability, 'day'),
+    'gender': (Patient, 'gender'),
+    'role': (get_user_model(), 'role'),
+}
+
+
+class Document(NamedTuple):
+    content: bytes
+    etag: str
+    expires: float
+
+
+PUBLIC = 'public'
+SIGNED_IN = 'signed_in'
+AUDIENCES = (PUBLIC, SIGNED_IN)
+
+_lock = threading.Lock()
+_documents = {}  # audience -> Document
+
+
+def build(audience=PUBLIC):
+    data = {
+        'specialties': list(AdminSpecialty.objects.order_by('name').values('id', 'name')),
+        'choices': {
+            key: [{'value': value, 'label': str(label)} for value, label in model._meta.get_field(name).choices]
+            for key, (model, name) in CHOICE_FIELDS.items()
+        },
+    }
+    if audience == SIGNED_IN:
+        alerts = AdminSystemAlert.objects.filter(is_active=True).order_by('-created_at')
+        data['alerts'] = list(alerts.values('id', 'title', 'message', 'created_at'))
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    version = hashlib.sha1(body.encode()).hexdigest()[:16]
+    # `version` goes first so clients can read it without parsing the rest.
+    content = f'{{"version":"{version}",{body[1:]}'.encode()
+    return Document(content, f'"{version}"', time.monotonic() + settings.REFERENCE_DATA_TTL)
+
+
+def get(audience=PUBLIC):
+    document = _documents.get(audience)
+    if document is None or document.expires <= time.monotonic():
+        with _lock:
+            document = _documents.get(audience)
+            if document is None or document.expires <= time.monotonic():
+                document = _documents[audience] = build(audience)
+    return document
+
+
+def invalidate(audiences=AUDIENCES):
+    # Under the lock, so a build already running is dropped once it is stored.
+    with _lock:
+        for audience in audiences:
+            _documents.pop(audience, None)
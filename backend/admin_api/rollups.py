@@ -0,0 +1,104 @@
+# admin_api/rollups.py
+"""
+Day x doctor x specialization x status appointment counts for the admin dashboard.
+
+Each appointment write recomputes only the (doctor, day) buckets it touched,
+so the rollup stays current without rescanning the appointment table. The
+fresh counts are upserted and only the rows that dropped to zero deleted, so
+two commits refreshing the same bucket never insert the same row twice; on
+PostgreSQL an advisory lock per bucket also keeps the later commit's counts.
+Anything that bypasses model signals (queryset.update(), raw SQL, loaddata)
+is corrected by the `rebuild_appointment_rollups` command.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from doctor.models import Appointment
+from .models import AdminAppointmentDailyStat
+
+
+def bucket_for(doctor_id, value):
+    """Return the (doctor_id, day) bucket for an appointment datetime, or None."""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if doctor_id is None or value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return (doctor_id, value.date())
+
+
+def _day_range(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.combine(start, time.min, tzinfo=tz),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+    )
+
+
+def _counts(appointments):
+    return (
+        appointments
+        .annotate(day=TruncDate('date'))
+        .values('day', 'doctor_id', 'doctor__specialization', 'status')
+        .annotate(total=Count('id'))
+    )
+
+
+def _stat_rows(counts):
+    return [
+        AdminAppointmentDailyStat(
+            day=row['day'],
+            doctor_id=row['doctor_id'],
+            specialization=row['doctor__specialization'] or '',
+            status=row['status'],
+            count=row['total'],
+        )
+        for row in counts
+    ]
+
+
+UNIQUE_FIELDS = ['day', 'doctor', 'specialization', 'status']
+
+
+def _lock_bucket(doctor_id, day):
+    # Held until commit, so the counts read next include any refresh that got here first.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [doctor_id, day.toordinal()])
+
+
+@transaction.atomic
+def refresh_bucket(doctor_id, day):
+    """Recompute the rollup rows for one doctor on one day."""
+    _lock_bucket(doctor_id, day)
+    start, end = _day_range(day, day)
+    appointments = Appointment.objects.filter(doctor_id=doctor_id, date__gte=start, date__lt=end)
+    rows = _stat_rows(_counts(appointments))
+    AdminAppointmentDailyStat.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=UNIQUE_FIELDS, update_fields=['count'],
+    )
+    emptied = AdminAppointmentDailyStat.objects.filter(doctor_id=doctor_id, day=day)
+    for row in rows:
+        emptied = emptied.exclude(Q(specialization=row.specialization, status=row.status))
+    emptied.delete()
+
+
+def refresh_buckets(buckets):
+    for doctor_id, day in {bucket for bucket in buckets if bucket}:
+        refresh_bucket(doctor_id, day)
+
+
+@transaction.atomic
+def rebuild(start, end):
+    """Recompute every rollup row between `start` and `end` (dates, inclusive)."""
+    range_start, range_end = _day_range(start, end)
+    deleted, _ = AdminAppointmentDailyStat.objects.filter(day__gte=start, day__lte=end).delete()
+    appointments = Appointment.objects.filter(date__gte=range_start, date__lt=range_end)
+    created = AdminAppointmentDailyStat.objects.bulk_create(_stat_rows(_counts(appointments)), batch_size=1000)
+    return deleted, len(created)
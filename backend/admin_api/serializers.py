@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from accounts.sparse_fields import SparseFieldsetSerializerMixin
+
 from .models import (
     AdminDoctor,
     AdminPatient,
@@ -10,37 +12,37 @@ from .models import (
     AdminActivityLog
 )
 
-class AdminDoctorSerializer(serializers.ModelSerializer):
+class AdminDoctorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminDoctor
         fields = '__all__'
 
-class AdminPatientSerializer(serializers.ModelSerializer):
+class AdminPatientSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminPatient
         fields = '__all__'
 
-class AdminAppointmentSerializer(serializers.ModelSerializer):
+class AdminAppointmentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminAppointment
         fields = '__all__'
 
-class AdminSpecialtySerializer(serializers.ModelSerializer):
+class AdminSpecialtySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminSpecialty
         fields = '__all__'
 
-class AdminSystemAlertSerializer(serializers.ModelSerializer):
+class AdminSystemAlertSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminSystemAlert
         fields = '__all__'
 
-class AdminNotificationSerializer(serializers.ModelSerializer):
+class AdminNotificationSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminNotification
         fields = '__all__'
 
-class AdminActivityLogSerializer(serializers.ModelSerializer):
+class AdminActivityLogSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = AdminActivityLog
         fields = '__all__'
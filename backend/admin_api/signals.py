@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from doctor.models import Appointment, Doctor
+from patients.models import Patient
+from . import projection, reference_data, rollups
+from .models import AdminSpecialty, AdminSystemAlert
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_bucket(sender, instance, **kwargs):
+    """
+    Keep the bucket the appointment was loaded with, so a save that moves it to
+    another doctor or day also refreshes the bucket it left.
+    Reads __dict__ directly to avoid loading deferred fields.
+    """
+    instance._rollup_bucket = rollups.bucket_for(
+        instance.__dict__.get('doctor_id'), instance.__dict__.get('date')
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_rollup(sender, instance, **kwargs):
+    buckets = [instance._rollup_bucket, rollups.bucket_for(instance.doctor_id, instance.date)]
+    instance._rollup_bucket = buckets[1]
+    transaction.on_commit(lambda: rollups.refresh_buckets(buckets))
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_appointment_from_rollup(sender, instance, **kwargs):
+    buckets = [instance._rollup_bucket, rollups.bucket_for(instance.doctor_id, instance.date)]
+    transaction.on_commit(lambda: rollups.refresh_buckets(buckets))
+
+
+# Change capture: one outbox row per write, committed with the write itself.
+# The projector re-reads the source row, so the event only names it.
+OUTBOX_SOURCES = {Doctor: 'doctor', Patient: 'patient', Appointment: 'appointment'}
+
+
+def capture_change(sender, instance, **kwargs):
+    projection.enqueue(OUTBOX_SOURCES[sender], [instance.pk])
+
+
+for model in OUTBOX_SOURCES:
+    post_save.connect(capture_change, sender=model, dispatch_uid=f'admin_outbox_save_{model.__name__}')
+    post_delete.connect(capture_change, sender=model, dispatch_uid=f'admin_outbox_delete_{model.__name__}')
+
+
+# Doctor and patient names and emails live on the user.
+PROJECTED_USER_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def projected_user_values(user):
+    # __dict__ so deferred fields are not loaded
+    return tuple(user.__dict__.get(name) for name in PROJECTED_USER_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_projected_user_values(sender, instance, **kwargs):
+    instance._projected_user_values = projected_user_values(instance)
+
+
+@receiver(post_save, sender=User)
+def capture_user_change(sender, instance, created, **kwargs):
+    """
+    Queue the user's doctor or patient profile when a projected field changed,
+    so saves like update_last_login's add nothing to the outbox. A new user's
+    profile is captured when the profile itself is saved.
+    """
+    values = projected_user_values(instance)
+    changed, instance._projected_user_values = values != instance._projected_user_values, values
+    if created or not changed:
+        return
+    projection.enqueue('doctor', Doctor.objects.filter(user=instance).values_list('pk', flat=True))
+    projection.enqueue('patient', Patient.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+def invalidate_reference_data(sender, **kwargs):
+    transaction.on_commit(reference_data.invalidate)
+
+
+def invalidate_alerts(sender, **kwargs):
+    # Only the signed-in variant carries alerts.
+    transaction.on_commit(lambda: reference_data.invalidate([reference_data.SIGNED_IN]))
+
+
+post_save.connect(invalidate_reference_data, sender=AdminSpecialty, dispatch_uid='reference_data_save_AdminSpecialty')
+post_delete.connect(invalidate_reference_data, sender=AdminSpecialty, dispatch_uid='reference_data_delete_AdminSpecialty')
+post_save.connect(invalidate_alerts, sender=AdminSystemAlert, dispatch_uid='reference_data_save_AdminSystemAlert')
+post_delete.connect(invalidate_alerts, sender=AdminSystemAlert, dispatch_uid='reference_data_delete_AdminSystemAlert')
@@ -0,0 +1,246 @@
+# admin_api/slow_queries.py
+"""
+Slow-query capture.
+
+Every database connection gets an execute wrapper (installed on
+connection_created, see apps.py). Statements slower than
+SLOW_QUERY_THRESHOLD_MS are fingerprinted, with literals and IN / VALUES list
+lengths normalized away, and handed to a background thread together with the
+view being served and a short summary of the project frames on the stack.
+
+The thread aggregates what it receives and upserts AdminSlowQuery rows every
+SLOW_QUERY_FLUSH_SECONDS. The first time a fingerprint is seen it also stores
+a plan: EXPLAIN (ANALYZE, BUFFERS) for SELECTs, plain EXPLAIN for anything
+that writes, EXPLAIN QUERY PLAN on SQLite. Plans run in a transaction that is
+rolled back, under SLOW_QUERY_EXPLAIN_TIMEOUT_MS, and the literals EXPLAIN
+copies from the parameters into conditions are scrubbed before the plan is
+stored, as they are from the SQL.
+
+Statements wait for the thread in a queue of at most SLOW_QUERY_QUEUE_SIZE;
+when it is full they are dropped (and counted) rather than held in memory.
+
+`manage.py slow_queries` lists the top offenders.
+"""
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_current_view = ContextVar('slow_query_view', default='')
+_local = threading.local()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_SPACE_RE = re.compile(r'\s+')
+_PLAN_CONDITION_RE = re.compile(
+    r'^(\s*(?:(?:Index|Recheck|Hash|Merge|TID) Cond|(?:Join |One-Time )?Filter): )(.*)$', re.MULTILINE,
+)
+
+
+def normalize(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub(r'\1, ...', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def scrub_plan(plan):
+    """Replace parameter values in a plan; costs, row counts and timings are kept."""
+    plan = _STRING_RE.sub("'?'", plan)
+    return _PLAN_CONDITION_RE.sub(lambda match: match.group(1) + _NUMBER_RE.sub('?', match.group(2)), plan)
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def stack_summary(limit=6):
+    """The innermost app frames: no site-packages, manage.py, project middleware or this module."""
+    base = str(settings.BASE_DIR)
+    skipped = (str(settings.BASE_DIR / 'manage.py'), str(settings.BASE_DIR / 'medical_project'), __file__)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base) and 'site-packages' not in frame.filename
+        and not frame.filename.startswith(skipped)
+    ]
+    return '\n'.join(
+        f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}" for frame in frames[-limit:]
+    )
+
+
+def view_label(view_func):
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return f"{view.__module__}.{getattr(view, '__qualname__', view.__class__.__name__)}"
+
+
+class Recorder:
+    """Aggregates slow statements off the request path and flushes them to the database."""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=settings.SLOW_QUERY_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self.run, name='slow-query-recorder', daemon=True)
+                    self._thread.start()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1  # not exact across threads; only reported
+
+    def run(self):
+        _local.internal = True
+        pending = {}
+        next_flush = time.monotonic() + settings.SLOW_QUERY_FLUSH_SECONDS
+        while True:
+            try:
+                item = self.queue.get(timeout=max(next_flush - time.monotonic(), 0))
+            except queue.Empty:
+                pass
+            else:
+                self.merge(pending, item)
+            if time.monotonic() >= next_flush:
+                if pending:
+                    self.flush(pending)
+                    pending = {}
+                if self.dropped:
+                    dropped, self.dropped = self.dropped, 0
+                    logger.warning("Dropped %d slow statement(s): the recorder queue was full", dropped)
+                next_flush = time.monotonic() + settings.SLOW_QUERY_FLUSH_SECONDS
+
+    @staticmethod
+    def merge(pending, item):
+        entry = pending.get(item['fingerprint'])
+        if entry is None:
+            pending[item['fingerprint']] = dict(item, calls=1, total_ms=item['ms'], max_ms=item['ms'])
+            return
+        entry['calls'] += 1
+        entry['total_ms'] += item['ms']
+        entry['max_ms'] = max(entry['max_ms'], item['ms'])
+        entry['view'], entry['stack'] = item['view'], item['stack']
+
+    def flush(self, pending):
+        from .models import AdminSlowQuery
+
+        try:
+            for key, entry in pending.items():
+                changes = {
+                    'calls': F('calls') + entry['calls'],
+                    'total_ms': F('total_ms') + entry['total_ms'],
+                    'max_ms': Greatest(F('max_ms'), entry['max_ms']),
+                    'last_view': entry['view'][:200],
+                    'last_stack': entry['stack'],
+                    'last_seen': timezone.now(),
+                }
+                if AdminSlowQuery.objects.filter(fingerprint=key).update(**changes):
+                    continue
+                plan = explain(entry['database'], entry['raw_sql'], entry['params']) if settings.SLOW_QUERY_EXPLAIN else ''
+                try:
+                    with transaction.atomic():
+                        AdminSlowQuery.objects.create(
+                            fingerprint=key, sql=entry['sql'], database=entry['database'],
+                            calls=entry['calls'], total_ms=entry['total_ms'], max_ms=entry['max_ms'],
+                            last_view=entry['view'][:200], last_stack=entry['stack'], plan=plan,
+                        )
+                except IntegrityError:
+                    # Another process recorded it first.
+                    AdminSlowQuery.objects.filter(fingerprint=key).update(**changes)
+        except Exception:
+            logger.exception("Could not store slow queries")
+        finally:
+            connections.close_all()
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    if params is None and '%s' in sql:
+        return ''
+    if connection.vendor == 'postgresql':
+        analyze = sql.lstrip().split(None, 1)[0].upper() == 'SELECT' and 'FOR UPDATE' not in sql.upper()
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return ''
+    try:
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+            transaction.set_rollback(True, using=alias)
+    except Exception as exc:
+        return f"EXPLAIN failed: {exc}"
+    return scrub_plan('\n'.join(str(row[-1]) for row in rows))
+
+
+recorder = Recorder()
+
+
+def capture(execute, sql, params, many, context):
+    if getattr(_local, 'internal', False) or settings.SLOW_QUERY_THRESHOLD_MS is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            normalized = normalize(sql)
+            recorder.submit({
+                'fingerprint': fingerprint(normalized),
+                'sql': normalized,
+                'raw_sql': sql,
+                # executemany batches are not explained
+                'params': None if many else (tuple(params) if params is not None else None),
+                'database': context['connection'].alias,
+                'ms': elapsed_ms,
+                'view': _current_view.get(),
+                'stack': stack_summary(),
+            })
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver; the same wrapper object sees every reconnect."""
+    if capture not in connection.execute_wrappers:
+        # First, not last: the connection can open inside a scoped execute_wrapper()
+        # (see metrics.py), which pops whatever is last when it exits.
+        connection.execute_wrappers.insert(0, capture)
+
+
+class SlowQueryMiddleware:
+    """Tags slow queries with the view (or, before resolution, the path) being served."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_view.set(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_view.set(view_label(view_func))
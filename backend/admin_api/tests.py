@@ -1,3 +1,534 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from doctor.models import Appointment
+from . import partitions, projection, reference_data, rollups, slow_queries
+from .models import (
+    AdminActivityLog,
+    AdminAppointment,
+    AdminAppointmentDailyStat,
+    AdminDoctor,
+    AdminNotification,
+    AdminOutboxEvent,
+    AdminPatient,
+    AdminProjectionCheckpoint,
+    AdminSpecialty,
+    AdminSystemAlert,
+)
+
+User = get_user_model()
+
+
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user('admin-user', password='x', role='admin'))
+    return client
+
+
+def make_doctor(username, specialization='Dentist'):
+    return User.objects.create_user(username, password='x', role='doctor', specialization=specialization).doctor
+
+
+def make_patient(username):
+    return User.objects.create_user(username, password='x', role='patient').patient_profile
+
+
+class PartitionHelperTests(TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(partitions.month_start(date(2024, 2, 29)), date(2024, 2, 1))
+        self.assertEqual(partitions.add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(partitions.add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(partitions.add_months(date(2024, 1, 1), -13), date(2022, 12, 1))
+
+    def test_partition_name_round_trips(self):
+        name = partitions.partition_name('admin_api_adminactivitylog', date(2024, 3, 1))
+        self.assertEqual(name, 'admin_api_adminactivitylog_p2024_03')
+        match = partitions.PARTITION_SUFFIX_RE.search(name)
+        self.assertEqual((int(match.group(1)), int(match.group(2))), (2024, 3))
+
+    def test_ensure_and_drop_partitions(self):
+        if not partitions.is_supported(connection):
+            self.skipTest('Partitioning needs PostgreSQL.')
+        table, column = 'admin_api_adminnotification', 'created_at'
+        start = partitions.add_months(partitions.month_start(timezone.localdate()), -30)
+        created = partitions.ensure_partitions(connection, table, column, start, partitions.add_months(start, 1))
+        self.assertEqual(created, [
+            partitions.partition_name(table, start),
+            partitions.partition_name(table, partitions.add_months(start, 1)),
+        ])
+        self.assertEqual(partitions.ensure_partitions(connection, table, column, start, start), [])
+        removed = partitions.drop_partitions_before(connection, table, partitions.add_months(start, 1))
+        self.assertEqual(removed, [partitions.partition_name(table, start)])
+
+
+class PruneAdminLogsTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=800)
+        for model, field in ((AdminActivityLog, 'timestamp'), (AdminNotification, 'created_at')):
+            if model is AdminActivityLog:
+                kwargs = {'action': 'a', 'performed_by': 'b'}
+            else:
+                kwargs = {'recipient_email': 'a@b.c', 'message': 'm'}
+            model.objects.create(**kwargs)
+            stale = model.objects.create(**kwargs)
+            # auto_now_add ignores the value on create
+            model.objects.filter(pk=stale.pk).update(**{field: old})
+
+    def test_deletes_rows_past_retention(self):
+        if partitions.is_supported(connection):
+            self.skipTest('PostgreSQL drops partitions instead.')
+        out = StringIO()
+        call_command('prune_admin_logs', months=12, stdout=out)
+        self.assertEqual(AdminActivityLog.objects.count(), 1)
+        self.assertEqual(AdminNotification.objects.count(), 1)
+        self.assertIn('Deleted 1 activity log(s) and 1 notification(s)', out.getvalue())
+
+    def test_dry_run_keeps_rows(self):
+        call_command('prune_admin_logs', months=12, dry_run=True, stdout=StringIO())
+        self.assertEqual(AdminActivityLog.objects.count(), 2)
+
+
+@override_settings(RATE_LIMITS={})
+class ActivityLogListTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        old = AdminActivityLog.objects.create(action='old', performed_by='x')
+        AdminActivityLog.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=90))
+        AdminActivityLog.objects.create(action='new', performed_by='x')
+
+    def actions(self, query=''):
+        response = self.client.get(f'/api/admin/activity-logs/{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['action'] for row in response.json()['results']]
+
+    def test_paged_by_default(self):
+        self.assertEqual(self.actions(), ['new', 'old'])
+        self.assertEqual(self.actions('?page_size=1'), ['new'])
+
+    def test_cursor_walks_rows_sharing_a_timestamp(self):
+        at = timezone.now() - timedelta(days=1)
+        for index in range(5):
+            log = AdminActivityLog.objects.create(action=f'same-{index}', performed_by='x')
+            AdminActivityLog.objects.filter(pk=log.pk).update(timestamp=at)
+
+        seen = []
+        url = '/api/admin/activity-logs/?page_size=2&fields=action'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [row['action'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, ['new', *(f'same-{index}' for index in range(5)), 'old'])
+
+    def test_sparse_page_reads_the_cursor_column_up_front(self):
+        for index in range(4):
+            AdminActivityLog.objects.create(action=f'extra-{index}', performed_by='x')
+        with self.assertNumQueries(1):
+            self.actions('?page_size=3&fields=action')
+
+    def test_days_and_since(self):
+        self.assertEqual(self.actions('?days=30'), ['new'])
+        since = (timezone.now() - timedelta(days=100)).date().isoformat()
+        self.assertEqual(self.actions(f'?since={since}'), ['new', 'old'])
+
+    def test_bad_days(self):
+        self.assertEqual(self.client.get('/api/admin/activity-logs/?days=x').status_code, 400)
+
+
+class AppointmentRollupTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doc')
+        self.patient = make_patient('pat')
+        self.day = timezone.localdate() - timedelta(days=3)
+        self.at = timezone.make_aware(datetime.combine(self.day, time(10)))
+
+    def book(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient, date=kwargs.pop('date', self.at), **kwargs,
+            )
+
+    def counts(self):
+        return {
+            (row.day, row.doctor_id, row.specialization, row.status): row.count
+            for row in AdminAppointmentDailyStat.objects.all()
+        }
+
+    def test_writes_update_their_buckets(self):
+        first = self.book()
+        self.book(status='approved')
+        self.book()
+        self.assertEqual(self.counts(), {
+            (self.day, self.doctor.pk, 'Dentist', 'pending'): 2,
+            (self.day, self.doctor.pk, 'Dentist', 'approved'): 1,
+        })
+
+        # Moving an appointment refreshes the bucket it left as well as the new one.
+        first.date += timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        next_day = self.day + timedelta(days=1)
+        self.assertEqual(self.counts(), {
+            (self.day, self.doctor.pk, 'Dentist', 'pending'): 1,
+            (self.day, self.doctor.pk, 'Dentist', 'approved'): 1,
+            (next_day, self.doctor.pk, 'Dentist', 'pending'): 1,
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertNotIn((next_day, self.doctor.pk, 'Dentist', 'pending'), self.counts())
+
+    def test_rebuild_matches_the_appointment_table(self):
+        appointment = self.book()
+        self.book()
+        # update() bypasses the signals, so the rollup goes stale until rebuilt.
+        Appointment.objects.filter(pk=appointment.pk).update(status='rejected')
+        self.assertEqual(self.counts(), {(self.day, self.doctor.pk, 'Dentist', 'pending'): 2})
+
+        call_command('rebuild_appointment_rollups', stdout=StringIO())
+        self.assertEqual(self.counts(), {
+            (self.day, self.doctor.pk, 'Dentist', 'pending'): 1,
+            (self.day, self.doctor.pk, 'Dentist', 'rejected'): 1,
+        })
+        self.assertEqual(rollups.rebuild(self.day, self.day), (2, 2))
+
+    def test_refresh_upserts_over_a_concurrent_refresh(self):
+        self.book()
+        with self.captureOnCommitCallbacks(execute=False):
+            Appointment.objects.create(doctor=self.doctor, patient=self.patient, date=self.at)
+        counts = rollups._counts
+
+        def racing(appointments):
+            # Another commit's refresh inserts the row after this one has started.
+            AdminAppointmentDailyStat.objects.filter(day=self.day).delete()
+            AdminAppointmentDailyStat.objects.create(
+                day=self.day, doctor=self.doctor, specialization='Dentist', status='pending', count=1,
+            )
+            return counts(appointments)
+
+        with mock.patch.object(rollups, '_counts', racing):
+            rollups.refresh_bucket(self.doctor.pk, self.day)
+        self.assertEqual(self.counts(), {(self.day, self.doctor.pk, 'Dentist', 'pending'): 2})
+
+    def test_bucket_for_uses_local_day(self):
+        self.assertEqual(rollups.bucket_for(self.doctor.pk, self.at), (self.doctor.pk, self.day))
+        self.assertEqual(rollups.bucket_for(self.doctor.pk, self.at.isoformat()), (self.doctor.pk, self.day))
+        self.assertIsNone(rollups.bucket_for(None, self.at))
+
+
+
+class ConcurrentRollupTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Needs concurrent writers (PostgreSQL).')
+
+    def test_concurrent_refreshes_of_one_bucket(self):
+        doctor, patient = make_doctor('doc'), make_patient('pat')
+        day = timezone.localdate() - timedelta(days=3)
+        Appointment.objects.bulk_create(
+            Appointment(doctor=doctor, patient=patient, date=timezone.make_aware(datetime.combine(day, time(9 + hour))))
+            for hour in range(4)
+        )
+        barrier, errors = threading.Barrier(8), []
+
+        def refresh():
+            try:
+                barrier.wait()
+                rollups.refresh_bucket(doctor.pk, day)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=refresh) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            list(AdminAppointmentDailyStat.objects.values_list('status', 'count')), [('pending', 4)],
+        )
+
+
+@override_settings(RATE_LIMITS={})
+class AppointmentAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        doctor = make_doctor('doc')
+        today = timezone.localdate()
+        AdminAppointmentDailyStat.objects.bulk_create([
+            AdminAppointmentDailyStat(day=today, doctor=doctor, specialization='Dentist', status='pending', count=2),
+            AdminAppointmentDailyStat(day=today, doctor=doctor, specialization='Dentist', status='approved', count=3),
+            AdminAppointmentDailyStat(
+                day=today - timedelta(days=40), doctor=doctor, specialization='Dentist', status='approved', count=7,
+            ),
+        ])
+
+    def get(self, query):
+        return self.client.get(f'/api/admin/analytics/appointments/{query}')
+
+    def test_sums_the_window(self):
+        response = self.get('?days=30&group_by=status')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['results'], [
+            {'status': 'approved', 'count': 3},
+            {'status': 'pending', 'count': 2},
+        ])
+        self.assertEqual(self.get('?days=90').json()['total'], 12)
+
+    def test_rejects_bad_group_by(self):
+        self.assertEqual(self.get('?group_by=colour').status_code, 400)
+        self.assertEqual(self.get('?group_by=,').status_code, 400)
+
+
+@override_settings(RATE_LIMITS={})
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.dentistry = AdminSpecialty.objects.create(name='Dentistry')
+        self.pending = AdminDoctor.objects.create(name='A', email='a@example.com', phone='1', specialty=self.dentistry)
+        AdminDoctor.objects.create(name='B', email='b@example.com', phone='2')
+
+    def bulk_approve(self, data):
+        return self.client.post('/api/admin/doctors/bulk-approve/', data, format='json')
+
+    def test_by_ids_and_filter(self):
+        response = self.bulk_approve({'ids': [self.pending.pk]})
+        self.assertEqual(response.json()['updated'], 1)
+        response = self.bulk_approve({'filter': {'specialty': self.dentistry.pk, 'status': 'approved'}})
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(self.bulk_approve({'filter': {'specialty': None}}).json()['updated'], 1)
+
+    def test_rejects_boolean_ids(self):
+        self.assertEqual(self.bulk_approve({'ids': [True]}).status_code, 400)
+        self.assertFalse(AdminDoctor.objects.filter(is_approved=True).exists())
+
+    def test_rejects_unknown_specialty(self):
+        for value in ('Dentistry', self.dentistry.pk + 1, True, [1]):
+            self.assertEqual(self.bulk_approve({'filter': {'specialty': value}}).status_code, 400, value)
+
+
+class AdminProjectionTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doc', specialization='Surgeon')
+        self.doctor.user.first_name, self.doctor.user.email = 'Dee', 'doc@example.com'
+        self.doctor.user.save()
+        self.patient = make_patient('pat')
+        self.appointment = Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, date=timezone.now(), notes='Checkup',
+        )
+
+    def drain(self):
+        while projection.drain():
+            pass
+
+    def events(self):
+        return sorted(AdminOutboxEvent.objects.values_list('source', 'source_id'))
+
+    def test_drain_projects_the_outbox(self):
+        self.drain()
+        self.assertFalse(AdminOutboxEvent.objects.exists())
+        doctor = AdminDoctor.objects.get(source_id=self.doctor.pk)
+        self.assertEqual((doctor.name, doctor.email, doctor.specialty.name), ('Dee', 'doc@example.com', 'Surgeon'))
+        patient = AdminPatient.objects.get(source_id=self.patient.pk)
+        self.assertEqual(patient.email, f'patient-user-{self.patient.user.pk}@users.invalid')
+        appointment = AdminAppointment.objects.get(source_id=self.appointment.pk)
+        self.assertEqual((appointment.doctor, appointment.reason), (doctor, 'Checkup'))
+        checkpoint = AdminProjectionCheckpoint.objects.get(name=projection.CHECKPOINT_NAME)
+        self.assertGreater(checkpoint.events_applied, 0)
+
+        self.appointment.delete()
+        self.drain()
+        self.assertFalse(AdminAppointment.objects.exists())
+
+    def test_user_saves_queue_changed_profiles_only(self):
+        self.drain()
+        update_last_login(None, self.patient.user)
+        self.assertEqual(self.events(), [])
+
+        self.patient.user.last_name = 'Ient'
+        self.patient.user.save()
+        self.assertEqual(self.events(), [('patient', self.patient.pk)])
+        self.drain()
+        self.assertEqual(AdminPatient.objects.get(source_id=self.patient.pk).name, 'Ient')
+
+        user = User.objects.get(pk=self.doctor.user.pk)
+        user.email = 'dee@example.com'
+        user.save(update_fields=['email'])
+        self.assertIn(('doctor', self.doctor.pk), self.events())
+
+    def test_verify_finds_and_repairs_drift(self):
+        self.drain()
+        self.assertEqual(list(projection.find_drift(projection.DOCTORS)), [])
+        AdminDoctor.objects.filter(source_id=self.doctor.pk).update(name='Stale')
+        AdminPatient.objects.create(name='Gone', email='gone@example.com', phone='', source_id=self.patient.pk + 100)
+        self.assertEqual(list(projection.find_drift(projection.DOCTORS, chunk_size=1)), [self.doctor.pk])
+        self.assertEqual(list(projection.find_drift(projection.PATIENTS, chunk_size=1)), [self.patient.pk + 100])
+
+        out = StringIO()
+        call_command('verify_admin_projection', repair=True, stdout=out)
+        self.assertIn('doctor: 1 drifted id(s)', out.getvalue())
+        self.drain()
+        for mapping in projection.PROJECTIONS.values():
+            self.assertEqual(list(projection.find_drift(mapping)), [], mapping.name)
+
+
+class ImportNdjsonTests(TestCase):
+    def write(self, *records):
+        handle, path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(handle, 'w') as stream:
+            for pk, email in records:
+                fields = {'name': email, 'email': email, 'phone': ''}
+                stream.write(json.dumps({'model': 'admin_api.admindoctor', 'pk': pk, 'fields': fields}) + '\n')
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_skips_rows_already_present(self):
+        path = self.write((1, 'a@example.com'), (2, 'b@example.com'))
+        call_command('import_ndjson', path, stdout=StringIO())
+        out = StringIO()
+        call_command('import_ndjson', path, stdout=out)
+        self.assertIn('Skipped 2 record(s)', out.getvalue())
+        self.assertEqual(AdminDoctor.objects.count(), 2)
+
+    def test_reports_other_conflicts(self):
+        AdminDoctor.objects.create(pk=50, name='a', email='a@example.com', phone='')
+        path = self.write((1, 'a@example.com'), (2, 'b@example.com'))
+        with self.assertRaisesMessage(CommandError, 'admin_api.admindoctor records up to line 2 conflict'):
+            call_command('import_ndjson', path, stdout=StringIO())
+        self.assertEqual(list(AdminDoctor.objects.values_list('pk', flat=True)), [50])
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+
+class SlowQueryPlanTests(TestCase):
+    def test_install_inside_a_scoped_wrapper(self):
+        def timer(execute, *args):
+            return execute(*args)
+
+        with mock.patch.object(connection, 'execute_wrappers', []):
+            with connection.execute_wrapper(timer):
+                # The connection opens during a request that is timing its queries.
+                slow_queries.install(sender=None, connection=connection)
+            self.assertEqual(connection.execute_wrappers, [slow_queries.capture])
+
+    def test_plan_literals_are_scrubbed(self):
+        plan = "\n".join([
+            "Index Scan using accounts_customuser_email on accounts_customuser  (cost=0.28..8.30 rows=1 width=72)"
+            " (actual time=0.010..0.011 rows=1 loops=1)",
+            "  Index Cond: ((email)::text = 'jane@example.com'::text)",
+            "  Filter: ((age > 42) AND (name = 'O''Brien'))",
+            "  Rows Removed by Filter: 3",
+            "  Buffers: shared hit=4",
+        ])
+        self.assertEqual(slow_queries.scrub_plan(plan), "\n".join([
+            "Index Scan using accounts_customuser_email on accounts_customuser  (cost=0.28..8.30 rows=1 width=72)"
+            " (actual time=0.010..0.011 rows=1 loops=1)",
+            "  Index Cond: ((email)::text = '?'::text)",
+            "  Filter: ((age > ?) AND (name = '?'))",
+            "  Rows Removed by Filter: 3",
+            "  Buffers: shared hit=4",
+        ]))
+
+    def test_explain_runs_with_the_real_parameters(self):
+        plan = slow_queries.explain('default', 'SELECT id FROM admin_api_admindoctor WHERE email = %s', ('a@b.c',))
+        self.assertTrue(plan)
+        self.assertNotIn('a@b.c', plan)
+
+    @override_settings(SLOW_QUERY_QUEUE_SIZE=2)
+    def test_queue_is_bounded(self):
+        recorder = slow_queries.Recorder()
+        recorder._thread = object()  # keep the worker from starting
+        for _ in range(5):
+            recorder.submit({'fingerprint': 'x'})
+        self.assertEqual((recorder.queue.qsize(), recorder.dropped), (2, 3))
+
+
+@override_settings(RATE_LIMITS={})
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        reference_data.invalidate()
+        self.addCleanup(reference_data.invalidate)
+
+    def get(self, user=None, **headers):
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        return self.client.get('/api/admin/reference-data/', **headers)
+
+    def test_alerts_only_for_signed_in_callers(self):
+        AdminSpecialty.objects.create(name='Dentistry')
+        AdminSystemAlert.objects.create(title='Maintenance', message='Down at noon', is_active=True)
+        AdminSystemAlert.objects.create(title='Old', message='Resolved', is_active=False)
+
+        public = self.get()
+        self.assertEqual(public.status_code, 200)
+        self.assertEqual([row['name'] for row in public.json()['specialties']], ['Dentistry'])
+        self.assertNotIn('alerts', public.json())
+        self.assertIn('Authorization', public['Vary'])
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer not-a-token').content, public.content)
+
+        signed_in = self.get(make_patient('pat').user)
+        self.assertEqual(signed_in.status_code, 200)
+        self.assertEqual([alert['message'] for alert in signed_in.json()['alerts']], ['Down at noon'])
+        self.assertEqual(signed_in.json()['specialties'], public.json()['specialties'])
+        self.assertNotEqual(signed_in['ETag'], public['ETag'])
+
+    def test_alert_writes_refresh_the_signed_in_variant(self):
+        user = make_patient('pat').user
+        public, signed_in = self.get(), self.get(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminSystemAlert.objects.create(title='Maintenance', message='Down at noon', is_active=True)
+        with mock.patch.object(reference_data, 'build', wraps=reference_data.build) as build:
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=public['ETag']).status_code, 304)
+            changed = self.get(user, HTTP_IF_NONE_MATCH=signed_in['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.json()['alerts']), 1)
+        build.assert_called_once_with(reference_data.SIGNED_IN)
+
+    def test_revalidation_and_invalidation(self):
+        with mock.patch.object(reference_data, 'build', wraps=reference_data.build) as build:
+            first = self.client.get('/api/admin/reference-data/')
+            again = self.client.get('/api/admin/reference-data/', HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminSpecialty.objects.create(name='Cardiology')
+        changed = self.client.get('/api/admin/reference-data/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_one_lookup_per_request(self):
+        with mock.patch.object(reference_data, 'get', wraps=reference_data.get) as get:
+            self.client.get('/api/admin/reference-data/')
+        self.assertEqual(get.call_count, 1)
+
+
+class LoadTestCommandTests(TestCase):
+    def test_refuses_budgets_from_another_setup(self):
+        call_command(
+            'generate_dataset', '--doctors=2', '--patients=5', '--appointments=10', '--years=1',
+            '--fast-passwords', stdout=StringIO(),
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump({'database': 'oracle', 'password_hasher': 'md5', 'endpoints': {}}, handle)
+        self.addCleanup(os.remove, handle.name)
+        with self.assertRaisesMessage(CommandError, "measured with database 'oracle'"):
+            call_command('load_test', f'--budgets={handle.name}', stdout=StringIO())
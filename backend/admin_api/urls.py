@@ -8,6 +8,9 @@ from .views import (
     AdminSystemAlertViewSet,
     AdminNotificationViewSet,
     AdminActivityLogViewSet,
+    AdminAppointmentAnalyticsView,
+    AdminDatabasePoolView,
+    reference_data_view,
 )
 
 router = DefaultRouter()
@@ -21,5 +24,8 @@ router.register(r'notifications', AdminNotificationViewSet, basename='admin-noti
 router.register(r'activity-logs', AdminActivityLogViewSet, basename='admin-activity-log')
 
 urlpatterns = [
+    path('analytics/appointments/', AdminAppointmentAnalyticsView.as_view(), name='admin-appointment-analytics'),
+    path('reference-data/', reference_data_view, name='admin-reference-data'),
+    path('system/db-pool/', AdminDatabasePoolView.as_view(), name='admin-db-pool'),
     path('', include(router.urls)),
 ]
@@ -1,6 +1,19 @@
+import os
+from datetime import datetime, time, timedelta
+
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_safe
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework import status
 
 from .models import (
@@ -10,7 +23,8 @@ from .models import (
     AdminSpecialty,
     AdminSystemAlert,
     AdminNotification,
-    AdminActivityLog
+    AdminActivityLog,
+    AdminAppointmentDailyStat,
 )
 
 from .serializers import (
@@ -23,78 +37,308 @@ from .serializers import (
     AdminActivityLogSerializer
 )
 
+from . import reference_data
 from .permissions import IsRoleAdmin  
+from accounts.sparse_fields import SparseFieldsetViewMixin
+from medical_project.db_pool import stats as db_pool_stats
+
+
+def parse_time_bound(value, param):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({param: ['Expected an ISO date or datetime.']})
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class TimeRangeFilterMixin:
+    """
+    Filters the list by `?since=` / `?until=` on `time_field`, newest first;
+    `?days=N` is shorthand for a `since` N days ago.
+
+    The admin log tables are partitioned by month on that column, so a bounded
+    range only touches the partitions it overlaps. Without any of them the
+    whole range is listed, so a large table needs TimeCursorPagination too.
+    """
+    time_field = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if 'since' in params:
+            queryset = queryset.filter(**{f'{self.time_field}__gte': parse_time_bound(params['since'], 'since')})
+        elif 'days' in params:
+            try:
+                days = int(params['days'])
+            except ValueError:
+                raise ValidationError({'days': ['Expected a whole number of days.']})
+            if days < 1:
+                raise ValidationError({'days': ['Must be at least 1.']})
+            queryset = queryset.filter(**{f'{self.time_field}__gte': timezone.now() - timedelta(days=days)})
+        if 'until' in params:
+            queryset = queryset.filter(**{f'{self.time_field}__lt': parse_time_bound(params['until'], 'until')})
+        return queryset.order_by(f'-{self.time_field}')
+
+
+class TimeCursorPagination(CursorPagination):
+    """
+    Keyset pages over a TimeRangeFilterMixin list, newest first. Each page is
+    one range query below the previous page's last time, so it only reads the
+    partitions that page reaches.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        return (f'-{view.time_field}', 'id')
 
-# Doctor ViewSet
-class AdminDoctorViewSet(viewsets.ModelViewSet):
-    queryset = AdminDoctor.objects.all()
-    serializer_class = AdminDoctorSerializer
-    permission_classes = [IsRoleAdmin]
+
+def is_id(value):
+    # JSON true/false arrive as bool, which is an int subclass.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class ModerationMixin:
+    """
+    approve/block actions for the doctor and patient approval queues.
+
+    Single and bulk actions each run as one UPDATE without loading the rows.
+    Bulk actions take {"ids": [...]} or {"filter": {...}} where the filter keys
+    are `status` (pending/approved/blocked) or one of `bulk_filter_fields`.
+    The list accepts the same `?status=`; the pending queue is served by a
+    partial index on is_approved = false AND is_blocked = false.
+    """
+    label = None
+    bulk_filter_fields = {}
+
+    APPROVE = {'is_approved': True, 'is_blocked': False}
+    BLOCK = {'is_approved': False, 'is_blocked': True}
+    STATUS_FILTERS = {
+        'pending': {'is_approved': False, 'is_blocked': False},
+        'approved': {'is_approved': True},
+        'blocked': {'is_blocked': True},
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and 'status' in self.request.query_params:
+            queryset = queryset.filter(**self.status_filter(self.request.query_params['status'])).order_by('id')
+        return queryset
+
+    def status_filter(self, value):
+        if value not in self.STATUS_FILTERS:
+            raise ValidationError({'status': [f"Expected one of: {', '.join(self.STATUS_FILTERS)}."]})
+        return self.STATUS_FILTERS[value]
+
+    def bulk_queryset(self, data):
+        queryset = self.get_queryset()
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or not all(is_id(pk) for pk in ids):
+                raise ValidationError({'ids': ['Expected a list of integer ids.']})
+            return queryset.filter(pk__in=ids)
+
+        filters = data.get('filter')
+        if not isinstance(filters, dict) or not filters:
+            raise ValidationError({'detail': 'Provide either "ids" or a non-empty "filter".'})
+        for key, value in filters.items():
+            if key == 'status':
+                queryset = queryset.filter(**self.status_filter(value))
+            elif key in self.bulk_filter_fields:
+                self.check_related_id(key, value)
+                queryset = queryset.filter(**{self.bulk_filter_fields[key]: value})
+            else:
+                raise ValidationError({'filter': [f"Unsupported filter: {key}"]})
+        return queryset
+
+    def check_related_id(self, key, value):
+        """Bulk filters name a related row by id (or null); refuse ids that do not exist."""
+        if value is None:
+            return
+        related = self.get_queryset().model._meta.get_field(key).related_model
+        if not is_id(value) or not related.objects.filter(pk=value).exists():
+            raise ValidationError({'filter': [f"Unknown {key}: {value!r}"]})
+
+    def moderate(self, pk, changes, verb):
+        if not self.get_queryset().filter(pk=pk).update(**changes):
+            raise NotFound()
+        return Response({'status': f'{self.label} {verb}'}, status=status.HTTP_200_OK)
+
+    def bulk_moderate(self, request, changes, verb):
+        updated = self.bulk_queryset(request.data).update(**changes)
+        return Response({'status': f'{self.label}s {verb}', 'updated': updated}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
-        doctor = self.get_object()
-        doctor.is_approved = True
-        doctor.is_blocked = False
-        doctor.save()
-        return Response({'status': 'Doctor approved'}, status=status.HTTP_200_OK)
+        return self.moderate(pk, self.APPROVE, 'approved')
 
     @action(detail=True, methods=['post'])
     def block(self, request, pk=None):
-        doctor = self.get_object()
-        doctor.is_blocked = True
-        doctor.is_approved = False
-        doctor.save()
-        return Response({'status': 'Doctor blocked'}, status=status.HTTP_200_OK)
+        return self.moderate(pk, self.BLOCK, 'blocked')
+
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        return self.bulk_moderate(request, self.APPROVE, 'approved')
+
+    @action(detail=False, methods=['post'], url_path='bulk-block')
+    def bulk_block(self, request):
+        return self.bulk_moderate(request, self.BLOCK, 'blocked')
+
+# Doctor ViewSet
+class AdminDoctorViewSet(SparseFieldsetViewMixin, ModerationMixin, viewsets.ModelViewSet):
+    queryset = AdminDoctor.objects.all()
+    serializer_class = AdminDoctorSerializer
+    permission_classes = [IsRoleAdmin]
+    label = 'Doctor'
+    bulk_filter_fields = {'specialty': 'specialty_id'}
 
 # Patient ViewSet
-class AdminPatientViewSet(viewsets.ModelViewSet):
+class AdminPatientViewSet(SparseFieldsetViewMixin, ModerationMixin, viewsets.ModelViewSet):
     queryset = AdminPatient.objects.all()
     serializer_class = AdminPatientSerializer
     permission_classes = [IsRoleAdmin]
-
-    @action(detail=True, methods=['post'])
-    def approve(self, request, pk=None):
-        patient = self.get_object()
-        patient.is_approved = True
-        patient.is_blocked = False
-        patient.save()
-        return Response({'status': 'Patient approved'}, status=status.HTTP_200_OK)
-
-    @action(detail=True, methods=['post'])
-    def block(self, request, pk=None):
-        patient = self.get_object()
-        patient.is_blocked = True
-        patient.is_approved = False
-        patient.save()
-        return Response({'status': 'Patient blocked'}, status=status.HTTP_200_OK)
+    label = 'Patient'
 
 # Appointment ViewSet
-class AdminAppointmentViewSet(viewsets.ModelViewSet):
+class AdminAppointmentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = AdminAppointment.objects.all()
     serializer_class = AdminAppointmentSerializer
     permission_classes = [IsRoleAdmin]
 
 # Specialty ViewSet
-class AdminSpecialtyViewSet(viewsets.ModelViewSet):
+class AdminSpecialtyViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = AdminSpecialty.objects.all()
     serializer_class = AdminSpecialtySerializer
     permission_classes = [IsRoleAdmin]
 
 # System Alert ViewSet
-class AdminSystemAlertViewSet(viewsets.ModelViewSet):
+class AdminSystemAlertViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = AdminSystemAlert.objects.all()
     serializer_class = AdminSystemAlertSerializer
     permission_classes = [IsRoleAdmin]
 
 # Notification ViewSet
-class AdminNotificationViewSet(viewsets.ModelViewSet):
+class AdminNotificationViewSet(SparseFieldsetViewMixin, TimeRangeFilterMixin, viewsets.ModelViewSet):
     queryset = AdminNotification.objects.all()
     serializer_class = AdminNotificationSerializer
     permission_classes = [IsRoleAdmin]
+    time_field = 'created_at'
 
 # Activity Log ViewSet
-class AdminActivityLogViewSet(viewsets.ModelViewSet):
+class AdminActivityLogViewSet(SparseFieldsetViewMixin, TimeRangeFilterMixin, viewsets.ModelViewSet):
     queryset = AdminActivityLog.objects.all()
     serializer_class = AdminActivityLogSerializer
     permission_classes = [IsRoleAdmin]
+    time_field = 'timestamp'
+    pagination_class = TimeCursorPagination
+    kept_columns = ('timestamp',)
+
+
+
+# Appointment analytics (served from the daily rollup, see admin_api/rollups.py)
+class AdminAppointmentAnalyticsView(APIView):
+    """
+    GET /api/admin/analytics/appointments/?days=90&group_by=specialization,status
+
+    Sums the pre-aggregated daily rows instead of scanning appointments.
+    `group_by` accepts any of day, doctor, specialization, status.
+    """
+    permission_classes = [IsRoleAdmin]
+    group_fields = {
+        'day': 'day',
+        'doctor': 'doctor_id',
+        'specialization': 'specialization',
+        'status': 'status',
+    }
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 90))
+        except ValueError:
+            raise ValidationError({'days': ['Expected a whole number of days.']})
+        if days < 1:
+            raise ValidationError({'days': ['Must be at least 1.']})
+
+        group_by = [name for name in request.query_params.get('group_by', 'specialization').split(',') if name]
+        unknown = [name for name in group_by if name not in self.group_fields]
+        if unknown:
+            raise ValidationError({'group_by': [f"Unknown field(s): {', '.join(unknown)}"]})
+        if not group_by:
+            raise ValidationError({'group_by': ['Name at least one field.']})
+        columns = [self.group_fields[name] for name in group_by]
+
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        if 'until' in request.query_params:
+            end = parse_time_bound(request.query_params['until'], 'until').date()
+            start = end - timedelta(days=days - 1)
+
+        rows = (
+            AdminAppointmentDailyStat.objects
+            .filter(day__gte=start, day__lte=end)
+            .values(*columns)
+            .annotate(count=Sum('count'))
+            .order_by(*columns)
+        )
+        results = [
+            {name: row[column] for name, column in zip(group_by, columns)} | {'count': row['count']}
+            for row in rows
+        ]
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'total': sum(row['count'] for row in results),
+            'results': results,
+        })
+
+
+class AdminDatabasePoolView(APIView):
+    """
+    GET /api/admin/system/db-pool/
+
+    Connection pool counters and acquire-time histograms per database alias.
+    Numbers are for the process that serves the request.
+    """
+    permission_classes = [IsRoleAdmin]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'databases': db_pool_stats.snapshot()})
+
+
+def api_user(request):
+    """The user of the request's API credentials, or None when it has none or they are invalid."""
+    for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+# Reference data (see admin_api/reference_data.py). Public, so the registration
+# forms can use the choice lists before anyone has logged in; signed-in callers
+# also get the active alerts.
+@require_safe
+def reference_data_view(request):
+    user = api_user(request)
+    audience = reference_data.PUBLIC if user is None else reference_data.SIGNED_IN
+    document = reference_data.get(audience)
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.content, content_type='application/json')
+    response['ETag'] = document.etag
+    # Clients keep the document but check back with If-None-Match before reusing it.
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -1,7 +1,34 @@
 from django.contrib import admin
+from accounts.admin_utils import LargeTableAdmin
 from .models import Doctor, DoctorAvailability, Appointment
 # Register your models here.
 
-admin.site.register(Doctor)
-admin.site.register(DoctorAvailability)
-admin.site.register(Appointment)
+
+@admin.register(Doctor)
+class DoctorAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'specialization', 'phone', 'rating', 'rating_count')
+    list_select_related = ('user',)
+    readonly_fields = ('rating',)
+    search_fields = ('^user__last_name', '^user__first_name', '=user__email', '^phone')
+    list_filter = ('specialization',)
+    raw_id_fields = ('user',)
+
+    def get_queryset(self, request):
+        # Doctor.__str__ reads the user, which autocomplete results render.
+        return super().get_queryset(request).select_related('user')
+
+
+@admin.register(DoctorAvailability)
+class DoctorAvailabilityAdmin(LargeTableAdmin):
+    list_display = ('doctor', 'day', 'start_time', 'end_time')
+    list_select_related = ('doctor__user',)
+    list_filter = ('day',)
+    autocomplete_fields = ('doctor',)
+
+
+@admin.register(Appointment)
+class AppointmentAdmin(LargeTableAdmin):
+    list_display = ('patient', 'doctor', 'date', 'status')
+    list_select_related = ('patient__user', 'doctor__user')
+    list_filter = ('status',)
+    autocomplete_fields = ('doctor', 'patient')
@@ -0,0 +1,160 @@
+# doctor/fast_serializers.py
+"""
+Read-only fast path for the high-volume list endpoints.
+
+A CompiledSerializer looks at a ModelSerializer once per request and turns it
+into a `.values()` column list plus a plain row -> dict function, so listing
+skips model instantiation, nested serializers and SerializerMethodFields.
+The output matches the regular serializer exactly (same keys, order and
+values); `manage.py benchmark_serializers` checks that and compares speed.
+
+Serializers opt in through COMPUTED_FIELDS, which spells out how each method
+field or nested serializer is derived from `.values()` columns.
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from medical_project.metrics import serializer_timer
+
+from .serializers import AppointmentSerializer, DoctorSerializer
+
+
+def _doctor_str(first_name, last_name):
+    # Doctor.__str__
+    return f"Dr. {first_name} {last_name}"
+
+
+def _full_name(first_name, last_name):
+    # AbstractUser.get_full_name
+    return f"{first_name} {last_name}".strip()
+
+
+def _doctor_full_name(first_name, last_name, username):
+    # DoctorSerializer.get_full_name
+    first_name = first_name.strip() if first_name else ''
+    last_name = last_name.strip() if last_name else ''
+    if first_name or last_name:
+        return f"Dr. {first_name} {last_name}".strip()
+    return f"Dr. {username}"
+
+
+def _user(user_id, username, email, first_name, last_name):
+    # doctor.serializers.UserSerializer
+    return {
+        'id': user_id,
+        'username': username,
+        'email': email,
+        'first_name': first_name,
+        'last_name': last_name,
+    }
+
+
+# serializer class -> {field name: (columns, function(*column values))}
+COMPUTED_FIELDS = {
+    AppointmentSerializer: {
+        'doctor_name': (('doctor__user__first_name', 'doctor__user__last_name'), _doctor_str),
+        'doctor_specialization': (('doctor__specialization',), lambda specialization: specialization),
+        'patient_name': (('patient__user__first_name', 'patient__user__last_name'), _full_name),
+        'patient_id': (('patient',), lambda patient_id: patient_id),
+        'time': (('date',), lambda value: value.strftime('%H:%M') if value else ''),
+    },
+    DoctorSerializer: {
+        'user': (
+            ('user', 'user__username', 'user__email', 'user__first_name', 'user__last_name'),
+            _user,
+        ),
+        'full_name': (('user__first_name', 'user__last_name', 'user__username'), _doctor_full_name),
+    },
+}
+
+
+def supports(serializer_class):
+    return serializer_class in COMPUTED_FIELDS
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, context=None):
+        # Instantiating with the request context keeps ?fields= / ?exclude= working.
+        serializer = serializer_class(context=context or {})
+        computed = COMPUTED_FIELDS[serializer_class]
+        columns = []
+        plan = []
+
+        def column_index(name):
+            if name not in columns:
+                columns.append(name)
+            return columns.index(name)
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in computed:
+                sources, function = computed[name]
+                plan.append((name, tuple(column_index(source) for source in sources), function, False))
+            elif isinstance(field, serializers.RelatedField):
+                # values_list() already yields the primary key
+                plan.append((name, (column_index(field.source),), None, False))
+            else:
+                plan.append((name, (column_index(field.source),), self._converter(field), True))
+
+        self.columns = columns
+        self.plan = plan
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.FileField):
+            storage = field.parent.Meta.model._meta.get_field(field.source).storage
+            return lambda name: field.to_representation(_StoredFile(storage, name))
+        return field.to_representation
+
+    def row(self, values):
+        data = {}
+        for name, indexes, function, plain in self.plan:
+            if function is None:
+                data[name] = values[indexes[0]]
+            elif plain:
+                # Like Serializer.to_representation: a None attribute stays None.
+                value = values[indexes[0]]
+                data[name] = None if value is None else function(value)
+            else:
+                data[name] = function(*[values[index] for index in indexes])
+        return data
+
+    def rows(self, values_list):
+        values_list = list(values_list)  # run the query outside the serializer timer
+        with serializer_timer():
+            return [self.row(values) for values in values_list]
+
+    def serialize(self, queryset):
+        return self.rows(queryset.values_list(*self.columns))
+
+
+class _StoredFile:
+    """Enough of a FieldFile for FileField.to_representation."""
+
+    def __init__(self, storage, name):
+        self.name = name
+        self._storage = storage
+
+    def __bool__(self):
+        return bool(self.name)
+
+    @property
+    def url(self):
+        return self._storage.url(self.name)
+
+
+class CompiledListMixin:
+    """Serve list GETs through CompiledSerializer when the serializer supports it."""
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not supports(serializer_class):
+            return super().list(request, *args, **kwargs)
+
+        compiled = CompiledSerializer(serializer_class, self.get_serializer_context())
+        rows = self.filter_queryset(self.get_queryset()).values_list(*compiled.columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.rows(page))
+        return Response(compiled.rows(rows))
@@ -0,0 +1,226 @@
+# doctor/geo.py
+"""
+Offline geocoding and nearest-doctor search, without PostGIS.
+
+Addresses are matched against a bundled gazetteer (doctor/data/gazetteer.csv:
+cities and the larger districts, with English and Arabic spellings). The most
+specific place named in the address wins, so "12 Tahrir St, Dokki, Giza"
+lands on Dokki. A doctor is placed at that place's coordinates; addresses
+that name no known place are left without coordinates.
+
+Doctors carry a geohash (GEOHASH_PRECISION characters). A k-nearest query
+looks at the 3x3 block of cells around the point, starting with small cells
+and widening until the k-th closest candidate lies within the distance the
+block is guaranteed to cover. Each step counts doctors per geohash with a
+few prefix range scans on the geohash index, ranks those locations, and only
+loads the doctors at the closest ones (a bounded number, ordered by a planar
+distance in SQL); the final order uses the great-circle distance.
+"""
+import csv
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import Count, F, FloatField, Q, Value
+
+GAZETTEER = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+GEOHASH_PRECISION = 9  # ~5m cells
+CELL_ERROR_KM = 0.005  # most a doctor can be from its cell centre at GEOHASH_PRECISION
+START_PRECISION = 6  # ~1km cells, where k-nearest searches begin
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+SPECIFICITY = {'district': 2, 'city': 1}
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_WORD_RE = re.compile(r'[^\w]+')
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return f" {_WORD_RE.sub(' ', text).strip()} "
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """[(normalized name, specificity, lat, lon, canonical name)], most specific and longest first."""
+    entries = []
+    with open(GAZETTEER, encoding='utf-8', newline='') as handle:
+        for row in csv.DictReader(handle):
+            lat, lon = float(row['latitude']), float(row['longitude'])
+            for name in [row['name'], *filter(None, row['aliases'].split('|'))]:
+                entries.append((_normalize(name), SPECIFICITY[row['kind']], lat, lon, row['name']))
+    entries.sort(key=lambda entry: (-entry[1], -len(entry[0])))
+    return entries
+
+
+def geocode(address):
+    """(latitude, longitude, place) for the most specific gazetteer place in `address`, or None."""
+    text = _normalize(address)
+    if not text.strip():
+        return None
+    for name, _, lat, lon, place in gazetteer():
+        if name in text:
+            return lat, lon, place
+    return None
+
+
+def places():
+    """Canonical gazetteer names."""
+    return sorted({entry[4] for entry in gazetteer()})
+
+
+def backfill(queryset, batch_size=1000):
+    """(Re)geocode the doctors in `queryset` in primary-key batches; returns how many were placed."""
+    placed = 0
+    last_id = 0
+    while True:
+        doctors = list(queryset.filter(pk__gt=last_id).order_by('pk').only('pk', 'address')[:batch_size])
+        if not doctors:
+            return placed
+        last_id = doctors[-1].pk
+        for doctor in doctors:
+            point = geocode(doctor.address)
+            doctor.latitude, doctor.longitude = (point[0], point[1]) if point else (None, None)
+            doctor.geohash = encode(point[0], point[1]) if point else ''
+            placed += point is not None
+        queryset.model.objects.bulk_update(doctors, ['latitude', 'longitude', 'geohash'])
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """Centre (lat, lon) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def block(lat, lon, precision):
+    """
+    The cell containing the point and its eight neighbours, plus the distance
+    in km that the block covers in every direction from the point.
+    """
+    height, width = cell_size(precision)
+    cells = set()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            cell_lat = min(max(lat + dy * height, -90.0), 90.0)
+            cell_lon = (lon + dx * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_lat, cell_lon, precision))
+    widest_lat = min(abs(lat) + 2 * height, 90.0)
+    reach = min(height * KM_PER_DEGREE, width * KM_PER_DEGREE * math.cos(math.radians(widest_lat)))
+    return sorted(cells), reach
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
+
+
+def _cell_counts(queryset, cells):
+    """{geohash: doctors} in the given cells; only reads the geohash index."""
+    match = Q()
+    for cell in cells or ():
+        match |= Q(geohash__startswith=cell)
+    return dict(
+        queryset.filter(match).exclude(geohash='')
+        .values_list('geohash').annotate(doctors=Count('pk')).order_by()
+    )
+
+
+def _closest(queryset, lat, lon, geohashes, limit):
+    """Doctors at the given geohashes, closest first by an equirectangular distance computed in SQL."""
+    scale = math.cos(math.radians(lat))
+    dlat = F('latitude') - Value(lat, output_field=FloatField())
+    dlon = (F('longitude') - Value(lon, output_field=FloatField())) * Value(scale, output_field=FloatField())
+    return list(
+        queryset.filter(geohash__in=geohashes)
+        .annotate(planar=dlat * dlat + dlon * dlon)
+        .order_by('planar', 'pk')[:limit]
+    )
+
+
+def nearest(queryset, lat, lon, k=10, max_km=None):
+    """
+    The k doctors in `queryset` closest to (lat, lon), as [(doctor, distance_km)],
+    optionally only those within max_km.
+
+    Doctors sharing a place share a geohash, so each step first counts doctors
+    per distinct geohash in the block, ranks those locations by distance from
+    their cell centres, and only then loads the doctors at the closest ones.
+    """
+    for precision in range(START_PRECISION, -1, -1):
+        if precision:
+            cells, reach = block(lat, lon, precision)
+        else:
+            cells, reach = None, math.inf
+        if max_km is not None and reach < max_km and precision:
+            # The answer may include doctors up to max_km away; widen first.
+            continue
+
+        locations = sorted(
+            (haversine_km(lat, lon, *decode(geohash)), geohash, doctors)
+            for geohash, doctors in _cell_counts(queryset, cells).items()
+        )
+        if max_km is not None:
+            locations = [location for location in locations if location[0] <= max_km + CELL_ERROR_KM]
+        chosen, found, kth = [], 0, None
+        for distance, geohash, doctors in locations:
+            if kth is not None and distance > kth + 2 * CELL_ERROR_KM:
+                break
+            chosen.append(geohash)
+            found += doctors
+            if kth is None and found >= k:
+                kth = distance
+        if precision and max_km is None and (kth is None or kth > reach):
+            continue
+
+        # Planar and great-circle order can disagree slightly; over-fetch before re-sorting.
+        rows = _closest(queryset, lat, lon, chosen, 2 * k + 10) if chosen else []
+        results = sorted(
+            ((row, haversine_km(lat, lon, row.latitude, row.longitude)) for row in rows),
+            key=lambda pair: (pair[1], pair[0].pk),
+        )
+        if max_km is not None:
+            results = [pair for pair in results if pair[1] <= max_km]
+        return results[:k]
+    return []
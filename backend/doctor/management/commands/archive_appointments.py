@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from admin_api import partitions
+from doctor.partitions import COLUMN, TABLE
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the monthly doctor_appointment partitions: create the coming months ahead "
+        "of time and archive months older than the hot window, either by moving them to a "
+        "cheaper tablespace (still queryable) or by detaching them into standalone tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.APPOINTMENT_ARCHIVE_AFTER_MONTHS,
+            help='Full months of history to keep hot, not counting the current one.',
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=settings.APPOINTMENT_PARTITIONS_AHEAD,
+            help='Number of future monthly partitions to create.',
+        )
+        parser.add_argument(
+            '--tablespace', default=settings.APPOINTMENT_ARCHIVE_TABLESPACE,
+            help='Move archived partitions (and their indexes) to this tablespace.',
+        )
+        parser.add_argument(
+            '--detach', action='store_true',
+            help='Detach archived partitions; their rows disappear from the app until re-attached.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived.')
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported(connection):
+            self.stdout.write("doctor_appointment is only partitioned on PostgreSQL; nothing to do.")
+            return
+
+        this_month = partitions.month_start(timezone.now().date())
+        cutoff = partitions.add_months(this_month, -options['months'])
+        expired = [
+            name for name, month in partitions.list_partitions(connection, TABLE)
+            if partitions.add_months(month, 1) <= cutoff
+        ]
+        if options['dry_run']:
+            self.stdout.write(f"{TABLE}: partitions before {cutoff}: {', '.join(expired) or 'none'}")
+            return
+
+        with transaction.atomic():
+            created = partitions.ensure_partitions(
+                connection, TABLE, COLUMN, this_month, partitions.add_months(this_month, options['ahead'])
+            )
+        self.stdout.write(self.style.SUCCESS(f"{TABLE}: created {len(created)} partition(s)"))
+
+        # Autocommit: each SET TABLESPACE commits and releases its lock on its own.
+        if options['tablespace']:
+            moved = partitions.move_partitions_before(connection, TABLE, cutoff, options['tablespace'])
+            self.stdout.write(self.style.SUCCESS(f"{TABLE}: moved {len(moved)} partition(s) to {options['tablespace']}"))
+            for name in moved:
+                self.stdout.write(f"  moved {name}")
+        if options['detach']:
+            with transaction.atomic():
+                detached = partitions.drop_partitions_before(connection, TABLE, cutoff, detach_only=True)
+            self.stdout.write(self.style.SUCCESS(f"{TABLE}: detached {len(detached)} partition(s)"))
+            for name in detached:
+                self.stdout.write(f"  detached {name}")
+        if not options['tablespace'] and not options['detach'] and expired:
+            self.stdout.write(self.style.WARNING(
+                f"{len(expired)} partition(s) are past the hot window; pass --tablespace and/or --detach to archive them."
+            ))
@@ -0,0 +1,110 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from doctor.fast_serializers import CompiledSerializer
+from doctor.models import Appointment, Doctor
+from doctor.serializers import AppointmentSerializer, DoctorSerializer
+from patients.models import Patient
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/second of the DRF serializers and the compiled .values() path "
+        "on a throwaway dataset (rolled back afterwards), and check both render identical JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Appointments to serialize.')
+        parser.add_argument('--doctors', type=int, default=1000, help='Doctors to serialize.')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['rows'], options['doctors'])
+                context = {'request': Request(APIRequestFactory().get('/'))}
+                self.compare(
+                    'appointments', AppointmentSerializer,
+                    Appointment.objects.order_by('id'), ('doctor__user', 'patient__user'),
+                    context, options['repeat'],
+                )
+                self.compare(
+                    'doctors', DoctorSerializer,
+                    Doctor.objects.order_by('id'), ('user',),
+                    context, options['repeat'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows, doctors):
+        stamp = timezone.now().strftime('%H%M%S%f')
+        users = User.objects.bulk_create(
+            [User(username=f'bench-d{stamp}-{i}', first_name='Bench', last_name=f'Doctor {i}', role='doctor')
+             for i in range(doctors)]
+            + [User(username=f'bench-p{stamp}-{i}', first_name='Bench', last_name=f'Patient {i}', role='patient')
+               for i in range(max(rows // 10, 1))]
+        )
+        doctor_users = [user for user in users if user.role == 'doctor']
+        patient_users = [user for user in users if user.role == 'patient']
+        doctor_rows = Doctor.objects.bulk_create(
+            [Doctor(user=user, specialization='General', phone='0100', bio='x' * 200) for user in doctor_users]
+        )
+        patient_rows = Patient.objects.bulk_create([Patient(user=user) for user in patient_users])
+        start = timezone.now()
+        Appointment.objects.bulk_create(
+            [
+                Appointment(
+                    doctor=doctor_rows[i % len(doctor_rows)],
+                    patient=patient_rows[i % len(patient_rows)],
+                    date=start + timedelta(minutes=30 * i),
+                    notes='Follow-up visit',
+                )
+                for i in range(rows)
+            ],
+            batch_size=2000,
+        )
+
+    def compare(self, label, serializer_class, queryset, related, context, repeat):
+        drf_time, drf_data = self.best_of(
+            repeat, lambda: serializer_class(queryset.select_related(*related), many=True, context=context).data
+        )
+        compiled_time, compiled_data = self.best_of(
+            repeat, lambda: CompiledSerializer(serializer_class, context).serialize(queryset)
+        )
+
+        renderer = JSONRenderer()
+        if renderer.render(drf_data) != renderer.render(compiled_data):
+            raise CommandError(f"{label}: compiled output differs from {serializer_class.__name__}")
+
+        count = len(drf_data)
+        self.stdout.write(
+            f"{label:<13} {count:>7} rows  "
+            f"DRF {count / drf_time:>10,.0f} rows/s  "
+            f"compiled {count / compiled_time:>10,.0f} rows/s  "
+            f"x{drf_time / compiled_time:.1f}  (output identical)"
+        )
+
+    @staticmethod
+    def best_of(repeat, function):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,358 @@
+import random
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import MD5PasswordHasher, make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from doctor import geo, ratings
+from doctor.models import Appointment, Doctor, DoctorAvailability, Review
+from patients.models import Patient
+
+User = get_user_model()
+
+SCALES = {
+    # doctors, patients, appointments
+    'small': (50, 2_000, 50_000),
+    'medium': (1_000, 100_000, 2_000_000),
+    'large': (5_000, 1_000_000, 10_000_000),
+}
+
+FIRST_NAMES = [
+    'Ahmed', 'Mohamed', 'Omar', 'Youssef', 'Mahmoud', 'Mostafa', 'Khaled', 'Hassan', 'Ali', 'Karim',
+    'Sara', 'Mariam', 'Nour', 'Fatma', 'Aya', 'Salma', 'Hana', 'Laila', 'Rana', 'Yasmin',
+    'John', 'David', 'Michael', 'James', 'Daniel', 'Emma', 'Olivia', 'Sophia', 'Mia', 'Grace',
+]
+LAST_NAMES = [
+    'Hassan', 'Ibrahim', 'Mahmoud', 'Saleh', 'Kamal', 'Fathy', 'Nasser', 'Adel', 'Farouk', 'Samir',
+    'Mansour', 'Gaber', 'Zaki', 'Rashad', 'Helmy', 'Smith', 'Johnson', 'Brown', 'Taylor', 'Wilson',
+]
+CITIES = ['Cairo', 'Giza', 'Alexandria', 'Mansoura', 'Tanta', 'Aswan', 'Luxor', 'Ismailia', 'Suez', 'Zagazig']
+# Relative frequency of each specialization among doctors
+SPECIALIZATION_WEIGHTS = {
+    'General': 30, 'Dentist': 18, 'Cardiologist': 12, 'Surgeon': 10,
+    'Lungs Specialist': 8, 'Psychiatrist': 8, 'Covid-19': 4,
+}
+BLOOD_TYPES = [('O+', 37), ('A+', 30), ('B+', 9), ('AB+', 4), ('O-', 7), ('A-', 6), ('B-', 2), ('AB-', 1)]
+ALLERGIES = ['Penicillin', 'Peanuts', 'Latex', 'Pollen', 'Shellfish', 'Aspirin', 'Sulfa drugs', 'Dust mites']
+CONDITIONS = [
+    'Hypertension', 'Type 2 diabetes', 'Asthma', 'Migraine', 'Hypothyroidism', 'Seasonal allergies',
+    'Anemia', 'Appendectomy in childhood', 'Knee surgery', 'Chronic back pain',
+]
+VISIT_NOTES = [
+    'Routine check-up, no complaints.', 'Follow-up visit, symptoms improving.',
+    'Prescribed a two week course of antibiotics.', 'Blood pressure slightly elevated, recheck in a month.',
+    'Referred for blood work.', 'Discussed diet and exercise.', 'X-ray requested.',
+    'Medication dose adjusted.', 'Patient reports persistent cough.', 'Cleared for normal activity.',
+]
+# (status, weight) for visits in the past and in the future
+PAST_STATUSES = [('approved', 80), ('rejected', 10), ('pending', 10)]
+FUTURE_STATUSES = [('pending', 60), ('approved', 35), ('rejected', 5)]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SLOT_MINUTES = 30
+
+
+class WeightedChoice:
+    """random.choices with the cumulative weights computed once."""
+
+    def __init__(self, rng, weighted):
+        self.rng = rng
+        self.values = [value for value, _ in weighted]
+        self.cum_weights = list(accumulate(weight for _, weight in weighted))
+
+    def __call__(self):
+        return self.rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset (doctors with availability, patients and "
+        "years of appointments) for scale testing. The same --seed and --anchor-date always "
+        "produce the same data, ids included when run on an empty database. No doctor is "
+        "booked twice for one slot. Appointments are streamed with COPY on PostgreSQL and "
+        "chunked bulk_create elsewhere; model signals do not run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Preset sizes (default: small).')
+        parser.add_argument('--doctors', type=int, help='Override the number of doctors.')
+        parser.add_argument('--patients', type=int, help='Override the number of patients.')
+        parser.add_argument('--appointments', type=int, help='Override the number of appointments.')
+        parser.add_argument('--years', type=int, default=3, help='Years of appointment history.')
+        parser.add_argument('--ahead-days', type=int, default=60, help='Days of future bookings.')
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=None,
+                            help='"Today" for the generated history (default: today).')
+        parser.add_argument('--review-rate', type=float, default=0.2,
+                            help='Share of completed appointments that get a review.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed', help='Username prefix; also used by --clear.')
+        parser.add_argument('--password', default='seed-pass-123', help='Password shared by every generated user.')
+        parser.add_argument('--fast-passwords', action='store_true',
+                            help='Store cheap MD5 password hashes, for load_test. These accounts can only log in '
+                                 'where MD5PasswordHasher is enabled, as load_test does for them.')
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--clear', action='store_true', help='Delete users (and their data) with --prefix first.')
+        parser.add_argument('--build-derived', action='store_true',
+                            help='Afterwards rebuild the analytics rollup and the admin projection.')
+
+    def handle(self, *args, **options):
+        doctors, patients, appointments = SCALES[options['scale']]
+        doctors = options['doctors'] if options['doctors'] is not None else doctors
+        patients = options['patients'] if options['patients'] is not None else patients
+        appointments = options['appointments'] if options['appointments'] is not None else appointments
+        if doctors < 1 or patients < 1:
+            raise CommandError("Need at least one doctor and one patient.")
+
+        self.prefix = options['prefix']
+        self.chunk_size = options['chunk_size']
+        self.rng = random.Random(options['seed'])
+        if options['fast_passwords']:
+            hasher = MD5PasswordHasher()
+            self.password = hasher.encode(options['password'], hasher.salt())
+        else:
+            self.password = make_password(options['password'])
+        self.anchor = options['anchor_date'] or timezone.localdate()
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=f"{self.prefix}-").delete()
+            self.stdout.write(f"Deleted {deleted} existing row(s) with prefix {self.prefix!r}")
+        elif User.objects.filter(username__startswith=f"{self.prefix}-").exists():
+            raise CommandError(f"Users with prefix {self.prefix!r} exist; pass --clear or another --prefix.")
+
+        started = time.perf_counter()
+        self.create_admin()
+        doctor_rows = self.step('doctors', lambda: self.create_doctors(doctors))
+        self.step('availability', lambda: self.create_availability(doctor_rows))
+        patient_ids = self.step('patients', lambda: self.create_patients(patients))
+        self.step('appointments', lambda: self.create_appointments(
+            doctor_rows, patient_ids, appointments, options['years'], options['ahead_days'],
+        ))
+        self.step('reviews', lambda: self.create_reviews(options['review_rate']))
+        self.step('ratings', lambda: len(ratings.reconcile()))
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s"))
+
+        if options['build_derived']:
+            call_command('rebuild_appointment_rollups', '--all', stdout=self.stdout)
+            call_command('project_admin_models', '--backfill', stdout=self.stdout)
+        else:
+            self.stdout.write(
+                "Signals were not sent: run rebuild_appointment_rollups --all and "
+                "project_admin_models --backfill to refresh derived tables."
+            )
+
+    def step(self, label, function):
+        started = time.perf_counter()
+        result = function()
+        count = len(result) if isinstance(result, (list, dict)) else result
+        self.stdout.write(f"{label:<13} {count:>10,} in {time.perf_counter() - started:6.1f}s")
+        return result
+
+    def user(self, role, index):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        username = f"{self.prefix}-{role}-{index}"
+        return User(
+            username=username, email=f"{username}@example.com", password=self.password,
+            first_name=first, last_name=last, role=role,
+        )
+
+    def create_admin(self):
+        User.objects.create(
+            username=f"{self.prefix}-admin", email=f"{self.prefix}-admin@example.com", password=self.password,
+            first_name='Seed', last_name='Admin', role='admin', is_staff=True,
+        )
+
+    def create_doctors(self, count):
+        """Returns [(doctor_id, specialization, popularity, working days)] for the appointment generator."""
+        specialization = WeightedChoice(self.rng, SPECIALIZATION_WEIGHTS.items())
+        self.places = geo.places()
+        doctors = []
+        for start in range(0, count, self.chunk_size):
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [self.user('doctor', index) for index in range(start, min(start + self.chunk_size, count))]
+                )
+                rows = Doctor.objects.bulk_create([self.doctor(user, specialization()) for user in users])
+            for row in rows:
+                days = sorted(self.rng.sample(range(6), self.rng.randint(3, 5)))  # never Sunday
+                # Long-tailed demand: a few doctors get most of the bookings.
+                doctors.append((row.pk, row.specialization, self.rng.paretovariate(1.5), days))
+        return doctors
+
+    def doctor(self, user, specialization):
+        # Clinics cluster in the gazetteer's districts and cities, so nearby search has real spread.
+        doctor = Doctor(
+            user=user,
+            specialization=specialization,
+            phone=f"01{self.rng.randrange(10 ** 9):09d}",
+            bio=f"{self.rng.randint(3, 30)} years of experience.",
+            address=f"{self.rng.randint(1, 200)} {self.rng.choice(LAST_NAMES)} St, {self.rng.choice(self.places)}",
+        )
+        doctor.locate()  # bulk_create skips save()
+        return doctor
+
+    def create_availability(self, doctors):
+        self.hours = {}
+        rows = []
+        for doctor_id, _, _, days in doctors:
+            start_hour = self.rng.choice([8, 9, 10])
+            end_hour = start_hour + self.rng.choice([5, 6, 8])
+            self.hours[doctor_id] = (start_hour, end_hour)
+            for day in days:
+                rows.append(DoctorAvailability(
+                    doctor_id=doctor_id, day=WEEKDAYS[day],
+                    start_time=f"{start_hour:02d}:00", end_time=f"{end_hour:02d}:00",
+                ))
+        DoctorAvailability.objects.bulk_create(rows, batch_size=self.chunk_size)
+        return len(rows)
+
+    def create_patients(self, count):
+        gender = WeightedChoice(self.rng, [('M', 48), ('F', 50), ('O', 2)])
+        blood_type = WeightedChoice(self.rng, BLOOD_TYPES)
+        ids = []
+        for start in range(0, count, self.chunk_size):
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [self.user('patient', index) for index in range(start, min(start + self.chunk_size, count))]
+                )
+                patients = []
+                for user in users:
+                    age = min(int(self.rng.triangular(1, 95, 35)), 120)
+                    born = self.anchor - timedelta(days=age * 365 + self.rng.randrange(365))
+                    allergies = self.rng.sample(ALLERGIES, self.rng.choice([0, 0, 0, 0, 1, 1, 2]))
+                    history = self.rng.sample(CONDITIONS, self.rng.choice([0, 0, 1, 1, 2, 3]))
+                    patients.append(Patient(
+                        user=user, phone=f"01{self.rng.randrange(10 ** 9):09d}",
+                        address=f"{self.rng.randint(1, 500)} {self.rng.choice(LAST_NAMES)} St, {self.rng.choice(CITIES)}",
+                        age=max(age, 1), date_of_birth=born, gender=gender(), blood_type=blood_type(),
+                        allergies=', '.join(allergies), medical_history='. '.join(history),
+                    ))
+                ids.extend(row.pk for row in Patient.objects.bulk_create(patients))
+        return ids
+
+    def appointment_rows(self, doctors, patient_ids, count, years, ahead_days):
+        """
+        Yields (doctor_id, patient_id, date, status, notes) tuples, oldest first within each doctor pick.
+        A bitmap of (doctor, day, slot) keeps each slot to one booking; a taken slot is drawn again.
+        """
+        doctor_pick = WeightedChoice(self.rng, [((index, doctor), doctor[2]) for index, doctor in enumerate(doctors)])
+        past = WeightedChoice(self.rng, PAST_STATUSES)
+        future = WeightedChoice(self.rng, FUTURE_STATUSES)
+        first_day = self.anchor - timedelta(days=365 * years)
+        span = (self.anchor - first_day).days + ahead_days
+        slots_per_day = max(hours[1] - hours[0] for hours in self.hours.values()) * 60 // SLOT_MINUTES
+        days_per_doctor = span + 7  # a draw can roll forward to the next working day
+        taken = bytearray((len(doctors) * days_per_doctor * slots_per_day + 7) // 8)
+        patient_count = len(patient_ids)
+        for _ in range(count):
+            while True:
+                index, (doctor_id, _, _, days) = doctor_pick()
+                offset = self.rng.randrange(span)
+                while (first_day + timedelta(days=offset)).weekday() not in days:
+                    offset += 1
+                start_hour, end_hour = self.hours[doctor_id]
+                slot = self.rng.randrange((end_hour - start_hour) * 60 // SLOT_MINUTES)
+                bit = (index * days_per_doctor + offset) * slots_per_day + slot
+                if not taken[bit >> 3] & (1 << (bit & 7)):
+                    taken[bit >> 3] |= 1 << (bit & 7)
+                    break
+            day = first_day + timedelta(days=offset)
+            when = datetime(day.year, day.month, day.day, start_hour, tzinfo=dt_timezone.utc) + timedelta(
+                minutes=slot * SLOT_MINUTES
+            )
+            # Each doctor draws from a stable pool of patients, so revisits cluster.
+            patient_id = patient_ids[(doctor_id * 7919 + self.rng.randrange(min(patient_count, 400))) % patient_count]
+            status = (past if day < self.anchor else future)()
+            notes = self.rng.choice(VISIT_NOTES) if status == 'approved' and day < self.anchor else ''
+            yield doctor_id, patient_id, when, status, notes
+
+    def slot_capacity(self, doctors, years, ahead_days):
+        """How many distinct slots the doctors' working days offer in the generated range."""
+        first_day = self.anchor - timedelta(days=365 * years)
+        span = (self.anchor - first_day).days + ahead_days
+        weekdays = [0] * 7
+        for offset in range(span):
+            weekdays[(first_day + timedelta(days=offset)).weekday()] += 1
+        return sum(
+            sum(weekdays[day] for day in days) * (self.hours[doctor_id][1] - self.hours[doctor_id][0]) * 60 // SLOT_MINUTES
+            for doctor_id, _, _, days in doctors
+        )
+
+    def create_appointments(self, doctors, patient_ids, count, years, ahead_days):
+        capacity = self.slot_capacity(doctors, years, ahead_days)
+        if count > capacity // 2:
+            # Drawing slots at random slows down sharply as the calendars fill up.
+            raise CommandError(
+                f"{count:,} appointments need more doctors: {len(doctors):,} doctors offer {capacity:,} "
+                "slots and at most half of them are booked."
+            )
+        # Explicit ids, so the same arguments give the same ids on an empty database
+        # and reviews can be picked from this run's appointments by id range.
+        first_id = (Appointment.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        self.appointment_ids = (first_id, first_id + count - 1)
+        rows = (
+            (first_id + index, *row)
+            for index, row in enumerate(self.appointment_rows(doctors, patient_ids, count, years, ahead_days))
+        )
+        if connection.vendor == 'postgresql':
+            with transaction.atomic(), connection.cursor() as cursor:
+                with cursor.copy(
+                    f"COPY {Appointment._meta.db_table} (id, doctor_id, patient_id, date, status, notes) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        else:
+            batch = []
+            for appointment_id, doctor_id, patient_id, when, status, notes in rows:
+                batch.append(Appointment(
+                    id=appointment_id, doctor_id=doctor_id, patient_id=patient_id, date=when, status=status, notes=notes,
+                ))
+                if len(batch) >= self.chunk_size:
+                    Appointment.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Appointment.objects.bulk_create(batch)
+        self.reset_sequences(Appointment)
+        return count
+
+    def create_reviews(self, rate):
+        """
+        Reviews for a share of this run's completed appointments, picked and rated from a hash
+        of the appointment's position in the run in one INSERT ... SELECT; ratings skew positive.
+        Review ids are numbered in appointment order.
+        """
+        first_id, last_id = self.appointment_ids
+        first_review_id = (Review.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        anchor = datetime(self.anchor.year, self.anchor.month, self.anchor.day, tzinfo=dt_timezone.utc)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Review._meta.db_table} (id, appointment_id, doctor_id, patient_id, rating, comment, created_at)
+                SELECT %s + ROW_NUMBER() OVER (ORDER BY id) - 1, id, doctor_id, patient_id,
+                       CASE WHEN score < 50 THEN 5 WHEN score < 80 THEN 4 WHEN score < 90 THEN 3
+                            WHEN score < 95 THEN 2 ELSE 1 END,
+                       '', date
+                FROM (
+                    SELECT id, doctor_id, patient_id, date,
+                           ((id - %s) * 7919) %% 100 AS score, ((id - %s) * 104729) %% 1000 AS pick
+                    FROM {Appointment._meta.db_table}
+                    WHERE status = 'approved' AND date < %s AND id BETWEEN %s AND %s
+                ) completed
+                WHERE pick < %s
+                """,
+                [first_review_id, first_id, first_id, anchor, first_id, last_id, int(rate * 1000)],
+            )
+            created = cursor.rowcount
+        self.reset_sequences(Review)
+        return created
+
+    def reset_sequences(self, model):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
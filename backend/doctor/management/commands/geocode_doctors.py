@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from doctor import geo
+from doctor.models import Doctor
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode doctor addresses with the bundled gazetteer (doctor/data/gazetteer.csv). "
+        "Doctor saves geocode themselves; run this after editing the gazetteer or bulk-loading doctors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--missing-only', action='store_true', help='Only doctors without coordinates.')
+
+    def handle(self, *args, **options):
+        queryset = Doctor.objects.all()
+        if options['missing_only']:
+            queryset = queryset.filter(latitude=None)
+        total = queryset.count()
+        placed = geo.backfill(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Placed {placed} of {total} doctor(s); {total - placed} address(es) matched no place."))
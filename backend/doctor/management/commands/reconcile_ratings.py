@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from doctor import ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every doctor's rating totals from its reviews and repair any drift. "
+        "Reviews keep the totals current as they are written; run this periodically (e.g. "
+        "nightly from cron) to catch changes that bypassed the model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Doctors compared per query.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the doctors that drifted.')
+
+    def handle(self, *args, **options):
+        drifted = ratings.reconcile(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All doctor ratings match their reviews."))
+            return
+        verb = 'would repair' if options['dry_run'] else 'repaired'
+        sample = ', '.join(str(pk) for pk in drifted[:20]) + (', ...' if len(drifted) > 20 else '')
+        self.stdout.write(self.style.SUCCESS(f"{verb.capitalize()} {len(drifted)} doctor(s): {sample}"))
@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from doctor.reminders import Scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Send appointment reminders as they fall due (see doctor/reminders.py). Keeps running; "
+        "--once handles what is due now and exits. Reminders due while it was stopped are only "
+        "sent with --catch-up, and a catch-up that overlaps an earlier run sends them twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookahead', type=int, default=60, help='Minutes of upcoming reminders to keep loaded.')
+        parser.add_argument('--interval', type=float, default=30.0, help='Most seconds between polls for changes.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--catch-up', type=int, default=0, help='Also send reminders due in the last N minutes.')
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(lookahead=timedelta(minutes=options['lookahead']), batch_size=options['batch_size'])
+        now = timezone.now()
+        scheduler.start(now, since=now - timedelta(minutes=options['catch_up']))
+        try:
+            while True:
+                delivered = scheduler.tick(timezone.now())
+                if delivered:
+                    self.stdout.write(self.style.SUCCESS(f"Sent {delivered} reminder(s)"))
+                if options['once']:
+                    break
+                delay = options['interval']
+                due = scheduler.next_due()
+                if due is not None:
+                    delay = min(delay, max((due - timezone.now()).total_seconds(), 0))
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"{len(scheduler.heap)} reminder(s) queued when stopped")
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = "to_tsvector('english', coalesce({row}.notes, ''))"
+
+
+def add_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION doctor_appointment_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.notes IS NOT DISTINCT FROM OLD.notes THEN
+                NEW.search_vector := OLD.search_vector;
+            ELSE
+                NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW')};
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER doctor_appointment_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON doctor_appointment
+        FOR EACH ROW EXECUTE PROCEDURE doctor_appointment_search_vector_update()
+    """)
+    schema_editor.execute(
+        f"UPDATE doctor_appointment SET search_vector = {SEARCH_VECTOR_SQL.format(row='doctor_appointment')}"
+    )
+    schema_editor.execute(
+        "CREATE INDEX doctor_appointment_search_vector_gin ON doctor_appointment USING gin (search_vector)"
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS doctor_appointment_search_vector_gin")
+    schema_editor.execute("DROP TRIGGER IF EXISTS doctor_appointment_search_vector_trigger ON doctor_appointment")
+    schema_editor.execute("DROP FUNCTION IF EXISTS doctor_appointment_search_vector_update()")
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0007_alter_appointment_patient_delete_patient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_search_trigger, drop_search_trigger),
+    ]
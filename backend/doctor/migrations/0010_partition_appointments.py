@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+
+from admin_api import partitions
+from doctor.partitions import partition_appointment_table
+
+
+def partition_appointments(apps, schema_editor):
+    connection = schema_editor.connection
+    if not partitions.is_supported(connection):
+        return
+    partition_appointment_table(connection, settings.APPOINTMENT_PARTITIONS_AHEAD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0009_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_appointments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:48
+
+import csv
+import re
+import unicodedata
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of doctor/geo.py's geocoder as of this migration, so later
+# changes to that module cannot change what the migration does.
+GAZETTEER = Path(__file__).resolve().parent.parent / 'data' / 'gazetteer.csv'
+GEOHASH_PRECISION = 9
+SPECIFICITY = {'district': 2, 'city': 1}
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return f" {WORD_RE.sub(' ', text).strip()} "
+
+
+def load_gazetteer():
+    entries = []
+    with open(GAZETTEER, encoding='utf-8', newline='') as handle:
+        for row in csv.DictReader(handle):
+            lat, lon = float(row['latitude']), float(row['longitude'])
+            for name in [row['name'], *filter(None, row['aliases'].split('|'))]:
+                entries.append((normalize(name), SPECIFICITY[row['kind']], lat, lon))
+    entries.sort(key=lambda entry: (-entry[1], -len(entry[0])))
+    return entries
+
+
+def geocode(gazetteer, address):
+    text = normalize(address)
+    if not text.strip():
+        return None
+    for name, _, lat, lon in gazetteer:
+        if name in text:
+            return lat, lon
+    return None
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geocode_doctors(apps, schema_editor, batch_size=1000):
+    Doctor = apps.get_model('doctor', 'Doctor')
+    gazetteer = load_gazetteer()
+    last_id = 0
+    while True:
+        doctors = list(Doctor.objects.filter(pk__gt=last_id).order_by('pk').only('pk', 'address')[:batch_size])
+        if not doctors:
+            return
+        last_id = doctors[-1].pk
+        for doctor in doctors:
+            point = geocode(gazetteer, doctor.address)
+            doctor.latitude, doctor.longitude = point if point else (None, None)
+            doctor.geohash = encode(*point) if point else ''
+        Doctor.objects.bulk_update(doctors, ['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0011_reviews'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['geohash'], name='doctor_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['specialization', 'geohash'], name='doctor_spec_geohash_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.RunPython(geocode_doctors, migrations.RunPython.noop),
+    ]
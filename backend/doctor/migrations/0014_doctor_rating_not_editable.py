@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:32
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0013_appointment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doctor',
+            name='rating',
+            field=models.DecimalField(decimal_places=1, default=5.0, editable=False, max_digits=3, validators=[django.core.validators.MinValueValidator(1.0), django.core.validators.MaxValueValidator(5.0)]),
+        ),
+    ]
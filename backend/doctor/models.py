@@ -4,7 +4,9 @@ from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.search import SearchVectorField
 from patients.models import Patient
+from . import geo
 
 class Doctor(models.Model):
     SPECIALIZATION_CHOICES = [
@@ -27,11 +29,60 @@ class Doctor(models.Model):
         max_digits=3,  # Total digits: 2 (e.g., 5.0, 4.5)
         decimal_places=1,  # One decimal place
         default=5.0,  # Default rating
+        editable=False,  # The average of the reviews, see doctor/ratings.py
         validators=[
             MinValueValidator(1.0),  # Minimum rating of 1
             MaxValueValidator(5.0)   # Maximum rating of 5
         ]
     )
+    # Running totals of Review.rating, kept by doctor/ratings.py; `rating` is
+    # their average so the directory can sort on a plain column.
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Filled from `address` by the offline geocoder (doctor/geo.py); null when
+    # the address names no known place.
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
+
+    RATING_FIELDS = ('rating', 'rating_sum', 'rating_count')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating', '-rating_count'], name='doctor_rating_idx'),
+            # Nearby search scans geohash prefixes, optionally within one specialization.
+            models.Index(fields=['geohash'], name='doctor_geohash_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(
+                fields=['specialization', 'geohash'], name='doctor_spec_geohash_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
+    GEO_FIELDS = ('latitude', 'longitude', 'geohash')
+
+    def locate(self):
+        point = geo.geocode(self.address)
+        if point is None:
+            self.latitude, self.longitude, self.geohash = None, None, ''
+        else:
+            self.latitude, self.longitude = point[0], point[1]
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.locate()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'address' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *self.GEO_FIELDS}
+        # Profile saves (and the re-save on every user save, see signals.py) must not
+        # write back rating totals loaded before a concurrent review changed them.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_FIELDS
+            ]
+        return super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Dr. {self.user.first_name} {self.user.last_name}"
     
@@ -78,6 +129,32 @@ class Appointment(models.Model):
         ('rejected', 'Rejected')
     ], default='pending')
     notes = models.TextField(blank=True)
+    # Kept up to date by a database trigger on PostgreSQL (see migration 0008)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Lets the reminder scheduler (doctor/reminders.py) poll for changes.
+    # queryset.update() bypasses auto_now and must set it explicitly.
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['updated_at'], name='appointment_updated_idx')]
+
+    def __str__(self):
+        return f"{self.patient.user.get_full_name()} - {self.date} - {self.status}"
+
+
+class Review(models.Model):
+    # doctor_appointment is partitioned on PostgreSQL and its primary key is
+    # (id, date), so the database cannot enforce this reference; Django
+    # cascades the delete instead.
+    appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name='review', db_constraint=False)
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='reviews')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='reviews')
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['doctor', '-created_at'], name='doctor_review_recent_idx')]
 
     def __str__(self):
-        return f"{self.patient.user.get_full_name()} - {self.date} - {self.status}"
\ No newline at end of file
+        return f"{self.rating}/5 for {self.doctor} by {self.patient}"
@@ -0,0 +1,39 @@
+# doctor/partitions.py
+"""
+Monthly range partitioning of doctor_appointment on `date`.
+
+Reads that bound `date` (the dashboard counters, `?upcoming=` / `?since=`
+lists, rollups) only scan the partitions they overlap, so the hot path stays
+on the current and coming months however much history accumulates. Old
+partitions can be moved to a cheaper tablespace while staying queryable, or
+detached into standalone tables for export (see archive_appointments).
+
+The generic helpers live in admin_api.partitions; this module adds what the
+appointment table needs on top of them: the foreign keys, the lookup indexes
+and the full-text trigger that a rebuilt table does not inherit.
+"""
+from admin_api import partitions
+
+TABLE = 'doctor_appointment'
+COLUMN = 'date'
+
+
+def partition_appointment_table(connection, months_ahead):
+    qn = connection.ops.quote_name
+    partitions.convert_to_partitioned(connection, TABLE, COLUMN, months_ahead=months_ahead)
+    with connection.cursor() as cursor:
+        for column, target in (('doctor_id', 'doctor_doctor'), ('patient_id', 'patients_patient')):
+            cursor.execute(
+                f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(f'{TABLE}_{column}_fk')} "
+                f"FOREIGN KEY ({qn(column)}) REFERENCES {qn(target)} (id) DEFERRABLE INITIALLY DEFERRED"
+            )
+            # (doctor_id, date) serves both the FK lookups and the per-doctor schedule ranges.
+            cursor.execute(f"CREATE INDEX {qn(f'{TABLE}_{column}_date_idx')} ON {qn(TABLE)} ({qn(column)}, {qn(COLUMN)})")
+        cursor.execute(f"CREATE INDEX {qn(f'{TABLE}_search_vector_gin')} ON {qn(TABLE)} USING gin (search_vector)")
+        # The function itself survives from doctor 0008; only the trigger went with the old table.
+        cursor.execute(f"""
+            CREATE TRIGGER {qn(f'{TABLE}_search_vector_trigger')}
+            BEFORE INSERT OR UPDATE ON {qn(TABLE)}
+            FOR EACH ROW EXECUTE PROCEDURE doctor_appointment_search_vector_update()
+        """)
+        cursor.execute(f"ANALYZE {qn(TABLE)}")
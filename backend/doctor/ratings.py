@@ -0,0 +1,89 @@
+# doctor/ratings.py
+"""
+Doctor rating aggregates.
+
+Each review insert or delete adjusts Doctor.rating_sum / rating_count with a
+single UPDATE built from F() expressions, and recomputes Doctor.rating from
+the same old row values in that statement. Concurrent reviews for a doctor
+therefore serialize on the doctor row instead of losing updates, and the
+directory sorts on an indexed column without touching the review table.
+
+`manage.py reconcile_ratings` recomputes the totals from the reviews and
+repairs any drift (bulk deletes or raw SQL that bypassed the signals).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Greatest, Round
+
+from .models import Doctor, Review
+
+UNRATED = Decimal('5.0')  # Doctor.rating's default, kept while a doctor has no reviews
+
+
+def apply_review(doctor_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one review of `rating` stars."""
+    total = F('rating_sum') + rating * delta
+    count = F('rating_count') + delta
+    Doctor.objects.filter(pk=doctor_id).update(
+        # Clamped so removing a review from totals that drifted low cannot fail;
+        # reconcile() repairs them.
+        rating_sum=Greatest(total, 0),
+        rating_count=Greatest(count, 0),
+        rating=Case(
+            # The right-hand sides see the row as it was, so this tests the new count for zero.
+            When(rating_count__lte=-delta, then=Value(UNRATED)),
+            # Enough places that ROUND (half away from zero) sees the exact average,
+            # as average() does; a 3-place cast would round twice.
+            default=Round(Cast(Cast(total, FloatField()) / count, DecimalField(max_digits=20, decimal_places=10)), 1),
+            output_field=DecimalField(max_digits=3, decimal_places=1),
+        ),
+    )
+
+
+def average(rating_sum, rating_count):
+    if not rating_count:
+        return UNRATED
+    # Half up, like SQL ROUND in apply_review(), so reconcile() sees no drift.
+    return (Decimal(rating_sum) / rating_count).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+
+def reconcile(batch_size=1000, dry_run=False):
+    """
+    Compare every doctor's totals with its reviews and fix the ones that drifted.
+    Returns the ids of the doctors that were (or, with dry_run, would be) fixed.
+    """
+    drifted = []
+    last_id = 0
+    while True:
+        doctors = list(
+            Doctor.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'rating_sum', 'rating_count', 'rating')[:batch_size]
+        )
+        if not doctors:
+            break
+        last_id = doctors[-1][0]
+        actual = {
+            row['doctor_id']: (row['total'], row['count'])
+            for row in Review.objects.filter(doctor_id__in=[doctor[0] for doctor in doctors])
+            .values('doctor_id').annotate(total=Sum('rating'), count=Count('id')).order_by()
+        }
+        for pk, rating_sum, rating_count, rating in doctors:
+            total, count = actual.get(pk, (0, 0))
+            if (rating_sum, rating_count, rating) != (total, count, average(total, count)):
+                drifted.append(pk)
+                if not dry_run:
+                    _repair(pk)
+    return drifted
+
+
+def _repair(doctor_id):
+    # Recount under the row lock so a review landing meanwhile is not overwritten.
+    with transaction.atomic():
+        Doctor.objects.select_for_update().filter(pk=doctor_id).exists()
+        totals = Review.objects.filter(doctor_id=doctor_id).aggregate(total=Sum('rating'), count=Count('id'))
+        total, count = totals['total'] or 0, totals['count']
+        Doctor.objects.filter(pk=doctor_id).update(
+            rating_sum=total, rating_count=count, rating=average(total, count),
+        )
@@ -0,0 +1,165 @@
+# doctor/reminders.py
+"""
+Reminders sent ahead of approved appointments, once per offset in
+APPOINTMENT_REMINDER_OFFSETS (minutes before the appointment).
+
+`Scheduler` only holds the reminders due within its look-ahead window, in a
+heap ordered by due time. As the clock moves it loads the next slice of the
+window with one range query per offset, and picks up appointments booked,
+approved or moved since its last poll through Appointment.updated_at, so its
+memory follows the number of reminders in the window, not the table.
+
+Heap entries are hints. Due reminders are re-read in batches before they are
+sent and dropped if their appointment was rejected, moved or deleted; a moved
+appointment gets new entries from the poll. What is left goes to the sink
+named by APPOINTMENT_REMINDER_SINK, an object with `send(batch)` taking
+[(reminder, appointment)] and returning how many were delivered.
+"""
+import heapq
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from admin_api.models import AdminNotification
+
+from .models import Appointment
+
+# A row saved just before a poll can commit just after it, so each poll
+# reaches this far behind the previous one.
+POLL_OVERLAP = timedelta(seconds=60)
+
+
+class Reminder(NamedTuple):
+    due: datetime
+    appointment_id: int
+    offset: int  # minutes before the appointment
+    date: datetime  # the appointment time it was scheduled for
+
+    @property
+    def key(self):
+        return self.appointment_id, self.offset, self.date
+
+
+class NotificationSink:
+    """Writes the reminders as AdminNotification rows for the patients."""
+
+    def send(self, batch):
+        notifications = [
+            AdminNotification(recipient_email=appointment.patient.user.email, message=message(appointment))
+            for reminder, appointment in batch
+            if appointment.patient.user.email
+        ]
+        AdminNotification.objects.bulk_create(notifications)
+        return len(notifications)
+
+
+def message(appointment):
+    when = timezone.localtime(appointment.date)
+    return f"Reminder: you have an appointment with {appointment.doctor} on {when:%A %d %B at %H:%M}."
+
+
+def get_sink():
+    return import_string(settings.APPOINTMENT_REMINDER_SINK)()
+
+
+class Scheduler:
+    def __init__(self, sink=None, lookahead=timedelta(hours=1), batch_size=500):
+        self.sink = sink or get_sink()
+        self.offsets = sorted(settings.APPOINTMENT_REMINDER_OFFSETS, reverse=True)
+        self.lookahead = lookahead
+        self.batch_size = batch_size
+        self.heap = []
+        self.queued = set()  # keys in the heap
+        self.sent = {}  # key -> appointment time, kept until the appointment has started
+        self.loaded_until = None
+        self.polled_at = None
+
+    def start(self, now, since=None):
+        """Begin at `now`; reminders that fell due after `since` are sent on the first tick."""
+        self.loaded_until = since or now
+        self.polled_at = now
+
+    def upcoming(self):
+        return Appointment.objects.filter(status='approved').values_list('id', 'date')
+
+    def push(self, reminder):
+        if reminder.key in self.queued or reminder.key in self.sent:
+            return
+        self.queued.add(reminder.key)
+        heapq.heappush(self.heap, reminder)
+
+    def load(self, now):
+        """Queue the reminders due in (loaded_until, now + lookahead]."""
+        horizon = now + self.lookahead
+        if horizon <= self.loaded_until:
+            return
+        for offset in self.offsets:
+            before = timedelta(minutes=offset)
+            rows = self.upcoming().filter(date__gt=self.loaded_until + before, date__lte=horizon + before)
+            for appointment_id, date in rows.iterator():
+                self.push(Reminder(date - before, appointment_id, offset, date))
+        self.loaded_until = horizon
+
+    def poll(self, now):
+        """Queue reminders for appointments saved since the last poll, inside the loaded window."""
+        since, self.polled_at = self.polled_at - POLL_OVERLAP, now
+        rows = self.upcoming().filter(
+            updated_at__gt=since, date__gt=now, date__lte=self.loaded_until + timedelta(minutes=self.offsets[0]),
+        )
+        for appointment_id, date in rows.iterator():
+            overdue = None
+            for offset in self.offsets:
+                due = date - timedelta(minutes=offset)
+                if due > self.loaded_until:
+                    continue  # load() reaches it
+                if due > now:
+                    self.push(Reminder(due, appointment_id, offset, date))
+                else:
+                    overdue = offset
+            # Booked or approved after some reminders fell due: send the closest one now.
+            if overdue is not None:
+                self.push(Reminder(now, appointment_id, overdue, date))
+
+    def due_batch(self, now):
+        batch = []
+        while self.heap and self.heap[0].due <= now and len(batch) < self.batch_size:
+            reminder = heapq.heappop(self.heap)
+            self.queued.discard(reminder.key)
+            batch.append(reminder)
+        return batch
+
+    def dispatch(self, now):
+        """Send everything due by `now`, one batch per query; returns how many were delivered."""
+        delivered = 0
+        while batch := self.due_batch(now):
+            # `date` lets PostgreSQL skip the partitions these cannot be in.
+            current = Appointment.objects.filter(
+                status='approved', date__in={reminder.date for reminder in batch},
+            ).select_related('doctor__user', 'patient__user').in_bulk({reminder.appointment_id for reminder in batch})
+            ready = []
+            for reminder in batch:
+                appointment = current.get(reminder.appointment_id)
+                if appointment is not None and appointment.date == reminder.date and reminder.date > now:
+                    ready.append((reminder, appointment))
+            try:
+                delivered += self.sink.send(ready)
+            except Exception:
+                for reminder in batch:
+                    self.push(reminder)
+                raise
+            for reminder, appointment in ready:
+                self.sent[reminder.key] = reminder.date
+        return delivered
+
+    def tick(self, now):
+        self.load(now)
+        self.poll(now)
+        delivered = self.dispatch(now)
+        self.sent = {key: date for key, date in self.sent.items() if date > now}
+        return delivered
+
+    def next_due(self):
+        return self.heap[0].due if self.heap else None
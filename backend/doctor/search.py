@@ -0,0 +1,133 @@
+# doctor/search.py
+"""
+Full-text search over appointment notes and patient medical history/allergies,
+limited to what the requesting doctor can see: the notes of their own
+appointments and the records of patients they have appointments with.
+
+On PostgreSQL this runs against the trigger-maintained `search_vector`
+columns (GIN indexed); ranking happens first and headlines are only built
+for the rows that make the cut. Other backends fall back to icontains.
+"""
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.html import escape
+
+from patients.models import Patient
+from .models import Appointment
+
+# Sentinels are swapped for <mark> after HTML-escaping the snippet text.
+START, STOP = '\x02', '\x03'
+
+
+def _mark(text):
+    return escape(text or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def _patient_name(row, prefix):
+    return f"{row[prefix + 'first_name']} {row[prefix + 'last_name']}".strip()
+
+
+def search(doctor, text, limit=20):
+    if connection.vendor == 'postgresql':
+        return _search_postgres(doctor, text, limit)
+    return _search_fallback(doctor, text, limit)
+
+
+def _search_postgres(doctor, text, limit):
+    query = SearchQuery(text, search_type='websearch', config='english')
+    rank = SearchRank(F('search_vector'), query)
+    my_patients = Appointment.objects.filter(doctor=doctor).values('patient_id')
+
+    notes = list(
+        Appointment.objects.filter(doctor=doctor, search_vector=query)
+        .annotate(rank=rank).order_by('-rank', '-date').values_list('id', 'rank')[:limit]
+    )
+    records = list(
+        Patient.objects.filter(id__in=my_patients, search_vector=query)
+        .annotate(rank=rank).order_by('-rank').values_list('id', 'rank')[:limit]
+    )
+    top = sorted(
+        [('appointment', pk, score) for pk, score in notes] + [('patient', pk, score) for pk, score in records],
+        key=lambda hit: hit[2], reverse=True,
+    )[:limit]
+
+    def headline(field):
+        return SearchHeadline(
+            field, query, config='english', start_sel=START, stop_sel=STOP,
+            max_fragments=2, fragment_delimiter=' … ',
+        )
+
+    appointment_ids = [pk for kind, pk, _ in top if kind == 'appointment']
+    patient_ids = [pk for kind, pk, _ in top if kind == 'patient']
+    appointments = {
+        row['id']: row for row in Appointment.objects.filter(id__in=appointment_ids)
+        .annotate(snippet=headline('notes'))
+        .values('id', 'date', 'patient_id', 'patient__user__first_name', 'patient__user__last_name', 'snippet')
+    }
+    patients = {
+        row['id']: row for row in Patient.objects.filter(id__in=patient_ids)
+        .annotate(allergies_snippet=headline('allergies'), history_snippet=headline('medical_history'))
+        .values('id', 'user__first_name', 'user__last_name', 'allergies_snippet', 'history_snippet')
+    }
+
+    results = []
+    for kind, pk, score in top:
+        if kind == 'appointment':
+            row = appointments[pk]
+            results.append({
+                'type': 'appointment',
+                'id': pk,
+                'patient_id': row['patient_id'],
+                'patient_name': _patient_name(row, 'patient__user__'),
+                'date': row['date'],
+                'rank': score,
+                'snippet': _mark(row['snippet']),
+            })
+        else:
+            row = patients[pk]
+            snippets = [s for s in (row['allergies_snippet'], row['history_snippet']) if s and START in s]
+            results.append({
+                'type': 'patient',
+                'id': pk,
+                'patient_id': pk,
+                'patient_name': _patient_name(row, 'user__'),
+                'date': None,
+                'rank': score,
+                'snippet': ' … '.join(_mark(s) for s in snippets),
+            })
+    return results
+
+
+def _search_fallback(doctor, text, limit):
+    def excerpt(value):
+        index = value.lower().find(text.lower())
+        if index < 0:
+            return ''
+        start = max(index - 60, 0)
+        hit = value[index:index + len(text)]
+        return _mark(value[start:index] + START + hit + STOP + value[index + len(text):index + len(text) + 60])
+
+    results = []
+    for row in (
+        Appointment.objects.filter(doctor=doctor, notes__icontains=text).order_by('-date')
+        .values('id', 'date', 'notes', 'patient_id', 'patient__user__first_name', 'patient__user__last_name')[:limit]
+    ):
+        results.append({
+            'type': 'appointment', 'id': row['id'], 'patient_id': row['patient_id'],
+            'patient_name': _patient_name(row, 'patient__user__'), 'date': row['date'],
+            'rank': None, 'snippet': excerpt(row['notes']),
+        })
+    my_patients = Appointment.objects.filter(doctor=doctor).values('patient_id')
+    for row in (
+        Patient.objects.filter(id__in=my_patients)
+        .filter(Q(allergies__icontains=text) | Q(medical_history__icontains=text))
+        .values('id', 'allergies', 'medical_history', 'user__first_name', 'user__last_name')[:limit]
+    ):
+        snippets = [s for s in (excerpt(row['allergies']), excerpt(row['medical_history'])) if s]
+        results.append({
+            'type': 'patient', 'id': row['id'], 'patient_id': row['id'],
+            'patient_name': _patient_name(row, 'user__'), 'date': None,
+            'rank': None, 'snippet': ' … '.join(snippets),
+        })
+    return results[:limit]
@@ -103,8 +103,11 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Doctor, DoctorAvailability, Appointment
+from django.db import transaction
+from django.utils import timezone
+from .models import Doctor, DoctorAvailability, Appointment, Review
 from django.core.exceptions import ValidationError
+from accounts.sparse_fields import SparseFieldsetSerializerMixin
 import json
 
 User = get_user_model()
@@ -120,13 +123,15 @@ class UserSerializer(serializers.ModelSerializer):
             }
         }
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer()
     full_name = serializers.SerializerMethodField()
 
     class Meta:
         model = Doctor
-        fields = ['id', 'user', 'full_name', 'specialization', 'phone', 'bio', 'image', 'address', 'rating']
+        fields = ['id', 'user', 'full_name', 'specialization', 'phone', 'bio', 'image', 'address', 'rating', 'rating_count']
+        # Maintained from reviews, see doctor/ratings.py
+        read_only_fields = ['rating', 'rating_count']
 
     def get_full_name(self, obj):
         first_name = obj.user.first_name.strip() if obj.user.first_name else ''
@@ -186,7 +191,8 @@ class DoctorSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['full_name'] = self.get_full_name(instance)
+        if 'full_name' in self.fields:
+            representation['full_name'] = self.get_full_name(instance)
         return representation
 
 class DoctorRegisterSerializer(serializers.ModelSerializer):
@@ -196,33 +202,40 @@ class DoctorRegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = ['id', 'user', 'password', 'specialization', 'phone', 'bio', 'address', 'rating']
+        read_only_fields = ['rating']
 
+    def validate_user(self, user_data):
+        # UserSerializer drops the unique validator for profile updates.
+        if User.objects.filter(username=user_data['username']).exists():
+            raise serializers.ValidationError({'username': ['This username is already taken.']})
+        return user_data
+
+    @transaction.atomic
     def create(self, validated_data):
         user_data = validated_data.pop('user')
-        password = validated_data.pop('password')
-        
-        user = User.objects.create(
+        user = User(
             username=user_data['username'],
             email=user_data.get('email', ''),
             first_name=user_data.get('first_name', ''),
             last_name=user_data.get('last_name', ''),
             role='doctor'
         )
-        user.set_password(password)
+        user.set_password(validated_data.pop('password'))
+        # Attached before the user is saved, so doctor.signals leaves the profile to us:
+        # one insert per table.
+        user.doctor = doctor = Doctor(**validated_data)
         user.save()
-
-        doctor = Doctor.objects.create(
-            user=user,
-            **validated_data
-        )
+        doctor.save()
         return doctor
 
-class DoctorAvailabilitySerializer(serializers.ModelSerializer):
+class DoctorAvailabilitySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DoctorAvailability
         fields = ['id', 'doctor', 'day', 'start_time', 'end_time']
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    field_dependencies = {'time': ['date']}
+
     # doctor = DoctorSerializer(read_only=True)
     doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all())
 
@@ -252,4 +265,29 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return obj.doctor.specialization if obj.doctor else ''
         
     def get_time(self, obj):
-        return obj.date.strftime('%H:%M') if obj.date else ''
\ No newline at end of file
+        return obj.date.strftime('%H:%M') if obj.date else ''
+
+class ReviewSerializer(serializers.ModelSerializer):
+    patient_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Review
+        fields = ['id', 'appointment', 'doctor', 'patient_name', 'rating', 'comment', 'created_at']
+        read_only_fields = ['doctor', 'patient_name', 'created_at']
+
+    def get_patient_name(self, obj):
+        return obj.patient.user.get_full_name()
+
+    def validate_appointment(self, appointment):
+        patient = self.context['patient']
+        if appointment.patient_id != patient.pk:
+            raise serializers.ValidationError("You can only review your own appointments.")
+        if appointment.status != 'approved' or appointment.date > timezone.now():
+            raise serializers.ValidationError("Only completed appointments can be reviewed.")
+        if Review.objects.filter(appointment=appointment).exists():
+            raise serializers.ValidationError("This appointment has already been reviewed.")
+        return appointment
+
+    def create(self, validated_data):
+        appointment = validated_data['appointment']
+        return Review.objects.create(doctor_id=appointment.doctor_id, patient=self.context['patient'], **validated_data)
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Doctor
+from . import ratings
+from .models import Doctor, Review
 
 User = get_user_model()
 
@@ -9,15 +10,30 @@ User = get_user_model()
 def create_doctor_profile(sender, instance, created, **kwargs):
     """
     Signal handler to create a Doctor profile when a new User is created.
-    Only creates the profile if it doesn't already exist and the user's role is 'doctor'.
+    Only creates the profile if the user's role is 'doctor' and the caller has not
+    attached one to save itself (user.doctor = Doctor(...), as the registration
+    serializers do), which a new user has exactly when it is cached.
     """
-    if created and instance.role == 'doctor' and not hasattr(instance, 'doctor'):
-        Doctor.objects.create(user=instance, specialization='', phone='', bio='', address='')
+    if created and instance.role == 'doctor' and not sender.doctor.is_cached(instance):
+        Doctor.objects.create(
+            user=instance, specialization=instance.specialization or '', phone='', bio='', address='',
+        )
 
 @receiver(post_save, sender=User)
-def save_doctor_profile(sender, instance, **kwargs):
+def save_doctor_profile(sender, instance, created, **kwargs):
     """
     Signal handler to save the Doctor profile whenever the User is saved.
+    A new user's profile is being saved by whoever created it.
     """
-    if hasattr(instance, 'doctor'):
-        instance.doctor.save()
\ No newline at end of file
+    if not created and hasattr(instance, 'doctor'):
+        instance.doctor.save()
+
+@receiver(post_save, sender=Review)
+def add_review_to_rating(sender, instance, created, **kwargs):
+    if created:
+        ratings.apply_review(instance.doctor_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_rating(sender, instance, **kwargs):
+    ratings.apply_review(instance.doctor_id, instance.rating, -1)
@@ -0,0 +1,107 @@
+# doctor/slots.py
+"""
+Earliest free appointment slots across many doctors.
+
+A doctor's free slots are a lazy stream: the weekly DoctorAvailability
+windows cut into APPOINTMENT_SLOT_MINUTES slots, minus the slots taken by
+pending or approved appointments. Appointments are read a week at a time,
+only when the stream gets that far.
+
+`earliest` merges the streams with a heap. Every doctor starts in the heap
+under an optimistic key, the first slot of their windows, which costs no
+query; a doctor's appointments are only read once that key reaches the top.
+The merge stops after K slots, so a search over a large specialty reads the
+bookings of a handful of doctors rather than everyone's calendar.
+"""
+import heapq
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment, DoctorAvailability
+
+WEEKDAYS = [day for day, _ in DoctorAvailability.DAYS_OF_WEEK]
+BLOCKING_STATUSES = ('pending', 'approved')
+CHUNK_DAYS = 7
+
+
+def slot_length():
+    return timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+
+
+def window_slots(windows, start, end):
+    """Every slot start in the weekly `windows` ({weekday index: (start_time, end_time)}) in [start, end)."""
+    length = slot_length()
+    zone = timezone.get_current_timezone()
+    day = timezone.localtime(start, zone).date()
+    while True:
+        window = windows.get(day.weekday())
+        if window is not None:
+            slot = timezone.make_aware(datetime.combine(day, window[0]), zone)
+            close = timezone.make_aware(datetime.combine(day, window[1]), zone)
+            while slot + length <= close:
+                if slot >= end:
+                    return
+                if slot >= start:
+                    yield slot
+                slot += length
+        day += timedelta(days=1)
+        if timezone.make_aware(datetime.combine(day, datetime.min.time()), zone) >= end:
+            return
+
+
+def free_slots(doctor_id, windows, start, end):
+    """window_slots minus booked ones, reading the doctor's appointments one chunk at a time."""
+    length = slot_length()
+    booked, loaded_until = [], start
+    for slot in window_slots(windows, start, end):
+        if slot + length > loaded_until:
+            loaded_until = min(max(slot + length, loaded_until) + timedelta(days=CHUNK_DAYS), end)
+            # Appointments that started up to a slot earlier can still overlap.
+            booked = sorted(
+                Appointment.objects.filter(
+                    doctor_id=doctor_id, status__in=BLOCKING_STATUSES,
+                    date__gt=slot - length, date__lt=loaded_until,
+                ).values_list('date', flat=True)
+            )
+        # Taken if an appointment (one slot long) starts within (slot - length, slot + length).
+        index = bisect_right(booked, slot - length)
+        if index < len(booked) and booked[index] < slot + length:
+            continue
+        yield slot
+
+
+def weekly_windows(doctors):
+    """{doctor_id: {weekday index: (start_time, end_time)}} for a doctor queryset, in one query."""
+    windows = {}
+    rows = DoctorAvailability.objects.filter(doctor__in=doctors).values_list('doctor_id', 'day', 'start_time', 'end_time')
+    for doctor_id, day, start_time, end_time in rows:
+        windows.setdefault(doctor_id, {})[WEEKDAYS.index(day)] = (start_time, end_time)
+    return windows
+
+
+def earliest(doctors, k=10, start=None, days=30):
+    """The k earliest free slots among `doctors` (a queryset) as [(slot start, doctor_id)]."""
+    start = start or timezone.now()
+    end = start + timedelta(days=days)
+    heap = []
+    for doctor_id, windows in weekly_windows(doctors).items():
+        first = next(window_slots(windows, start, end), None)
+        if first is not None:
+            # (slot, doctor, stream, windows): stream is None while the slot is only a lower bound.
+            heap.append((first, doctor_id, None, windows))
+    heapq.heapify(heap)
+
+    results = []
+    while heap and len(results) < k:
+        slot, doctor_id, stream, windows = heapq.heappop(heap)
+        if stream is None:
+            stream = free_slots(doctor_id, windows, slot, end)
+        else:
+            results.append((slot, doctor_id))
+        following = next(stream, None)
+        if following is not None:
+            heapq.heappush(heap, (following, doctor_id, stream, windows))
+    return results
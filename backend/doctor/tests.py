@@ -1,3 +1,432 @@
-from django.test import TestCase
+import json
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.tests import count_writes, one_insert_each
+from admin_api.models import AdminNotification
+from patients.models import Patient
+from . import geo, ratings, reminders, slots
+from .fast_serializers import CompiledSerializer
+from .models import Appointment, Doctor, DoctorAvailability, Review
+from .serializers import AppointmentSerializer, DoctorSerializer
+
+User = get_user_model()
+
+REGISTRATION = {
+    'user': {'username': 'doc', 'email': 'doc@example.com', 'first_name': 'Dee', 'last_name': 'Oc'},
+    'password': 'secret-pass-1',
+    'specialization': 'Cardiologist',
+    'phone': '0100',
+    'address': 'Cairo',
+}
+
+
+@override_settings(RATE_LIMITS={})
+class DoctorRegistrationTests(TestCase):
+    def post(self, data=REGISTRATION):
+        return self.client.post('/api/doctor/register/', data, content_type='application/json')
+
+    def test_one_insert_per_table(self):
+        with count_writes() as writes:
+            response = self.post()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(writes, one_insert_each('accounts_customuser', 'doctor_doctor', 'admin_api_adminoutboxevent'))
+        doctor = Doctor.objects.select_related('user').get(user__username='doc')
+        self.assertEqual((doctor.specialization, doctor.phone), ('Cardiologist', '0100'))
+        self.assertTrue(doctor.user.check_password('secret-pass-1'))
+
+    def test_taken_username(self):
+        User.objects.create_user('doc', password='x')
+        self.assertEqual(self.post().status_code, 400)
+
+    def test_rolls_back_the_user(self):
+        with mock.patch.object(Doctor, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            self.post()
+        self.assertFalse(User.objects.filter(username='doc').exists())
+
+
+def make_doctor(username, **fields):
+    user = User.objects.create_user(username, role='doctor', **fields.pop('user', {}))
+    Doctor.objects.filter(user=user).update(**fields)
+    return Doctor.objects.get(user=user)
+
+
+def make_patient(username, **user_fields):
+    return User.objects.create_user(username, role='patient', **user_fields).patient_profile
+
+
+class CompiledSerializerTests(TestCase):
+    def setUp(self):
+        self.doctors = [
+            make_doctor('plain'),
+            make_doctor('named', user={'first_name': ' Ada ', 'last_name': 'Lovelace', 'email': 'ada@example.com'},
+                        specialization='Cardiologist', bio='Bio', image='doctor_images/ada.png'),
+            make_doctor('last-only', user={'last_name': 'Curie'}, phone='0100', address='Cairo'),
+        ]
+        patients = [make_patient('p1'), make_patient('p2', first_name='Pat', last_name='Ient')]
+        start = timezone.now().replace(second=0, microsecond=0)
+        for i in range(6):
+            Appointment.objects.create(
+                doctor=self.doctors[i % 3], patient=patients[i % 2], date=start + timedelta(minutes=45 * i),
+                status=('pending', 'approved', 'rejected')[i % 3], notes='' if i % 2 else 'Follow-up',
+            )
+
+    def assertSameOutput(self, serializer_class, queryset, query=''):
+        context = {'request': Request(APIRequestFactory().get(f'/{query}'))}
+        expected = serializer_class(queryset, many=True, context=context).data
+        actual = CompiledSerializer(serializer_class, context).serialize(queryset)
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_doctors_match_drf(self):
+        self.assertSameOutput(DoctorSerializer, Doctor.objects.order_by('id'))
+        self.assertSameOutput(DoctorSerializer, Doctor.objects.order_by('id'), '?fields=id,full_name,user')
+
+    def test_appointments_match_drf(self):
+        self.assertSameOutput(AppointmentSerializer, Appointment.objects.order_by('id'))
+        self.assertSameOutput(AppointmentSerializer, Appointment.objects.order_by('id'), '?exclude=notes')
+
+    @override_settings(RATE_LIMITS={})
+    def test_list_view_uses_the_same_shape(self):
+        client = APIClient()
+        client.force_authenticate(self.doctors[1].user)
+        response = client.get('/api/doctor/doctors/')
+        self.assertEqual(response.status_code, 200)
+        expected = DoctorSerializer(
+            Doctor.objects.order_by('id'), many=True, context={'request': response.wsgi_request},
+        ).data
+        rows = response.json()
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        self.assertEqual(sorted(rows, key=lambda row: row['id']), json.loads(JSONRenderer().render(expected)))
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, *args):
+        call_command(
+            'generate_dataset', '--doctors=3', '--patients=20', '--appointments=400', '--years=1',
+            '--anchor-date=2025-06-02', '--review-rate=0.5', *args, stdout=StringIO(),
+        )
+
+    def snapshot(self, prefix):
+        appointments = Appointment.objects.filter(doctor__user__username__startswith=f'{prefix}-')
+        return (
+            list(appointments.order_by('id').values_list('id', 'doctor__user__username', 'date', 'status')),
+            list(
+                Review.objects.filter(appointment__in=appointments)
+                .order_by('id').values_list('id', 'appointment_id', 'rating')
+            ),
+        )
+
+    def test_same_arguments_same_data(self):
+        self.generate()
+        first = self.snapshot('seed')
+        self.generate('--clear')
+        self.assertEqual(self.snapshot('seed'), first)
+        self.assertEqual(len(first[0]), 400)
+        self.assertTrue(first[1])
+
+    def test_no_slot_is_booked_twice(self):
+        self.generate()
+        doubled = Appointment.objects.values('doctor', 'date').annotate(n=Count('id')).filter(n__gt=1)
+        self.assertFalse(doubled.exists())
+
+    def test_reviews_only_for_this_run(self):
+        self.generate('--prefix=first')
+        reviews = Review.objects.count()
+        self.generate('--prefix=second')
+        first_appointments = Appointment.objects.filter(doctor__user__username__startswith='first-')
+        self.assertEqual(Review.objects.filter(appointment__in=first_appointments).count(), reviews)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher', 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    ])
+    def test_fast_passwords(self):
+        self.generate('--fast-passwords', '--password=pass-1')
+        user = User.objects.get(username='seed-admin')
+        self.assertTrue(user.password.startswith('md5$'))
+        self.assertTrue(user.check_password('pass-1'))
+
+    def test_refuses_more_appointments_than_slots(self):
+        with self.assertRaisesMessage(CommandError, 'need more doctors'):
+            self.generate('--doctors=1', '--appointments=100000')
+
+
+class RatingTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doc')
+        self.patient = make_patient('pat')
+        self.start = timezone.now()
+
+    def review(self, stars):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, date=self.start + timedelta(days=Review.objects.count()),
+        )
+        return Review.objects.create(appointment=appointment, doctor=self.doctor, patient=self.patient, rating=stars)
+
+    def totals(self):
+        self.doctor.refresh_from_db()
+        return self.doctor.rating, self.doctor.rating_sum, self.doctor.rating_count
+
+    def test_average_rounds_half_up(self):
+        self.assertEqual(ratings.average(17, 4), Decimal('4.3'))
+        self.assertEqual(ratings.average(13, 4), Decimal('3.3'))
+        self.assertEqual(ratings.average(0, 0), ratings.UNRATED)
+
+    def test_insert_and_delete_keep_totals(self):
+        reviews = [self.review(stars) for stars in (5, 4, 4, 4)]  # 17 / 4 = 4.25
+        self.assertEqual(self.totals(), (Decimal('4.3'), 17, 4))
+        self.assertEqual(ratings.reconcile(), [])
+
+        reviews[0].delete()
+        self.assertEqual(self.totals(), (Decimal('4.0'), 12, 3))
+        for review in reviews[1:]:
+            review.delete()
+        self.assertEqual(self.totals(), (ratings.UNRATED, 0, 0))
+        self.assertEqual(ratings.reconcile(), [])
+
+    def test_reconcile_repairs_drift(self):
+        for stars in (5, 4, 4, 4):
+            self.review(stars)
+        # update() sends no signals, like the raw SQL and bulk loads reconcile() is for.
+        Doctor.objects.filter(pk=self.doctor.pk).update(rating_sum=40, rating_count=9, rating=Decimal('4.4'))
+        self.assertEqual(ratings.reconcile(dry_run=True), [self.doctor.pk])
+        self.assertEqual(self.totals(), (Decimal('4.4'), 40, 9))
+        self.assertEqual(ratings.reconcile(), [self.doctor.pk])
+        self.assertEqual(self.totals(), (Decimal('4.3'), 17, 4))
+
+    def test_profile_saves_do_not_touch_rating(self):
+        self.review(1)
+        doctor = Doctor.objects.get(pk=self.doctor.pk)
+        self.review(5)
+        doctor.phone = '0123'
+        doctor.save()
+        self.assertEqual(self.totals(), (Decimal('3.0'), 6, 2))
+        self.assertFalse(Doctor._meta.get_field('rating').editable)
+
+
+class NearestDoctorsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        points = [(30.0 + rng.uniform(-0.3, 0.3), 31.2 + rng.uniform(-0.3, 0.3)) for _ in range(60)]
+        points += [(31.2001, 29.9187)] * 5 + [(24.0889, 32.8998)] * 3  # shared places, far away
+        for index, (lat, lon) in enumerate(points):
+            doctor = make_doctor(f'doc{index}', specialization=('Dentist', 'Surgeon')[index % 2])
+            Doctor.objects.filter(pk=doctor.pk).update(latitude=lat, longitude=lon, geohash=geo.encode(lat, lon))
+        make_doctor('unplaced')
+
+    def full_scan(self, queryset, lat, lon, k, max_km=None):
+        rows = sorted(
+            ((doctor.pk, geo.haversine_km(lat, lon, doctor.latitude, doctor.longitude))
+             for doctor in queryset.exclude(latitude=None)),
+            key=lambda pair: (pair[1], pair[0]),
+        )
+        if max_km is not None:
+            rows = [row for row in rows if row[1] <= max_km]
+        return rows[:k]
+
+    def assertMatchesFullScan(self, queryset, lat, lon, k, max_km=None):
+        expected = self.full_scan(queryset, lat, lon, k, max_km)
+        actual = [(doctor.pk, distance) for doctor, distance in geo.nearest(queryset, lat, lon, k, max_km)]
+        self.assertEqual([pk for pk, _ in actual], [pk for pk, _ in expected], (lat, lon, k, max_km))
+        for (_, got), (_, want) in zip(actual, expected):
+            self.assertAlmostEqual(got, want, places=6)
+
+    def test_matches_a_full_scan(self):
+        rng = random.Random(11)
+        queries = [(30.0444, 31.2357), (31.2, 29.9), (24.1, 32.9), (0.0, 0.0)]
+        queries += [(30.0 + rng.uniform(-0.4, 0.4), 31.2 + rng.uniform(-0.4, 0.4)) for _ in range(10)]
+        for lat, lon in queries:
+            for k in (1, 5, 20, 100):
+                self.assertMatchesFullScan(Doctor.objects.all(), lat, lon, k)
+            self.assertMatchesFullScan(Doctor.objects.filter(specialization='Surgeon'), lat, lon, 7)
+            for max_km in (0.5, 5, 25, 500):
+                self.assertMatchesFullScan(Doctor.objects.all(), lat, lon, 10, max_km)
+
+    def test_geocode_places_the_most_specific_match(self):
+        self.assertEqual(geo.geocode('12 Tahrir St, Dokki, Giza')[2], 'Dokki')
+        self.assertIsNone(geo.geocode('Nowhere in particular'))
+
+
+@override_settings(RATE_LIMITS={}, APPOINTMENT_SLOT_MINUTES=30)
+class EarliestSlotsTests(TestCase):
+    start = datetime(2031, 3, 3, 9, 40, tzinfo=dt_timezone.utc)  # a Monday, off the slot grid
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(5)
+        patient = make_patient('pat')
+        for index in range(12):
+            doctor = make_doctor(f'doc{index}', specialization=('Dentist', 'Surgeon')[index % 2])
+            for day, _ in rng.sample(DoctorAvailability.DAYS_OF_WEEK, rng.randint(1, 4)):
+                opens = rng.randint(7, 12)
+                DoctorAvailability.objects.create(
+                    doctor=doctor, day=day, start_time=time(opens), end_time=time(opens + rng.randint(1, 6)),
+                )
+            # Bookings on and off the slot grid, across several chunks, some not blocking.
+            Appointment.objects.bulk_create(
+                Appointment(
+                    doctor=doctor, patient=patient,
+                    date=cls.start.replace(minute=0) + timedelta(minutes=15 * rng.randint(0, 4 * 24 * 20)),
+                    status=rng.choice(['pending', 'approved', 'rejected']),
+                )
+                for _ in range(rng.randint(0, 200))
+            )
+        make_doctor('unavailable')
+
+    def brute_force(self, doctors, k, days):
+        end = self.start + timedelta(days=days)
+        length = slots.slot_length()
+        found = []
+        for doctor_id, windows in slots.weekly_windows(doctors).items():
+            booked = list(Appointment.objects.filter(
+                doctor_id=doctor_id, status__in=slots.BLOCKING_STATUSES,
+            ).values_list('date', flat=True))
+            found += [
+                (slot, doctor_id) for slot in slots.window_slots(windows, self.start, end)
+                if not any(slot - length < date < slot + length for date in booked)
+            ]
+        return sorted(found)[:k]
+
+    def test_heap_merge_matches_brute_force(self):
+        for doctors in (Doctor.objects.all(), Doctor.objects.filter(specialization='Surgeon')):
+            for k in (1, 7, 50, 500):
+                for days in (1, 3, 20):
+                    self.assertEqual(
+                        slots.earliest(doctors, k=k, start=self.start, days=days),
+                        self.brute_force(doctors, k, days),
+                        (doctors.query.where, k, days),
+                    )
+
+    def test_parameter_errors_name_the_parameter(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='pat'))
+        for query, key in (('k=x', 'k'), ('days=x', 'days'), ('k=0', 'k'), ('days=91', 'days')):
+            response = client.get(f'/api/doctor/earliest-slots/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertEqual(list(response.json()), [key], query)
+
+
+class RecordingSink:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def send(self, batch):
+        if self.fail:
+            raise ConnectionError('sink down')
+        self.batches.append([(reminder.appointment_id, reminder.offset) for reminder, _ in batch])
+        return len(batch)
+
+
+@override_settings(APPOINTMENT_REMINDER_OFFSETS=[24 * 60, 60])
+class ReminderSchedulerTests(TestCase):
+    """The scheduler runs on the times it is handed; `clock` stands in for timezone.now()."""
+    clock = datetime(2031, 3, 3, 8, 0, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = make_doctor('doc', user={'first_name': 'Dee', 'last_name': 'Oc'})
+        cls.patient = make_patient('pat', email='pat@example.com')
+
+    def book(self, after, status='approved', saved=None):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, date=self.clock + after, status=status,
+        )
+        # auto_now stamps the real time; put the save on the fake clock instead.
+        Appointment.objects.filter(pk=appointment.pk).update(updated_at=saved or self.clock - timedelta(days=1))
+        return appointment.pk
+
+    def scheduler(self, **kwargs):
+        scheduler = reminders.Scheduler(sink=RecordingSink(), **kwargs)
+        scheduler.start(self.clock)
+        return scheduler
+
+    def queued(self, scheduler):
+        return sorted((reminder.appointment_id, reminder.offset, reminder.due) for reminder in scheduler.heap)
+
+    def test_load_queues_the_lookahead_window_only(self):
+        soon = self.book(timedelta(hours=2))  # 60-minute reminder due at +1h
+        tomorrow = self.book(timedelta(hours=25))  # day-before reminder due at +1h
+        later = self.book(timedelta(hours=3))
+        self.book(timedelta(hours=2), status='pending')
+        scheduler = self.scheduler()
+
+        scheduler.load(self.clock)
+        hour = self.clock + timedelta(hours=1)
+        self.assertEqual(self.queued(scheduler), [(soon, 60, hour), (tomorrow, 24 * 60, hour)])
+        self.assertEqual(scheduler.next_due(), hour)
+
+        scheduler.load(self.clock + timedelta(hours=1, minutes=30))
+        self.assertIn((later, 60, self.clock + timedelta(hours=2)), self.queued(scheduler))
+        scheduler.load(self.clock + timedelta(hours=1))  # already loaded: no duplicates
+        self.assertEqual(len(scheduler.heap), 3)
+
+    def test_poll_picks_up_recent_bookings(self):
+        scheduler = self.scheduler()
+        scheduler.load(self.clock)
+        now = self.clock + timedelta(minutes=5)
+        saved = self.clock + timedelta(minutes=1)
+        late = self.book(timedelta(minutes=30), saved=saved)  # its 60-minute reminder is overdue
+        upcoming = self.book(timedelta(minutes=80), saved=saved)
+        evening = self.book(timedelta(hours=5), saved=saved)  # hour-before reminder is left to load()
+        self.book(timedelta(minutes=40), saved=self.clock - timedelta(minutes=2))  # before the last poll
+
+        scheduler.poll(now)
+        self.assertEqual(self.queued(scheduler), sorted([
+            (late, 60, now),
+            (upcoming, 24 * 60, now),
+            (upcoming, 60, self.clock + timedelta(minutes=20)),
+            (evening, 24 * 60, now),
+        ]))
+        self.assertEqual(scheduler.polled_at, now)
+
+    def test_dispatch_rechecks_and_sends_once(self):
+        kept = self.book(timedelta(minutes=70))
+        moved = self.book(timedelta(minutes=75))
+        rejected = self.book(timedelta(minutes=80))
+        scheduler = self.scheduler(batch_size=2)
+        scheduler.load(self.clock)
+        Appointment.objects.filter(pk=moved).update(date=self.clock + timedelta(hours=6))
+        Appointment.objects.filter(pk=rejected).update(status='rejected')
+
+        self.assertEqual(scheduler.dispatch(self.clock + timedelta(minutes=5)), 0)  # nothing due yet
+        self.assertEqual(scheduler.dispatch(self.clock + timedelta(minutes=25)), 1)
+        self.assertEqual(scheduler.sink.batches, [[(kept, 60)], []])
+        self.assertEqual(scheduler.heap, [])
+        self.assertIsNone(scheduler.next_due())
+
+        self.assertEqual(scheduler.tick(self.clock + timedelta(minutes=26)), 0)  # not sent again
+        self.assertEqual(len(scheduler.sink.batches), 2)
+
+    def test_failed_send_requeues(self):
+        appointment = self.book(timedelta(minutes=70))
+        scheduler = self.scheduler()
+        scheduler.sink.fail = True
+        now = self.clock + timedelta(minutes=10)
+        with self.assertRaises(ConnectionError):
+            scheduler.tick(now)
+        self.assertEqual(self.queued(scheduler), [(appointment, 60, now)])
+
+        scheduler.sink.fail = False
+        self.assertEqual(scheduler.tick(now), 1)
+        self.assertEqual(scheduler.sink.batches, [[(appointment, 60)]])
+
+    def test_notification_sink_writes_notifications(self):
+        appointment = Appointment.objects.get(pk=self.book(timedelta(hours=2)))
+        self.assertEqual(reminders.NotificationSink().send([(None, appointment)]), 1)
+        notification = AdminNotification.objects.get()
+        self.assertEqual(notification.recipient_email, 'pat@example.com')
+        self.assertIn('Dr. Dee Oc', notification.message)
@@ -11,6 +11,7 @@ from .views import (
     DoctorDashboardStats, 
     DoctorPatientsListView,
     DoctorAvailabilityListView,
+    ClinicalSearchView,
     AppointmentViewSet,
     Generics_list, 
     Generics_id, 
@@ -18,7 +19,12 @@ from .views import (
     Appointment_id, 
     Reservations_list,
     ReserveAppointmentView,
-    update_appointment_status
+    update_appointment_status,
+    DoctorReviewListView,
+    ReviewCreateView,
+    ReviewDeleteView,
+    NearbyDoctorsView,
+    EarliestSlotsView,
 )
 
 
@@ -38,6 +44,12 @@ urlpatterns = [
     path('profile/update/', DoctorProfileUpdateView.as_view(), name='doctor-profile-update'),
     path('dashboard/stats/', DoctorDashboardStats.as_view(), name='doctor-dashboard-stats'),
     path('patients/', DoctorPatientsListView.as_view(), name='doctor-patients-list'),
+    path('search/', ClinicalSearchView.as_view(), name='doctor-clinical-search'),
+    path('earliest-slots/', EarliestSlotsView.as_view(), name='doctor-earliest-slots'),
+    path('nearby/', NearbyDoctorsView.as_view(), name='doctor-nearby'),
+    path('reviews/', ReviewCreateView.as_view(), name='review-create'),
+    path('reviews/<int:pk>/', ReviewDeleteView.as_view(), name='review-delete'),
+    path('<int:id>/reviews/', DoctorReviewListView.as_view(), name='doctor-reviews'),
 
 
     # this for patient component from abelhameed mohamed
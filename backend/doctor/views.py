@@ -4,29 +4,65 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import NotAuthenticated, PermissionDenied
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db import IntegrityError, transaction
 from django.db.models import Count
-from datetime import date
+from datetime import datetime, time, timedelta
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import json
+import logging
+import math
 # this import for make patient reserve appointment.
 from patients.models import Patient
 
-from .models import Doctor, DoctorAvailability, Appointment, Patient
+from .models import Doctor, DoctorAvailability, Appointment, Patient, Review
+from accounts.idempotency import idempotent
+from accounts.sparse_fields import SparseFieldsetViewMixin
+from admin_api.views import parse_time_bound
+from .fast_serializers import CompiledListMixin
+from . import geo, search, slots
 from .serializers import (
     DoctorSerializer,
     DoctorRegisterSerializer,
     DoctorAvailabilitySerializer,
-    AppointmentSerializer
+    AppointmentSerializer,
+    ReviewSerializer,
 )
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 class IsDoctor(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'doctor'
 
-class DoctorViewSet(viewsets.ModelViewSet):
+
+class AppointmentWindowMixin:
+    """
+    `?upcoming=true` (from now on, soonest first) and `?since=` / `?until=`
+    for appointment lists. doctor_appointment is partitioned by month on
+    `date` (see doctor/partitions.py), so a bounded list only scans the
+    partitions it overlaps. Without these parameters the list is unchanged.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET' or getattr(self, 'action', 'list') != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if params.get('upcoming') in ('1', 'true'):
+            queryset = queryset.filter(date__gte=timezone.now()).order_by('date')
+        if 'since' in params:
+            queryset = queryset.filter(date__gte=parse_time_bound(params['since'], 'since'))
+        if 'until' in params:
+            queryset = queryset.filter(date__lt=parse_time_bound(params['until'], 'until'))
+        return queryset
+
+class DoctorViewSet(CompiledListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -36,6 +72,7 @@ class DoctorRegisterView(generics.CreateAPIView):
     serializer_class = DoctorRegisterSerializer
     permission_classes = [permissions.AllowAny]
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -81,12 +118,13 @@ class DoctorAvailabilityCreateView(APIView):
         DoctorAvailability.objects.filter(doctor=doctor).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class AppointmentListView(generics.ListAPIView):
+class AppointmentListView(CompiledListMixin, SparseFieldsetViewMixin, AppointmentWindowMixin, generics.ListAPIView):
+    queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsDoctor]
 
     def get_queryset(self):
-        return Appointment.objects.filter(doctor=self.request.user.doctor)
+        return super().get_queryset().filter(doctor=self.request.user.doctor)
 
 class AppointmentUpdateView(generics.UpdateAPIView):
     serializer_class = AppointmentSerializer
@@ -152,7 +190,7 @@ class DoctorProfileUpdateView(generics.RetrieveUpdateAPIView):
             if user_data:
                 data['user'] = user_data
 
-            print("Data being sent to serializer:", data)  # Debug print
+            logger.debug("Doctor profile update data: %s", data)
 
             serializer = self.get_serializer(instance, data=data, partial=True)
             serializer.is_valid(raise_exception=True)
@@ -164,7 +202,7 @@ class DoctorProfileUpdateView(generics.RetrieveUpdateAPIView):
 
             return Response(serializer.data)
         except Exception as e:
-            print("Error in update:", str(e))  # Debug print
+            logger.exception("Doctor profile update failed")
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
@@ -175,8 +213,9 @@ class DoctorDashboardStats(APIView):
     
     def get(self, request):
         doctor = request.user.doctor
-        today = date.today()
+        today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
         
+        # Plain range bounds on `date` so PostgreSQL prunes to the current partitions.
         upcoming_appointments = Appointment.objects.filter(
             doctor=doctor,
             date__gte=today
@@ -184,7 +223,8 @@ class DoctorDashboardStats(APIView):
         
         todays_appointments = Appointment.objects.filter(
             doctor=doctor,
-            date=today
+            date__gte=today,
+            date__lt=today + timedelta(days=1)
         ).count()
         
         total_patients = Patient.objects.filter(
@@ -227,7 +267,7 @@ class DoctorDashboardStats(APIView):
 
 
 # New view to handle doctor's patients
-class DoctorPatientsListView(generics.ListAPIView):
+class DoctorPatientsListView(CompiledListMixin, SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = AppointmentSerializer  # We'll reuse the appointment serializer 
     permission_classes = [permissions.IsAuthenticated]
 
@@ -238,19 +278,44 @@ class DoctorPatientsListView(generics.ListAPIView):
             return Appointment.objects.filter(doctor=doctor).select_related('patient').distinct('patient')
         except Doctor.DoesNotExist:
             raise NotAuthenticated("No doctor profile found for this user.")
+
+
+# Full-text search over the doctor's appointment notes and their patients' records
+class ClinicalSearchView(APIView):
+    permission_classes = [IsDoctor]
+    max_limit = 100
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "The q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.max_limit)
+        except ValueError:
+            return Response({"error": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            doctor = request.user.doctor
+        except Doctor.DoesNotExist:
+            raise NotAuthenticated("No doctor profile found for this user.")
+
+        return Response({'query': text, 'results': search.search(doctor, text, max(limit, 1))})
         
 
 
 # 6.1 generics get - post
 
-class Generics_list(generics.ListCreateAPIView):
+class Generics_list(CompiledListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
+    # ?ordering=-rating,-rating_count reads the maintained averages (doctor_rating_idx)
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['rating', 'rating_count']
 
 
 # 6.2 generics get - put - delete
 
-class Generics_id(generics.RetrieveUpdateDestroyAPIView):
+class Generics_id(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     lookup_field = 'id'
@@ -258,7 +323,7 @@ class Generics_id(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Appointments for patient components
-class Appointments_list(generics.ListCreateAPIView):
+class Appointments_list(CompiledListMixin, SparseFieldsetViewMixin, AppointmentWindowMixin, generics.ListCreateAPIView):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]  # لازم يكون المستخدم مسجل دخول
@@ -272,7 +337,7 @@ class Appointments_list(generics.ListCreateAPIView):
         serializer.save(patient=patient)
 
 # for reserve appointment         
-class AppointmentViewSet(ModelViewSet):
+class AppointmentViewSet(CompiledListMixin, SparseFieldsetViewMixin, AppointmentWindowMixin, ModelViewSet):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
@@ -290,14 +355,14 @@ class AppointmentViewSet(ModelViewSet):
         serializer.save(patient=patient)
 
 
-class Appointment_id(generics.RetrieveUpdateDestroyAPIView):
+class Appointment_id(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     lookup_field = 'id'
     permission_classes = [AllowAny]
 
 # Reservations for patient components
-class Reservations_list(generics.ListCreateAPIView):
+class Reservations_list(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     queryset = DoctorAvailability.objects.all()
     serializer_class = DoctorAvailabilitySerializer
 
@@ -308,7 +373,7 @@ class Reservation_id(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 # for show all avialbilty days for doctor
-class DoctorAvailabilityListView(generics.ListAPIView):
+class DoctorAvailabilityListView(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = DoctorAvailabilitySerializer
     permission_classes = [AllowAny]
 
@@ -320,6 +385,7 @@ class DoctorAvailabilityListView(generics.ListAPIView):
 class ReserveAppointmentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
 
@@ -357,3 +423,150 @@ class update_appointment_status(APIView):
         # إعادة بيانات الموعد المحدثة
         serializer = AppointmentSerializer(appointment)
         return Response(serializer.data)
+
+
+# Reviews (doctor ratings are kept from them, see doctor/ratings.py)
+class ReviewPagination(LimitOffsetPagination):
+    default_limit = 20
+    max_limit = 100
+
+
+class DoctorReviewListView(generics.ListAPIView):
+    serializer_class = ReviewSerializer
+    permission_classes = [AllowAny]
+    pagination_class = ReviewPagination
+
+    def get_queryset(self):
+        return (
+            Review.objects.filter(doctor_id=self.kwargs['id'])
+            .select_related('patient__user')
+            .order_by('-created_at', '-id')
+        )
+
+
+class ReviewCreateView(generics.CreateAPIView):
+    serializer_class = ReviewSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.user.role != 'patient':
+            raise PermissionDenied("Only patients can review appointments.")
+        try:
+            context['patient'] = Patient.objects.select_related('user').get(user=self.request.user)
+        except Patient.DoesNotExist:
+            raise PermissionDenied("This user is not a patient.")
+        return context
+
+    def perform_create(self, serializer):
+        # The review and the doctor's rating totals commit together.
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise serializers.ValidationError({'appointment': ["This appointment has already been reviewed."]})
+
+
+class ReviewDeleteView(generics.DestroyAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role == 'admin':
+            return Review.objects.all()
+        return Review.objects.filter(patient__user=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+
+class NearbyDoctorsView(APIView):
+    """
+    GET /api/doctor/nearby/?lat=30.05&lon=31.24&k=10&specialization=Dentist&max_km=5
+    GET /api/doctor/nearby/?place=Maadi
+
+    The k nearest geocoded doctors (see doctor/geo.py), closest first, each
+    with `distance_km`. `place` is geocoded with the same gazetteer as doctor
+    addresses.
+    """
+    max_results = 100
+
+    def get(self, request):
+        params = request.query_params
+        if 'place' in params:
+            point = geo.geocode(params['place'])
+            if point is None:
+                raise serializers.ValidationError({'place': ["Unknown place."]})
+            lat, lon = point[0], point[1]
+        else:
+            lat = self.number(params, 'lat', -90, 90)
+            lon = self.number(params, 'lon', -180, 180)
+        k = int(self.number(params, 'k', 1, self.max_results, default=10))
+        max_km = self.number(params, 'max_km', 0, 20000, default=None)
+
+        queryset = Doctor.objects.select_related('user')
+        if params.get('specialization'):
+            queryset = queryset.filter(specialization=params['specialization'])
+        results = geo.nearest(queryset, lat, lon, k=k, max_km=max_km)
+
+        data = DoctorSerializer([doctor for doctor, _ in results], many=True, context={'request': request}).data
+        for item, (_, distance) in zip(data, results):
+            item['distance_km'] = round(distance, 3)
+        return Response({'origin': {'lat': lat, 'lon': lon}, 'results': data})
+
+    @staticmethod
+    def number(params, name, low, high, default=...):
+        if name not in params:
+            if default is ...:
+                raise serializers.ValidationError({name: ["This parameter is required."]})
+            return default
+        try:
+            value = float(params[name])
+        except ValueError:
+            raise serializers.ValidationError({name: ["Expected a number."]})
+        if not low <= value <= high or math.isnan(value):
+            raise serializers.ValidationError({name: [f"Must be between {low} and {high}."]})
+        return value
+
+
+class EarliestSlotsView(APIView):
+    """
+    GET /api/doctor/earliest-slots/?specialization=Cardiologist&k=10&from=2025-07-01&days=30
+
+    The k earliest free slots across the doctors of a specialization (or all
+    doctors), soonest first. See doctor/slots.py.
+    """
+    max_results = 50
+    max_days = 90
+
+    def get(self, request):
+        params = request.query_params
+        values = {}
+        for name, default in (('k', 10), ('days', 30)):
+            try:
+                values[name] = int(params.get(name, default))
+            except ValueError:
+                raise serializers.ValidationError({name: ["Expected a whole number."]})
+        k, days = values['k'], values['days']
+        if not 1 <= k <= self.max_results:
+            raise serializers.ValidationError({'k': [f"Must be between 1 and {self.max_results}."]})
+        if not 1 <= days <= self.max_days:
+            raise serializers.ValidationError({'days': [f"Must be between 1 and {self.max_days}."]})
+        start = timezone.now()
+        if 'from' in params:
+            start = max(parse_time_bound(params['from'], 'from'), start)
+
+        doctors = Doctor.objects.all()
+        if params.get('specialization'):
+            doctors = doctors.filter(specialization=params['specialization'])
+        found = slots.earliest(doctors, k=k, start=start, days=days)
+
+        names = {
+            doctor.pk: str(doctor)
+            for doctor in Doctor.objects.filter(pk__in={doctor_id for _, doctor_id in found}).select_related('user')
+        }
+        length = slots.slot_length()
+        return Response([
+            {'doctor': doctor_id, 'doctor_name': names[doctor_id], 'start': slot, 'end': slot + length}
+            for slot, doctor_id in found
+        ])
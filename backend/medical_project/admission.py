@@ -0,0 +1,235 @@
+# medical_project/admission.py
+"""
+Rate limiting and admission control.
+
+Endpoints are grouped into classes (login, registration, booking, directory)
+by URL name, or by route for unnamed URLs, in ENDPOINT_CLASSES.
+
+SlidingWindowThrottle is a DRF throttle, so it sees the JWT user. For each
+class in RATE_LIMITS it applies DRF-style rates ('20/min') per client IP, per
+user and for the class as a whole ('global'). Each rate is a sliding window
+approximated from the current and previous fixed windows, kept in process
+memory: two counters per client, no cache round trip. A request counts
+against the class's limits only when all of them let it in; refused ones get
+DRF's 429 with Retry-After. The client IP is REMOTE_ADDR, never
+X-Forwarded-For, which the client controls; behind a reverse proxy the
+server must be set up to put the real client address in REMOTE_ADDR.
+
+AdmissionMiddleware counts the requests this process is serving and sheds
+by priority once it fills up. A class may only take the ADMISSION_SHARES of
+ADMISSION_MAX_CONCURRENT that its priority allows, so directory browsing is
+turned away before registration, and that before booking and login; a class
+with priority None (/metrics) is never turned away. Shed
+requests get a 503 with Retry-After. Both kinds of refusal are counted in
+/metrics (see metrics.py) next to the admitted requests.
+"""
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_counts_lock = threading.Lock()
+_shed = {}  # endpoint class -> requests turned away by the admission controller
+_throttled = {}  # (endpoint class, scope) -> requests refused by a rate limit
+
+
+def endpoint_class(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return settings.ENDPOINT_CLASSES.get(match.view_name if match.url_name else match.route)
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60), as DRF reads throttle rates."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def _count(counter, key):
+    with _counts_lock:
+        counter[key] = counter.get(key, 0) + 1
+
+
+class SlidingWindow:
+    """
+    Requests per `period` per key. The count for the window ending now is the
+    current fixed window plus the previous one weighted by how much of it still
+    overlaps, which is accurate to within a few percent for steady traffic.
+    """
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.windows = {}  # key -> [fixed window index, count in it, count in the one before]
+        self.lock = threading.Lock()
+        self.swept = 0
+
+    def hit(self, key, now):
+        """Count a request for `key`; returns 0 when allowed, else seconds until one would be."""
+        with self.lock:
+            wait = self.check(key, now)
+            if not wait:
+                self.commit(key, now)
+            return wait
+
+    def check(self, key, now):
+        """0 if a request for `key` fits now, else seconds until one would. Hold `lock`."""
+        index, offset = divmod(now, self.period)
+        entry = self.entry(key, int(index))
+        overlap = 1 - offset / self.period
+        if entry[2] * overlap + entry[1] + 1 <= self.limit:
+            return 0
+        return self.wait(entry[1], entry[2], offset)
+
+    def commit(self, key, now):
+        """Count a request that check() let in. Hold `lock`."""
+        index = int(now // self.period)
+        self.entry(key, index)[1] += 1
+        self.sweep(index)
+
+    def entry(self, key, index):
+        entry = self.windows.get(key)
+        if entry is None or entry[0] < index - 1:
+            entry = self.windows[key] = [index, 0, 0]
+        elif entry[0] == index - 1:
+            entry[:] = [index, 0, entry[1]]
+        return entry
+
+    def wait(self, current, previous, offset):
+        room = self.limit - 1
+        if current <= room:
+            # The previous window has to fade until `current` plus its share fits.
+            wait = self.period * (1 - (room - current) / previous) - offset
+        else:
+            # Only once this window is the previous one and has faded enough.
+            wait = self.period - offset + self.period * (1 - room / current)
+        return max(wait, 0.001)
+
+    def sweep(self, index):
+        # Forget idle keys once per window so one-off clients do not accumulate.
+        if index > self.swept:
+            self.swept = index
+            for key in [key for key, entry in self.windows.items() if entry[0] < index - 1]:
+                del self.windows[key]
+
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+def window_for(endpoint_class, scope, rate):
+    key = (endpoint_class, scope, rate)
+    window = _windows.get(key)
+    if window is None:
+        with _windows_lock:
+            window = _windows.setdefault(key, SlidingWindow(*parse_rate(rate)))
+    return window
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        name = endpoint_class(request)
+        limits = settings.RATE_LIMITS.get(name)
+        if not limits:
+            return True
+        checks = []
+        for scope, rate in limits.items():
+            if scope == 'ip':
+                key = request.META.get('REMOTE_ADDR')
+            elif scope == 'user':
+                if not request.user.is_authenticated:
+                    continue
+                key = request.user.pk
+            else:
+                key = None
+            checks.append((scope, window_for(name, scope, rate), key))
+
+        now = time.monotonic()
+        self.retry_after = 0
+        # A request refused by one scope must not use up the others: a throttled
+        # user retrying would otherwise exhaust the limit of everyone on their IP.
+        # The locks are taken in RATE_LIMITS order, the same for every request.
+        with ExitStack() as stack:
+            for _, window, _ in checks:
+                stack.enter_context(window.lock)
+            for scope, window, key in checks:
+                wait = window.check(key, now)
+                if wait:
+                    _count(_throttled, (name, scope))
+                    self.retry_after = max(self.retry_after, wait)
+            if not self.retry_after:
+                for _, window, key in checks:
+                    window.commit(key, now)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class AdmissionController:
+    def __init__(self):
+        self.in_flight = 0
+        self.admitted = {}  # endpoint class -> requests let in
+        self.lock = threading.Lock()
+
+    def enter(self, name, priority):
+        capacity = settings.ADMISSION_MAX_CONCURRENT * settings.ADMISSION_SHARES[priority]
+        with self.lock:
+            if self.in_flight >= capacity:
+                return False
+            self.in_flight += 1
+            self.admitted[name] = self.admitted.get(name, 0) + 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, '_admitted', False):
+                controller.leave()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.ADMISSION_MAX_CONCURRENT:
+            return None
+        name = endpoint_class(request)
+        priority = settings.ADMISSION_PRIORITIES.get(name, 'normal')
+        if priority is None:
+            return None
+        if not controller.enter(name, priority):
+            _count(_shed, name)
+            response = JsonResponse({'error': 'The server is busy, please retry shortly.'}, status=503)
+            response['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+            return response
+        request._admitted = True
+        return None
+
+
+def snapshot():
+    """Counters for metrics.render(); endpoint class None is everything unclassified."""
+    with controller.lock:
+        in_flight, admitted = controller.in_flight, dict(controller.admitted)
+    with _counts_lock:
+        return {
+            'in_flight': in_flight,
+            'admitted': admitted,
+            'shed': dict(_shed),
+            'throttled': dict(_throttled),
+        }
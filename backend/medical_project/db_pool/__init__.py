@@ -0,0 +1,8 @@
+# medical_project/db_pool
+"""
+PostgreSQL backend that records how long each connection takes to obtain.
+
+Identical to django.db.backends.postgresql apart from the timing, which
+feeds the per-alias acquire histograms in `stats`. Pooling itself is
+Django's own (OPTIONS["pool"], backed by psycopg_pool); see settings.
+"""
@@ -0,0 +1,15 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from . import stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        # With a pool this is the wait in getconn(); without one it is a full connect.
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            stats.record_acquire(self.alias, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,92 @@
+"""
+Per-process connection statistics.
+
+`record_acquire` keeps a cumulative histogram of connection acquire times per
+database alias. `snapshot()` combines it with psycopg_pool's own counters
+(size, available, waiting, timeouts...) for the aliases that use a pool.
+"""
+import threading
+from bisect import bisect_left
+
+# Upper bounds in milliseconds; the last bucket is +Inf.
+ACQUIRE_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    def __init__(self, bounds=ACQUIRE_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def as_dict(self):
+        cumulative, buckets = 0, []
+        for bound, count in zip((*self.bounds, float('inf')), self.counts):
+            cumulative += count
+            buckets.append({'le': 'inf' if bound == float('inf') else bound, 'count': cumulative})
+        return {'count': self.total, 'sum_ms': round(self.sum, 3), 'buckets': buckets}
+
+
+def record_acquire(alias, milliseconds):
+    with _lock:
+        histogram = _histograms.get(alias)
+        if histogram is None:
+            histogram = _histograms[alias] = Histogram()
+        histogram.observe(milliseconds)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _pool_counters(pool):
+    counters = pool.get_stats()
+    # Django opens the pool lazily on the first connection; until then it holds none.
+    if pool.closed:
+        size = available = 0
+    else:
+        size, available = counters.get('pool_size', 0), counters.get('pool_available', 0)
+    return {
+        'open': not pool.closed,
+        'min_size': counters.get('pool_min', pool.min_size),
+        'max_size': counters.get('pool_max', pool.max_size),
+        'size': size,
+        'available': available,
+        'in_use': size - available,
+        'waiting': counters.get('requests_waiting', 0),
+        'requests': counters.get('requests_num', 0),
+        'requests_queued': counters.get('requests_queued', 0),
+        'wait_ms_total': counters.get('requests_wait_ms', 0),
+        'timeouts': counters.get('requests_errors', 0),
+        'connections_opened': counters.get('connections_num', 0),
+        'connections_lost': counters.get('connections_lost', 0),
+    }
+
+
+def snapshot():
+    """{alias: {'pooled': bool, 'pool': counters or None, 'acquire_ms': histogram}} for this process."""
+    from django.db import connections
+
+    result = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, 'pool', None)
+        with _lock:
+            histogram = _histograms.get(alias)
+            acquire = histogram.as_dict() if histogram else Histogram().as_dict()
+        result[alias] = {
+            'pooled': pool is not None,
+            'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE', 0),
+            'pool': _pool_counters(pool) if pool is not None else None,
+            'acquire_ms': acquire,
+        }
+    return result
@@ -0,0 +1,106 @@
+# medical_project/db_routing.py
+"""
+Read-replica routing.
+
+ReplicaRouter sends reads to one of REPLICA_DATABASES only while the
+current request has been marked replica-safe by ReplicaRoutingMiddleware;
+everything else (writes, reads inside a transaction on the primary,
+select_for_update querysets, management commands) uses `default`.
+
+A request is replica-safe when it is a GET/HEAD/OPTIONS and its client has
+not written recently. After a successful unsafe request the client is
+pinned to the primary for REPLICA_PIN_SECONDS, so it reads its own writes
+while replicas catch up. The pin is kept two ways:
+
+- a `db_pin` cookie (browser sessions, the Django admin);
+- a cache entry keyed on the Authorization header, for the JWT API clients
+  that do not send cookies. Use a shared cache backend when running more
+  than one process.
+
+To try it locally, add a second database (another Postgres database, or a
+copy of an SQLite file) as e.g. `replica1` and list it in REPLICA_DATABASES.
+"""
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_allowed = ContextVar('replica_allowed', default=False)
+
+
+def replicas():
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        pool = replicas()
+        if not pool or not _replica_allowed.get():
+            return DEFAULT_DB_ALIAS
+        # A transaction on the primary must see its own uncommitted rows.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(pool)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+def _pin_cache_key(request):
+    credentials = request.headers.get('Authorization')
+    if not credentials:
+        return None
+    return 'db-pin:' + hashlib.sha1(credentials.encode()).hexdigest()
+
+
+def is_pinned(request):
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = _pin_cache_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+def pin(request, response):
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+    key = _pin_cache_key(request)
+    if key is not None:
+        cache.set(key, 1, timeout=seconds)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        allowed = bool(replicas()) and safe and not is_pinned(request)
+        token = _replica_allowed.set(allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_allowed.reset(token)
+        if replicas() and not safe and response.status_code < 400:
+            pin(request, response)
+        return response
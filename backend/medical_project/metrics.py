@@ -0,0 +1,271 @@
+# medical_project/metrics.py
+"""
+Per-endpoint request metrics in Prometheus text format.
+
+MetricsMiddleware records, per resolved URL name (or route when the URL has
+no name): requests by method and status, a latency histogram, DB query count
+and time, time spent serializing and response bytes. Serializing covers
+rendering the response body and CompiledSerializer rows; a DRF serializer's
+`.data`, evaluated inside the view, counts as view time. Each thread writes
+to its own aggregate, so the hot path takes no lock; `/metrics` sums the
+per-thread aggregates when it is scraped. The numbers are per process, like
+the connection pool statistics and the admission control counters (see
+admission.py) that are exported next to them.
+
+Access to `/metrics` needs `Authorization: Bearer <METRICS_TOKEN>` when that
+setting is set, and otherwise a client address in METRICS_ALLOWED_IPS.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from medical_project import admission
+from medical_project.db_pool import stats as db_pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_local = threading.local()
+_registry = []  # [(thread, {endpoint: EndpointStats})]
+_retired = {}  # totals folded in from threads that have exited
+_registry_lock = threading.Lock()
+_serializer_seconds = ContextVar('serializer_seconds', default=None)
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'latency_buckets', 'latency_sum', 'queries', 'db_seconds',
+                 'serializer_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.requests = {}  # (method, status) -> count
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+
+    def merge(self, other):
+        for key, count in list(other.requests.items()):
+            self.requests[key] = self.requests.get(key, 0) + count
+        for index, count in enumerate(other.latency_buckets):
+            self.latency_buckets[index] += count
+        self.latency_sum += other.latency_sum
+        self.queries += other.queries
+        self.db_seconds += other.db_seconds
+        self.serializer_seconds += other.serializer_seconds
+        self.response_bytes += other.response_bytes
+
+
+def _thread_stats():
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        stats = _local.stats = {}
+        with _registry_lock:
+            # Fold exited threads into the retired totals so the registry stays small
+            # under servers that start a thread per request.
+            for thread, thread_stats in [entry for entry in _registry if not entry[0].is_alive()]:
+                for endpoint, endpoint_stats in thread_stats.items():
+                    _retired.setdefault(endpoint, EndpointStats()).merge(endpoint_stats)
+                _registry.remove((thread, thread_stats))
+            _registry.append((threading.current_thread(), stats))
+    return stats
+
+
+def collect():
+    """{endpoint: EndpointStats} summed over every thread of this process."""
+    totals = {}
+    with _registry_lock:
+        sources = [_retired] + [thread_stats for _, thread_stats in _registry]
+        for source in sources:
+            for endpoint, endpoint_stats in list(source.items()):
+                totals.setdefault(endpoint, EndpointStats()).merge(endpoint_stats)
+    return totals
+
+
+@contextmanager
+def serializer_timer():
+    """Adds the enclosed time to the current request's serializer time (outermost call only)."""
+    accumulator = _serializer_seconds.get()
+    if accumulator is None or accumulator[1]:
+        yield
+        return
+    accumulator[1] = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        accumulator[0] += time.perf_counter() - started
+        accumulator[1] = False
+
+
+class _QueryTimer:
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name if match.url_name else match.route
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        serializer = [0.0, False]
+        token = _serializer_seconds.set(serializer)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in settings.DATABASES:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _serializer_seconds.reset(token)
+        elapsed = time.perf_counter() - started
+
+        stats = _thread_stats()
+        endpoint = endpoint_name(request)
+        endpoint_stats = stats.get(endpoint)
+        if endpoint_stats is None:
+            endpoint_stats = stats[endpoint] = EndpointStats()
+        key = (request.method, response.status_code)
+        endpoint_stats.requests[key] = endpoint_stats.requests.get(key, 0) + 1
+        endpoint_stats.latency_buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        endpoint_stats.latency_sum += elapsed
+        endpoint_stats.queries += timer.queries
+        endpoint_stats.db_seconds += timer.seconds
+        endpoint_stats.serializer_seconds += serializer[0]
+        if not response.streaming:
+            endpoint_stats.response_bytes += len(response.content)
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs last among the template response hooks, right before the handler
+        # renders the (DRF) response; the callback runs once the body is rendered.
+        accumulator = _serializer_seconds.get()
+        if accumulator is None:
+            return response
+        started = time.perf_counter()
+
+        def rendered(response):
+            accumulator[0] += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram(lines, name, labels, bounds, cumulative_counts, total, value_sum):
+    for bound, count in zip((*bounds, '+Inf'), cumulative_counts):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {value_sum}')
+    lines.append(f'{name}_count{{{labels}}} {total}')
+
+
+def render():
+    lines = []
+    endpoints = sorted(collect().items())
+
+    def family(name, kind, description):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    family('http_requests_total', 'counter', 'Requests by endpoint, method and status.')
+    for endpoint, stats in endpoints:
+        for (method, status), count in sorted(stats.requests.items()):
+            lines.append(
+                f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {count}'
+            )
+
+    family('http_request_duration_seconds', 'histogram', 'Time spent in the Django stack per request.')
+    for endpoint, stats in endpoints:
+        cumulative, running = [], 0
+        for count in stats.latency_buckets:
+            running += count
+            cumulative.append(running)
+        _histogram(lines, 'http_request_duration_seconds', f'endpoint="{_label(endpoint)}"',
+                   LATENCY_BUCKETS, cumulative, running, stats.latency_sum)
+
+    for name, attribute, description in (
+        ('http_db_queries_total', 'queries', 'SQL statements executed.'),
+        ('http_db_query_seconds_total', 'db_seconds', 'Time spent executing SQL.'),
+        ('http_serializer_seconds_total', 'serializer_seconds', 'Time spent rendering response bodies and compiled serializer rows.'),
+        ('http_response_bytes_total', 'response_bytes', 'Response body bytes (streaming responses excluded).'),
+    ):
+        family(name, 'counter', description)
+        for endpoint, stats in endpoints:
+            lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {getattr(stats, attribute)}')
+
+    admission_stats = admission.snapshot()
+    family('http_requests_in_flight', 'gauge', 'Requests being served, as seen by the admission controller.')
+    lines.append(f'http_requests_in_flight {admission_stats["in_flight"]}')
+    for name, key, description in (
+        ('http_requests_admitted_total', 'admitted', 'Requests let in by the admission controller.'),
+        ('http_requests_shed_total', 'shed', 'Requests shed with a 503 while the process was saturated.'),
+    ):
+        family(name, 'counter', description)
+        for endpoint_class, count in sorted(admission_stats[key].items(), key=lambda item: str(item[0])):
+            lines.append(f'{name}{{endpoint_class="{_label(endpoint_class or "other")}"}} {count}')
+    family('http_requests_throttled_total', 'counter', 'Requests refused with a 429 by a rate limit.')
+    for (endpoint_class, scope), count in sorted(admission_stats['throttled'].items()):
+        lines.append(
+            f'http_requests_throttled_total{{endpoint_class="{_label(endpoint_class)}",scope="{scope}"}} {count}'
+        )
+
+    databases = db_pool_stats.snapshot()
+    pooled = [(alias, data['pool']) for alias, data in databases.items() if data['pool']]
+    for name, key, description in (
+        ('db_pool_connections', 'size', 'Connections held by the pool.'),
+        ('db_pool_connections_in_use', 'in_use', 'Pool connections checked out.'),
+        ('db_pool_requests_waiting', 'waiting', 'Requests waiting for a pool connection.'),
+    ):
+        family(name, 'gauge', description)
+        for alias, pool in pooled:
+            lines.append(f'{name}{{database="{alias}"}} {pool[key]}')
+    family('db_pool_timeouts_total', 'counter', 'Requests that timed out waiting for a pool connection.')
+    for alias, pool in pooled:
+        lines.append(f'db_pool_timeouts_total{{database="{alias}"}} {pool["timeouts"]}')
+
+    family('db_connection_acquire_seconds', 'histogram', 'Time to obtain a connection (pool wait or connect).')
+    for alias, data in databases.items():
+        acquire = data['acquire_ms']
+        bounds = [bucket['le'] for bucket in acquire['buckets'][:-1]]
+        _histogram(lines, 'db_connection_acquire_seconds', f'database="{alias}"',
+                   [bound / 1000 for bound in bounds], [bucket['count'] for bucket in acquire['buckets']],
+                   acquire['count'], acquire['sum_ms'] / 1000)
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,138 @@
+# medical_project/profiling.py
+"""
+Opt-in sampling profiler for individual requests.
+
+A request is profiled when it carries a valid signed `X-Profile` header (see
+`manage.py profile_token`) or is picked at random with probability
+PROFILER_SAMPLE_RATE, optionally limited to the URL names or routes listed
+in PROFILER_ENDPOINTS. At most PROFILER_MAX_CONCURRENT requests per process
+are profiled at once; the rest run untouched.
+
+While a request is profiled, a sampler thread reads the request thread's
+stack every PROFILER_INTERVAL_MS and counts identical stacks. The result is
+written to PROFILER_DIR in collapsed-stack format (`a;b;c <count>` per line),
+which flamegraph.pl, speedscope and similar tools render directly. The file
+name is returned in the `X-Profile-Id` response header.
+"""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.urls import Resolver404, resolve
+from django.utils.text import slugify
+
+from medical_project.metrics import endpoint_name
+
+TOKEN_SALT = 'medical_project.profiling'
+HEADER = 'X-Profile'
+
+logger = logging.getLogger(__name__)
+
+_slots = threading.BoundedSemaphore(max(settings.PROFILER_MAX_CONCURRENT, 1))
+_sequence = iter(range(1, sys.maxsize))
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def has_valid_token(request):
+    token = request.headers.get(HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _endpoint(path):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    return match.view_name if match.url_name else match.route
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if has_valid_token(request):
+            return True
+        rate = settings.PROFILER_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return False
+        return not settings.PROFILER_ENDPOINTS or _endpoint(request.path_info) in settings.PROFILER_ENDPOINTS
+
+    def __call__(self, request):
+        if not self.should_profile(request) or not _slots.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL_MS / 1000)
+            started = time.time()
+            with sampler:
+                response = self.get_response(request)
+            name = "{:%Y%m%dT%H%M%S}-{}-{}-{}.collapsed".format(
+                datetime.fromtimestamp(started), slugify(endpoint_name(request).replace('/', '-'))[:60] or 'unresolved',
+                os.getpid(), next(_sequence),
+            )
+            path = os.path.join(settings.PROFILER_DIR, name)
+            try:
+                os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+                sampler.write(path)
+            except OSError:
+                # The request itself succeeded; losing its profile must not fail it.
+                logger.exception("Could not write request profile %s", path)
+            else:
+                response['X-Profile-Id'] = name
+            return response
+        finally:
+            _slots.release()
@@ -35,8 +35,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'medical_project.metrics.MetricsMiddleware',
+    'medical_project.profiling.ProfilingMiddleware',
+    'admin_api.slow_queries.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'medical_project.admission.AdmissionMiddleware',
+    'medical_project.db_routing.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,9 +71,11 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
+    'x-profile',
     'x-requested-with',
 ]
 
@@ -95,15 +102,43 @@ TEMPLATES = [
 # Database
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.postgresql plus connection-acquire timing (see medical_project/db_pool)
+        'ENGINE': 'medical_project.db_pool',
         'NAME': 'medical_db',
         'USER': 'postgres',
         'PASSWORD': 'postgres',
         'HOST': 'localhost',
         'PORT': '5432',
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection reuse. With DATABASE_POOL=1 (the default) each process hands out
+# connections from a psycopg pool; DATABASE_POOL=0 keeps one persistent
+# connection per thread for DATABASE_CONN_MAX_AGE seconds instead (0 = a new
+# connection per request). Stats: GET /api/admin/system/db-pool/.
+if os.environ.get('DATABASE_POOL', '1') == '1':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+            # Seconds a request may wait for a free connection before failing
+            'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+
+# Read replicas (see medical_project/db_routing.py): a comma-separated list of
+# hosts in DATABASE_REPLICA_HOSTS adds one alias per host, same credentials.
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{index}')
+DATABASE_ROUTERS = ['medical_project.db_routing.ReplicaRouter']
+# How long a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = 10
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -112,6 +147,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'medical_project.admission.SlidingWindowThrottle',
+    ],
 }
 
 # JWT settings
@@ -158,3 +196,90 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+
+# Admin activity log / notification retention (see admin_api/partitions.py)
+ADMIN_LOG_RETENTION_MONTHS = 12
+ADMIN_LOG_PARTITIONS_AHEAD = 3
+
+# Appointment partitions (see doctor/partitions.py)
+APPOINTMENT_PARTITIONS_AHEAD = 12
+APPOINTMENT_ARCHIVE_AFTER_MONTHS = 24
+APPOINTMENT_ARCHIVE_TABLESPACE = None
+# Length of a bookable slot in availability windows (see doctor/slots.py)
+APPOINTMENT_SLOT_MINUTES = 30
+
+# /metrics (see medical_project/metrics.py): scrapers authenticate with
+# `Authorization: Bearer $METRICS_TOKEN`, or connect from one of these addresses
+# when no token is configured.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Request profiler (see medical_project/profiling.py). Off unless a request
+# carries a signed X-Profile header or PROFILER_SAMPLE_RATE is raised.
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+PROFILER_ENDPOINTS = [name for name in os.environ.get('PROFILER_ENDPOINTS', '').split(',') if name]
+PROFILER_MAX_CONCURRENT = int(os.environ.get('PROFILER_MAX_CONCURRENT', 1))
+PROFILER_INTERVAL_MS = 5
+PROFILER_TOKEN_MAX_AGE = 60 * 60
+PROFILER_DIR = os.environ.get('PROFILER_DIR', str(BASE_DIR / 'profiles'))
+
+# Slow query log (see admin_api/slow_queries.py); `manage.py slow_queries` reports it.
+# Set SLOW_QUERY_THRESHOLD_MS to an empty string to turn capture off.
+SLOW_QUERY_THRESHOLD_MS = os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200')
+SLOW_QUERY_THRESHOLD_MS = float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = 5000
+SLOW_QUERY_FLUSH_SECONDS = 5
+SLOW_QUERY_QUEUE_SIZE = 1000
+
+# /api/admin/reference-data/ (see admin_api/reference_data.py): seconds a worker
+# serves its cached copy before re-reading, on top of invalidation on write.
+REFERENCE_DATA_TTL = 300
+
+# Appointment reminders (see doctor/reminders.py), run by `manage.py run_reminders`:
+# minutes before an approved appointment to remind the patient, and the class
+# that delivers a batch of them.
+APPOINTMENT_REMINDER_OFFSETS = [24 * 60, 60]
+APPOINTMENT_REMINDER_SINK = 'doctor.reminders.NotificationSink'
+
+# Idempotency-Key support (see accounts/idempotency.py): seconds a stored response
+# is replayed for, and how long a duplicate waits for the request still holding its key.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+
+# Rate limiting and admission control (see medical_project/admission.py).
+# Endpoint classes by URL name, or by route for unnamed URLs.
+ENDPOINT_CLASSES = {
+    'login': 'login',
+    'token_obtain_pair': 'login',
+    'token_refresh': 'login',
+    'register': 'registration',
+    'doctor-register': 'registration',
+    'patient-create': 'registration',
+    'reserve-appointment': 'booking',
+    'patient-list': 'directory',
+    'api/doctor/all-doctors/': 'directory',
+    'api/doctor/one-doctor/<int:id>': 'directory',
+    'doctor-availability-by-id': 'directory',
+    'doctor-reviews': 'directory',
+    'doctor-nearby': 'directory',
+    'doctor-earliest-slots': 'directory',
+    'metrics': 'monitoring',
+}
+# Per endpoint class and scope ('ip', 'user' or 'global'), DRF-style rates;
+# 'ip' is REMOTE_ADDR, which a reverse proxy in front must set to the client address.
+RATE_LIMITS = {
+    'login': {'ip': '20/min'},
+    'registration': {'ip': '10/hour'},
+    'booking': {'user': '20/min', 'ip': '60/min'},
+    'directory': {'ip': '300/min'},
+}
+# Requests one process serves at once before it starts shedding (0 turns it off);
+# defaults to the database pool size, which is what requests end up waiting on.
+ADMISSION_MAX_CONCURRENT = int(os.environ.get(
+    'ADMISSION_MAX_CONCURRENT', os.environ.get('DATABASE_POOL_MAX_SIZE', 10)
+))
+# Share of ADMISSION_MAX_CONCURRENT each priority may fill; unlisted classes are 'normal'.
+ADMISSION_PRIORITIES = {'login': 'high', 'booking': 'high', 'directory': 'low', 'monitoring': None}
+ADMISSION_SHARES = {'high': 1.0, 'normal': 0.8, 'low': 0.5}
+ADMISSION_RETRY_AFTER = 2
@@ -0,0 +1,245 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from doctor.models import Doctor
+from . import admission, db_routing, profiling
+
+User = get_user_model()
+
+
+def metric(text, name, **labels):
+    """The value of one sample in a Prometheus text exposition, or None."""
+    selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f'{name}{{{selector}}} ' if labels else f'{name} '
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return None
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = db_routing.ReplicaRouter()
+
+    def serve(self, request, status=200):
+        """Run `request` through the middleware; returns (database read from, response)."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Doctor))
+            return HttpResponse(status=status)
+
+        response = db_routing.ReplicaRoutingMiddleware(view)(request)
+        return seen[0], response
+
+    def test_safe_reads_go_to_a_replica(self):
+        self.assertEqual(self.serve(self.factory.get('/'))[0], 'replica1')
+        self.assertEqual(self.router.db_for_read(Doctor), DEFAULT_DB_ALIAS)  # outside a request
+        self.assertEqual(self.router.db_for_write(Doctor), DEFAULT_DB_ALIAS)
+
+    def test_unsafe_requests_and_transactions_use_the_primary(self):
+        self.assertEqual(self.serve(self.factory.post('/'))[0], DEFAULT_DB_ALIAS)
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+            self.assertEqual(self.serve(self.factory.get('/'))[0], DEFAULT_DB_ALIAS)
+
+    def test_write_pins_the_client_by_cookie(self):
+        _, response = self.serve(self.factory.post('/'))
+        self.assertIn(db_routing.PIN_COOKIE, response.cookies)
+        self.factory.cookies[db_routing.PIN_COOKIE] = response.cookies[db_routing.PIN_COOKIE].value
+        self.assertEqual(self.serve(self.factory.get('/'))[0], DEFAULT_DB_ALIAS)
+
+    def test_write_pins_the_client_by_authorization(self):
+        self.serve(self.factory.post('/', HTTP_AUTHORIZATION='Bearer one'))
+        self.assertEqual(self.serve(self.factory.get('/', HTTP_AUTHORIZATION='Bearer one'))[0], DEFAULT_DB_ALIAS)
+        self.assertEqual(self.serve(self.factory.get('/', HTTP_AUTHORIZATION='Bearer two'))[0], 'replica1')
+
+    def test_failed_write_does_not_pin(self):
+        _, response = self.serve(self.factory.post('/', HTTP_AUTHORIZATION='Bearer one'), status=400)
+        self.assertNotIn(db_routing.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.serve(self.factory.get('/', HTTP_AUTHORIZATION='Bearer one'))[0], 'replica1')
+
+    def test_expired_or_bad_cookie_is_ignored(self):
+        for value in ('0', 'not-a-number'):
+            self.factory.cookies[db_routing.PIN_COOKIE] = value
+            self.assertEqual(self.serve(self.factory.get('/'))[0], 'replica1')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica1', 'doctor'), False)
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'doctor'))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_no_pin(self):
+        database, response = self.serve(self.factory.post('/'))
+        self.assertEqual(database, DEFAULT_DB_ALIAS)
+        self.assertNotIn(db_routing.PIN_COOKIE, response.cookies)
+
+
+@override_settings(RATE_LIMITS={}, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_counts_requests_queries_and_rendering(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('doc', password='x', role='doctor'))
+        before = self.scrape()
+        self.assertEqual(client.get('/api/doctor/doctors/').status_code, 200)
+        after = self.scrape()
+
+        labels = {'endpoint': 'doctor-list'}
+        requests = {'endpoint': 'doctor-list', 'method': 'GET', 'status': '200'}
+        self.assertEqual(
+            metric(after, 'http_requests_total', **requests) - (metric(before, 'http_requests_total', **requests) or 0),
+            1,
+        )
+        self.assertGreater(metric(after, 'http_db_queries_total', **labels), 0)
+        self.assertGreater(metric(after, 'http_serializer_seconds_total', **labels), 0)
+        self.assertGreater(metric(after, 'http_response_bytes_total', **labels), 0)
+
+    @override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 200)
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse('ok'))
+
+    def get(self, **headers):
+        with override_settings(PROFILER_DIR=self.directory):
+            return self.middleware(RequestFactory().get('/', **headers))
+
+    def test_signed_header_writes_a_profile(self):
+        response = self.get(HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(os.listdir(self.directory), [response['X-Profile-Id']])
+        self.assertNotIn('X-Profile-Id', self.get(HTTP_X_PROFILE='forged'))
+
+    def test_write_failure_keeps_the_response(self):
+        with mock.patch.object(profiling.StackSampler, 'write', side_effect=OSError('disk full')), \
+                self.assertLogs('medical_project.profiling', 'ERROR'):
+            response = self.get(HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def test_limit_and_wait(self):
+        window = admission.SlidingWindow(10, 60)
+        self.assertEqual([window.hit('a', second) for second in range(10)], [0] * 10)
+        self.assertAlmostEqual(window.hit('a', 10), 56)  # until the full window has faded to 9
+        self.assertGreater(window.hit('a', 65.9), 0)
+        self.assertEqual(window.hit('a', 66), 0)
+        self.assertAlmostEqual(window.hit('a', 66), 6)  # 1 now plus 9 of the previous window
+        self.assertEqual(window.hit('a', 72), 0)
+        self.assertEqual(window.hit('b', 72), 0)  # keys are counted apart
+
+    def test_idle_keys_are_forgotten(self):
+        window = admission.SlidingWindow(1, 60)
+        window.hit('a', 0)
+        window.hit('b', 150)
+        self.assertEqual(list(window.windows), ['b'])
+        self.assertEqual(window.hit('a', 150), 0)
+
+
+@override_settings(
+    RATE_LIMITS={'login': {'ip': '2/min'}}, METRICS_TOKEN='secret',
+    ADMISSION_MAX_CONCURRENT=10, ADMISSION_SHARES={'high': 1.0, 'normal': 0.8, 'low': 0.5},
+)
+class AdmissionTests(TestCase):
+    def setUp(self):
+        for name in ('_windows', '_shed', '_throttled'):
+            patcher = mock.patch.dict(getattr(admission, name), clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(admission, 'controller', admission.AdmissionController())
+        self.controller = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, address='10.0.0.1', **headers):
+        return self.client.post('/api/token/', {}, content_type='application/json', REMOTE_ADDR=address, **headers)
+
+    def scrape(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+    def test_rate_limit_per_client_address(self):
+        self.assertEqual([self.login().status_code for _ in range(2)], [400, 400])
+        refused = self.login()
+        self.assertEqual(refused.status_code, 429)
+        self.assertGreater(int(refused['Retry-After']), 0)
+        # A forwarded-for header does not make a new client.
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR='192.0.2.7').status_code, 429)
+        self.assertEqual(self.login('10.0.0.2').status_code, 400)
+        self.assertEqual(metric(self.scrape(), 'http_requests_throttled_total', endpoint_class='login', scope='ip'), 2)
+
+    @override_settings(RATE_LIMITS={'booking': {'user': '2/min', 'ip': '3/min'}})
+    def test_throttled_user_does_not_use_up_the_ip_limit(self):
+        one, two = User.objects.create_user('one', role='patient'), User.objects.create_user('two', role='patient')
+        clients = {}
+        for user in (one, two):
+            clients[user] = APIClient(REMOTE_ADDR='10.0.0.1')
+            clients[user].force_authenticate(user)
+
+        def reserve(user):
+            return clients[user].post('/api/doctor/reserve-appointment/', {}, format='json').status_code
+
+        self.assertEqual([reserve(one) for _ in range(2)], [400, 400])
+        self.assertEqual([reserve(one) for _ in range(5)], [429] * 5)  # retrying while throttled
+        self.assertEqual(reserve(two), 400)  # the shared address still has room
+        self.assertEqual(reserve(two), 429)  # now the address is full
+        throttled = admission.snapshot()['throttled']
+        self.assertEqual((throttled[('booking', 'user')], throttled[('booking', 'ip')]), (5, 1))
+
+    def test_sheds_low_priority_first(self):
+        requests = {
+            'directory': lambda: self.client.get('/api/doctor/earliest-slots/'),
+            'registration': lambda: self.client.post('/api/doctor/register/', {}, content_type='application/json'),
+            'login': self.login,
+            'monitoring': self.scrape,
+        }
+        served = {}
+        for in_flight in (4, 5, 8, 10):
+            self.controller.in_flight = in_flight
+            for name, send in requests.items():
+                response = send()
+                status = 200 if isinstance(response, str) else response.status_code
+                served.setdefault(name, []).append(status != 503)
+                if status == 503:
+                    self.assertEqual(response['Retry-After'], '2')
+            self.assertEqual(self.controller.in_flight, in_flight)  # admitted requests left again
+        self.assertEqual(served, {
+            'directory': [True, False, False, False],
+            'registration': [True, True, False, False],
+            'login': [True, True, True, False],
+            'monitoring': [True, True, True, True],
+        })
+
+        self.controller.in_flight = 0
+        text = self.scrape()
+        self.assertEqual(metric(text, 'http_requests_shed_total', endpoint_class='directory'), 3)
+        self.assertEqual(metric(text, 'http_requests_shed_total', endpoint_class='registration'), 2)
+        self.assertEqual(metric(text, 'http_requests_shed_total', endpoint_class='login'), 1)
+        self.assertEqual(metric(text, 'http_requests_admitted_total', endpoint_class='login'), 3)
+        self.assertIsNone(metric(text, 'http_requests_admitted_total', endpoint_class='monitoring'))
+        self.assertEqual(metric(text, 'http_requests_in_flight'), 0)
+
+    @override_settings(ADMISSION_MAX_CONCURRENT=0)
+    def test_disabled(self):
+        self.controller.in_flight = 100
+        self.assertEqual(self.client.get('/api/doctor/earliest-slots/').status_code, 401)
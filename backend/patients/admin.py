@@ -1,10 +1,16 @@
 # patients/admin.py
 from django.contrib import admin
+from accounts.admin_utils import LargeTableAdmin
 from .models import Patient
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(LargeTableAdmin):
     list_display = ('user', 'phone', 'age', 'gender')
-    search_fields = ('user__first_name', 'user__last_name', 'user__email', 'phone')
+    list_select_related = ('user',)
+    search_fields = ('^user__last_name', '^user__first_name', '=user__email', '^phone')
     list_filter = ('gender',)
-    raw_id_fields = ('user',)
\ No newline at end of file
+    raw_id_fields = ('user',)
+
+    def get_queryset(self, request):
+        # Patient.__str__ reads the user, which autocomplete results render.
+        return super().get_queryset(request).select_related('user')
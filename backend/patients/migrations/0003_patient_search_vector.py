@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}.allergies, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}.medical_history, '')), 'B')
+"""
+
+
+def add_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION patients_patient_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND NEW.allergies IS NOT DISTINCT FROM OLD.allergies
+               AND NEW.medical_history IS NOT DISTINCT FROM OLD.medical_history THEN
+                NEW.search_vector := OLD.search_vector;
+            ELSE
+                NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW')};
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER patients_patient_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON patients_patient
+        FOR EACH ROW EXECUTE PROCEDURE patients_patient_search_vector_update()
+    """)
+    schema_editor.execute(
+        f"UPDATE patients_patient SET search_vector = {SEARCH_VECTOR_SQL.format(row='patients_patient')}"
+    )
+    schema_editor.execute(
+        "CREATE INDEX patients_patient_search_vector_gin ON patients_patient USING gin (search_vector)"
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS patients_patient_search_vector_gin")
+    schema_editor.execute("DROP TRIGGER IF EXISTS patients_patient_search_vector_trigger ON patients_patient")
+    schema_editor.execute("DROP FUNCTION IF EXISTS patients_patient_search_vector_update()")
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_patient_date_of_birth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_search_trigger, drop_search_trigger),
+    ]
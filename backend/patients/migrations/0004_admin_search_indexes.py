@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:02
+
+from django.db import migrations
+
+
+def add_phone_index(apps, schema_editor):
+    # Serves the admin's ^phone search: UPPER(phone::text) LIKE UPPER('term%')
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS patients_patient_upper_phone_idx "
+        "ON patients_patient (UPPER(phone::text) text_pattern_ops)"
+    )
+
+
+def drop_phone_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS patients_patient_upper_phone_idx")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('patients', '0003_patient_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_phone_index, drop_phone_index),
+    ]
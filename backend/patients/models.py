@@ -1,6 +1,7 @@
 # patients/models.py
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 class Patient(models.Model):
@@ -35,6 +36,8 @@ class Patient(models.Model):
     medical_history = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Kept up to date by a database trigger on PostgreSQL (see migration 0003)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.user.get_full_name()} (Patient)"
@@ -1,7 +1,10 @@
 # patients/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
 from .models import Patient
+from accounts.sparse_fields import SparseFieldsetSerializerMixin
 
 User = get_user_model()
 
@@ -10,7 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'first_name', 'last_name', 'email', 'date_joined']
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     full_name = serializers.SerializerMethodField()
     email = serializers.SerializerMethodField()
@@ -44,17 +47,31 @@ class PatientCreateUpdateSerializer(serializers.ModelSerializer):
             'allergies', 'medical_history'
         ]
 
+    def validate_email(self, email):
+        # The email doubles as the username of a new account.
+        if self.instance is None:
+            max_length = User._meta.get_field('username').max_length
+            if len(email) > max_length:
+                raise serializers.ValidationError(f"Ensure this field has no more than {max_length} characters.")
+            if User.objects.filter(Q(username=email) | Q(email=email)).exists():
+                raise serializers.ValidationError("An account with this email already exists.")
+        return email
+
+    @transaction.atomic
     def create(self, validated_data):
-        user_data = {
-            'first_name': validated_data.pop('first_name'),
-            'last_name': validated_data.pop('last_name'),
-            'email': validated_data.pop('email'),
-            'password': validated_data.pop('password'),
-            'role': 'patient'
-        }
-        
-        user = User.objects.create_user(**user_data)
-        patient = Patient.objects.create(user=user, **validated_data)
+        email = validated_data.pop('email')
+        user = User(
+            username=email,
+            email=email,
+            first_name=validated_data.pop('first_name'),
+            last_name=validated_data.pop('last_name'),
+            role='patient'
+        )
+        user.set_password(validated_data.pop('password'))
+        # Attached before the user is saved, so patients.signals leaves the profile to us.
+        user.patient_profile = patient = Patient(**validated_data)
+        user.save()
+        patient.save()
         return patient
 
     def update(self, instance, validated_data):
@@ -5,5 +5,6 @@ from .models import Patient
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_patient_profile(sender, instance, created, **kwargs):
-    if created and instance.role == 'patient':
+    # Unless the caller attached a profile to save itself (see PatientCreateUpdateSerializer).
+    if created and instance.role == 'patient' and not sender.patient_profile.is_cached(instance):
         Patient.objects.create(user=instance)
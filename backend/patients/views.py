@@ -3,6 +3,8 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from accounts.idempotency import idempotent
+from accounts.sparse_fields import SparseFieldsetViewMixin
 from .models import Patient
 from .serializers import (
     PatientSerializer, 
@@ -12,7 +14,7 @@ from .serializers import (
 
 User = get_user_model()
 
-class PatientListView(generics.ListAPIView):
+class PatientListView(SparseFieldsetViewMixin, generics.ListAPIView):
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [permissions.AllowAny]
@@ -22,7 +24,11 @@ class PatientCreateView(generics.CreateAPIView):
     serializer_class = PatientCreateUpdateSerializer
     permission_classes = [permissions.AllowAny]
 
-class PatientDetailView(generics.RetrieveAPIView):
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+class PatientDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [permissions.IsAuthenticated]
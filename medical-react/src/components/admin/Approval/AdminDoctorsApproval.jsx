@@ -56,6 +56,13 @@ export default function AdminDoctorApproval() {
     }
   };
 
+  // Patch the row in place instead of refetching the whole list
+  const updateStatus = (id, changes) => {
+    setDoctors((prev) =>
+      prev.map((doctor) => (doctor.id === id ? { ...doctor, ...changes } : doctor))
+    );
+  };
+
   const handleUnauthorized = () => {
     setSnackbar({
       open: true,
@@ -81,7 +88,7 @@ export default function AdminDoctorApproval() {
           },
         }
       );
-      fetchDoctors();
+      updateStatus(id, { is_approved: true, is_blocked: false });
       setSnackbar({
         open: true,
         message: "Doctor approved successfully",
@@ -112,7 +119,7 @@ export default function AdminDoctorApproval() {
           },
         }
       );
-      fetchDoctors();
+      updateStatus(id, { is_approved: false, is_blocked: true });
       setSnackbar({
         open: true,
         message: "Doctor blocked successfully",
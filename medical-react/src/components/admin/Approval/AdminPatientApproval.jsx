@@ -56,6 +56,13 @@ export default function AdminPatientApproval() {
     }
   };
 
+  // Patch the row in place instead of refetching the whole list
+  const updateStatus = (id, changes) => {
+    setPatients((prev) =>
+      prev.map((patient) => (patient.id === id ? { ...patient, ...changes } : patient))
+    );
+  };
+
   const handleUnauthorized = () => {
     setSnackbar({
       open: true,
@@ -81,7 +88,7 @@ export default function AdminPatientApproval() {
           },
         }
       );
-      fetchPatients();
+      updateStatus(id, { is_approved: true, is_blocked: false });
       setSnackbar({
         open: true,
         message: "Patient approved successfully",
@@ -112,7 +119,7 @@ export default function AdminPatientApproval() {
           },
         }
       );
-      fetchPatients();
+      updateStatus(id, { is_approved: false, is_blocked: true });
       setSnackbar({
         open: true,
         message: "Patient blocked successfully",
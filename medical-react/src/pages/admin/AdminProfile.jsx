@@ -97,7 +97,9 @@ const AdminProfile = () => {
             Authorization: `Bearer ${token}`,
           },
         });
-        setActivityLog(activityResponse.data.slice(0, 5));
+        const activityData =
+          activityResponse.data?.results || activityResponse.data || [];
+        setActivityLog(activityData.slice(0, 5));
       } catch (activityError) {
         console.warn("Using empty activity log:", activityError.message);
         setActivityLog([